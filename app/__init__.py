@@ -5,9 +5,12 @@ This helps to enable the use of blueprint.
 """
 from flask import Flask
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 
 from config import config
+from . import encoding
+from .cache import token_cache
+from .hashing import password_hasher
+from .pool import SQLAlchemy
 
 db = SQLAlchemy()
 
@@ -21,6 +24,21 @@ def create_app(config_name):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     db.init_app(app)
+    encoding.init_app(app)
+    # time the whole request, compression and commit included
+    from . import timing
+    timing.init_app(app)
+    from . import metrics
+    metrics.init_app(app)
+    from . import slow_queries
+    slow_queries.init_app(app)
+    # compress responses after the unit of work has committed
+    from . import compression
+    compression.init_app(app)
+    from . import transactions
+    transactions.init_app(app)
+    token_cache.init_app(app)
+    password_hasher.init_app(app)
     app.config['CORS_HEADERS'] = 'Content-Type'
     cors = CORS(app)
 
@@ -3,14 +3,16 @@ Authentication settings for the BucketList API.
 
 Password verification and user registration takes place here.
 """
-from flask import g, jsonify, request
+from flask import g, request
 from flask_cors import cross_origin
 from flask_httpauth import HTTPBasicAuth
 
 from . import authentication
 from app import errors
+from app.cache import token_cache
 from app.decorators import json
-from app.models import User
+from app.encoding import jsonify
+from app.models import RefreshToken, User
 
 auth = HTTPBasicAuth()
 
@@ -21,14 +23,21 @@ def verify_token(token, password):
     Verify token.
 
     Verify token, password doesn't need to be present here. The token is
-    going to be in the request headers always.
+    going to be in the request headers always. The identity of the user is
+    cached for tokens that have been verified before.
     """
-    user = User.verify_auth_token(token)
+    identity = token_cache.get(token)
 
-    if not user:
-        return False
+    if identity is None:
+        user, expires_at = User.load_auth_token(token)
 
-    g.user = user
+        if not user:
+            return False
+
+        identity = user.identity()
+        token_cache.set(token, identity, expires_at)
+
+    g.user = identity
     return True
 
 
@@ -55,9 +64,50 @@ def login():
         return errors.unauthorized("Username and password doesn't match.")
 
     token = user.generate_auth_token()
+    refresh_token = RefreshToken.issue(user.user_id)
+    return jsonify({'token': token, 'refresh_token': refresh_token}), 200
+
+
+@authentication.route('/refresh', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def refresh():
+    """
+    Refresh the auth token of a user.
+
+    Returns a new token for a valid refresh token, so clients don't send
+    the password again. Only the HMAC of the refresh token is computed and
+    looked up, the password isn't hashed.
+    """
+    if not isinstance(request.json, dict):
+        return errors.bad_request("No JSON object detected.")
+
+    refresh_token = RefreshToken.find(request.json.get('refresh_token'))
+    if refresh_token is None:
+        return errors.token_error("Invalid or expired refresh token.")
+
+    token = User.auth_token(refresh_token.user_id)
     return jsonify({'token': token}), 200
 
 
+@authentication.route('/revoke', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def revoke():
+    """
+    Revoke a refresh token.
+
+    The refresh token can't be used anymore, e.g. when a user logs out.
+    """
+    if not isinstance(request.json, dict):
+        return errors.bad_request("No JSON object detected.")
+
+    refresh_token = RefreshToken.find(request.json.get('refresh_token'))
+    if refresh_token is None:
+        return errors.token_error("Invalid or expired refresh token.")
+
+    refresh_token.revoke()
+    return jsonify({'message': 'Refresh token revoked.'}), 200
+
+
 @authentication.route('/register', methods=['POST', 'OPTIONS'])
 @cross_origin()
 @json
@@ -80,9 +130,9 @@ def register_user():
     if User.query.filter_by(username=username).first():
         return errors.bad_request("username already exist.")
 
+    user = User(username=username)
+    user.hash_password(password)
     try:
-        user = User(username=username)
-        user.hash_password(password)
         user.save()
         return user, 201
     except:
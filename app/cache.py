@@ -0,0 +1,141 @@
+"""
+Define the caches used by the application.
+
+Verified auth tokens are cached here so repeat requests with the same token
+skip the signature check and the database lookup.
+"""
+from collections import namedtuple, OrderedDict
+import threading
+import time
+
+# The lightweight identity of an authenticated user stored in the cache.
+Identity = namedtuple('Identity', ['user_id', 'username'])
+
+
+class TokenCache(object):
+    """
+    Set up a bounded cache of verified auth tokens.
+
+    Each token maps to the identity of its user until the token expires. The
+    least recently used token is evicted when the cache is full and all the
+    tokens of a user can be dropped when the user changes.
+    """
+
+    def __init__(self, app=None):
+        """
+        Create the cache.
+
+        The cache is disabled until it is configured with `init_app`.
+        """
+        self.max_size = 0
+        self.ttl = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._users = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the cache for an application.
+
+        TOKEN_CACHE_SIZE sets the number of tokens kept (0 disables the cache)
+        and TOKEN_CACHE_TTL the most seconds a token is trusted without being
+        verified again.
+        """
+        self.max_size = app.config.get('TOKEN_CACHE_SIZE', 0)
+        self.ttl = app.config.get('TOKEN_CACHE_TTL', 0)
+        self.clear()
+
+    def get(self, token):
+        """
+        Get the identity for a token.
+
+        Returns None when the token isn't cached or has expired.
+        """
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    self._forget(token, entry[0])
+                self.misses += 1
+                return None
+
+            # re-insert the token to mark it as the most recently used
+            self._entries[token] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, token, identity, expires_at):
+        """
+        Cache the identity for a token.
+
+        The identity is kept until the token expires at `expires_at` (a unix
+        timestamp), or for TOKEN_CACHE_TTL seconds if that is sooner.
+        """
+        if not self.max_size:
+            return
+        if self.ttl:
+            expires_at = min(expires_at, time.time() + self.ttl)
+
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if entry is not None:
+                self._forget(token, entry[0])
+            while len(self._entries) >= self.max_size:
+                oldest = next(iter(self._entries))
+                self._forget(oldest, self._entries.pop(oldest)[0])
+            self._entries[token] = (identity, expires_at)
+            self._users.setdefault(identity.user_id, set()).add(token)
+
+    def invalidate_user(self, user_id):
+        """
+        Drop every cached token of a user.
+
+        This is called when a user is deleted or changes password.
+        """
+        with self._lock:
+            for token in self._users.pop(user_id, ()):
+                self._entries.pop(token, None)
+
+    def clear(self):
+        """
+        Drop every cached token.
+
+        The hit and miss counters are reset too.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._users.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get the cache statistics.
+
+        Returns the number of cached tokens and the hit and miss counters.
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _forget(self, token, identity):
+        """
+        Remove a token from the tokens of its user.
+
+        The lock must be held by the caller.
+        """
+        tokens = self._users.get(identity.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._users[identity.user_id]
+
+
+token_cache = TokenCache()
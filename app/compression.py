@@ -0,0 +1,101 @@
+"""
+Define the compression of responses.
+
+Responses are compressed with gzip or deflate when the client accepts one of
+them in its Accept-Encoding header:
+- COMPRESS_MIN_SIZE is the smallest body, in bytes, worth compressing.
+- COMPRESS_LEVEL is the zlib compression level, from 1 (fastest) to 9.
+- COMPRESS_MIMETYPES are the types of the responses compressed.
+Streamed responses, e.g. exports, are compressed chunk by chunk as they are
+sent, whatever their size. The ETag of a compressed response is made weak,
+since the compressed bytes aren't the same as the resource's.
+"""
+import zlib
+
+from flask import current_app, request
+
+# The encodings supported, preferred first, and the zlib window bits used to
+# write each of them.
+ENCODINGS = (('gzip', 16 + zlib.MAX_WBITS), ('deflate', zlib.MAX_WBITS))
+
+
+def init_app(app):
+    """
+    Set up the compression of responses for an application.
+
+    COMPRESS_LEVEL 0 turns compression off.
+    """
+    app.after_request(compress_response)
+
+
+def compress_response(response):
+    """
+    Compress a response.
+
+    The response is compressed with the encoding the client prefers, unless
+    it is too small or of a type that isn't compressed.
+    """
+    if not current_app.config.get('COMPRESS_LEVEL'):
+        return response
+    if not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(
+        [name for name, wbits in ENCODINGS])
+    if encoding is None:
+        return response
+    wbits = dict(ENCODINGS)[encoding]
+    compressor = zlib.compressobj(current_app.config['COMPRESS_LEVEL'],
+                                  zlib.DEFLATED, wbits)
+
+    if response.is_streamed:
+        response.response = _compress_stream(compressor, response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 0):
+            return response
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _compressible(response):
+    """
+    Check if a response can be compressed.
+
+    Responses without a body, already encoded or sent straight from a file
+    are left alone.
+    """
+    return (200 <= response.status_code < 300 and
+            response.status_code != 204 and
+            not response.direct_passthrough and
+            'Content-Encoding' not in response.headers and
+            response.mimetype in current_app.config.get(
+                'COMPRESS_MIMETYPES', ()))
+
+
+def _compress_stream(compressor, chunks):
+    """
+    Compress a streamed body.
+
+    Each chunk is flushed as it is compressed, so the client gets the lines
+    of the stream as soon as they are produced. The original body is closed
+    when the stream ends.
+    """
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, type(u'')):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + \
+                compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -4,19 +4,52 @@ Define decorators for the application.
 All decorators to be used in the application are defined here.
 """
 
+import base64
+from datetime import datetime
 import functools
+import hashlib
+import time
 
-from flask import jsonify, wrappers, request, url_for, current_app
+from flask import wrappers, g, request, url_for, current_app
 
+from app import errors
+from app.encoding import jsonify
+from app.serializers import requested_fields
 
-def json(f):
+
+def select_fields(available):
+    """
+    Read the fields requested for a resource before a route is called.
+
+    The fields are stored as `g.fields` for the route to narrow its query.
+    Returns an error response if the request asks for unknown fields.
     """
-    Modify result of passed in function to return pretty printed JSON.
+    try:
+        g.fields = requested_fields(available)
+    except ValueError as e:
+        return errors.bad_request(str(e))
+
+
+def json(f=None, fields=None):
+    """
+    Modify result of passed in function to return a JSON response.
+
+    When the `fields` available for the resource are given, clients can ask
+    for some of them with the `fields` and `include_items` query parameters
+    and models are displayed with those fields only.
 
     Courtesy - Miguel Grinberg
     """
+    if f is None:
+        return functools.partial(json, fields=fields)
+
     @functools.wraps(f)
     def wrapped(*args, **kwargs):
+        if fields is not None:
+            error = select_fields(fields)
+            if error is not None:
+                return error
+
         response = f(*args, **kwargs)
         status = None
 
@@ -31,7 +64,10 @@ def json(f):
 
         # convert result to json and return
         if not isinstance(response, dict):
-            response = response.to_json()
+            if fields is not None and g.fields is not None:
+                response = response.to_json(fields=g.fields)
+            else:
+                response = response.to_json()
         response = jsonify(response)
         if status is not None:
             response.status_code = status
@@ -39,12 +75,224 @@ def json(f):
     return wrapped
 
 
-def paginate():
+def conditional(validator):
+    """
+    Answer conditional GET requests.
+
+    The validator is called with the arguments of the route and returns a
+    version string that changes whenever the resource changes and the time
+    it was last modified, or None if the resource doesn't exist. A strong
+    ETag is derived from the version and the requested URL, so unchanged
+    resources are answered with 304 Not Modified without being built. The
+    ETag is compared weakly, so it still matches once a compressed response
+    made it weak.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapped(*args, **kwargs):
+            validators = validator(*args, **kwargs)
+            if validators is None:
+                return f(*args, **kwargs)
+
+            version, last_modified = validators
+            last_modified = _utc(last_modified)
+            etag = hashlib.sha1(
+                u'{0}|{1}'.format(version, request.url).encode('utf-8')
+            ).hexdigest()
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(
+                    request.if_modified_since and last_modified and
+                    last_modified <= request.if_modified_since)
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = f(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapped
+    return decorator
+
+
+def _utc(value):
+    """
+    Convert a local time to UTC.
+
+    The models store naive local times while HTTP dates are in UTC, so the
+    time is converted before it is sent or compared. Returns None for None.
+    """
+    if value is None:
+        return None
+    return datetime.utcfromtimestamp(time.mktime(value.timetuple()))
+
+
+def encode_cursor(direction, value):
+    """
+    Encode a pagination cursor.
+
+    The cursor records the sort key of the row the next page starts after
+    (or the previous page ends before) and is opaque to clients.
+    """
+    raw = '{0}:{1}'.format(direction, value)
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a pagination cursor.
+
+    Returns the direction and sort key stored in the cursor. A ValueError is
+    raised when the cursor wasn't produced by `encode_cursor`.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        direction, value = raw.decode('ascii').split(':')
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor: {0}'.format(cursor))
+    if direction not in ('next', 'prev'):
+        raise ValueError('Invalid cursor: {0}'.format(cursor))
+    return direction, value
+
+
+def _offset_page(query, limit, kwargs):
+    """
+    Fetch a page of results using the page number.
+
+    Returns the results on the page and the meta portion of the response.
+    """
+    # get the number of the page to be displayed from URL
+    page = request.args.get('page', 1, type=int)
+
+    # paginate the query and get content of query
+    pagination = query.paginate(page, limit)
+    content = pagination.items
+
+    # prepare the meta portion of the json response
+    pages = {'page': page, 'limit': limit,
+             'total': pagination.total, 'pages': pagination.pages}
+    if pagination.has_prev:
+        pages['prev'] = url_for(request.endpoint,
+                                page=pagination.prev_num, limit=limit,
+                                _external=True, **kwargs)
+    else:
+        pages['prev'] = None
+
+    if pagination.has_next:
+        pages['next'] = url_for(request.endpoint,
+                                page=pagination.next_num, limit=limit,
+                                _external=True, **kwargs)
+    else:
+        pages['next'] = None
+
+    pages['first'] = url_for(request.endpoint, page=1,
+                             limit=limit, _external=True,
+                             **kwargs)
+    pages['last'] = url_for(request.endpoint, page=pagination.pages,
+                            limit=limit, _external=True,
+                            **kwargs)
+    return content, pages
+
+
+def _cursor_page(query, key, limit, kwargs):
+    """
+    Fetch a page of results using a cursor.
+
+    The query seeks past the sort key stored in the cursor instead of
+    skipping rows with an offset, and the total isn't counted. One row more
+    than the limit is fetched to find out if there is another page.
+    """
+    cursor = request.args.get('cursor')
+    if cursor:
+        direction, value = decode_cursor(cursor)
+    else:
+        direction, value = 'next', None
+
+    query = query.order_by(None)
+    if direction == 'next':
+        if value is not None:
+            query = query.filter(key > value)
+        query = query.order_by(key.asc())
+    else:
+        query = query.filter(key < value).order_by(key.desc())
+
+    content = query.limit(limit + 1).all()
+    has_more = len(content) > limit
+    content = content[:limit]
+    if direction == 'prev':
+        content.reverse()
+
+    # going back from a page means there is a page after it and vice versa
+    has_next = has_more if direction == 'next' else True
+    has_prev = has_more if direction == 'prev' else value is not None
+
+    # prepare the meta portion of the json response
+    pages = {'cursor': cursor, 'limit': limit,
+             'next_cursor': None, 'prev_cursor': None,
+             'next': None, 'prev': None}
+    if content and has_next:
+        pages['next_cursor'] = encode_cursor(
+            'next', getattr(content[-1], key.key))
+        pages['next'] = url_for(request.endpoint,
+                                cursor=pages['next_cursor'], limit=limit,
+                                _external=True, **kwargs)
+    if content and has_prev:
+        pages['prev_cursor'] = encode_cursor(
+            'prev', getattr(content[0], key.key))
+        pages['prev'] = url_for(request.endpoint,
+                                cursor=pages['prev_cursor'], limit=limit,
+                                _external=True, **kwargs)
+    pages['first'] = url_for(request.endpoint, cursor='', limit=limit,
+                             _external=True, **kwargs)
+    return content, pages
+
+
+def _serialize(content, serializer, fields):
+    """
+    Convert a page of results for the response.
+
+    The serializer is given the requested fields when the resource has
+    fields to select, each result is converted with `to_json` otherwise.
+    """
+    if serializer is None:
+        return [each.to_json() for each in content]
+    if fields is not None:
+        return serializer(content, g.fields)
+    return serializer(content)
+
+
+def paginate(serializer=None, cursor_key=None, fields=None,
+             collection='bucketlists'):
     """
     Generate a paginated response for a resource collection.
 
     Routes that use this decorator must return a SQLAlchemy query as a
-    response.
+    response. A serializer that converts the whole page of results at once
+    can be supplied, otherwise each result is converted with `to_json`.
+
+    When the `fields` available for the resource are given, clients can ask
+    for some of them as with the `json` decorator. The requested fields are
+    stored as `g.fields` for the route to narrow its query and passed on to
+    the serializer.
+
+    Results are paginated with the `page` and `limit` query parameters. When
+    a `cursor_key` column is supplied, clients can send a `cursor` query
+    parameter instead (empty for the first page) to page through the results
+    ordered by that column without an offset scan or a count.
+
+    The results are sent under the `collection` key of the response, next to
+    the `meta` portion. The other query parameters of the request, e.g.
+    filters, are kept in the page URLs of `meta`, except `endpoint` and those
+    starting with an underscore, which `url_for` would take as its own. A
+    route can return an error response instead of a query.
 
     The output of this decorator is a Python dictionary with the paginated
     results. The application must ensure that this result is converted to a
@@ -56,45 +304,40 @@ def paginate():
     def decorator(f):
         @functools.wraps(f)
         def wrapped(*args, **kwargs):
-            # get the number of the page to be displayed from URL
-            page = request.args.get('page', 1, type=int)
-
-            # get the number of items to be displayed per page
-            limit = min(request.args.get(
+            # get the number of items to be displayed per page, at least one
+            limit = max(1, min(request.args.get(
                 'limit', current_app.config['DEFAULT_PER_PAGE'], type=int),
-                current_app.config['MAX_PER_PAGE'])
+                current_app.config['MAX_PER_PAGE']))
+
+            if fields is not None:
+                error = select_fields(fields)
+                if error is not None:
+                    return error
 
             # get query, paginate the query and get content of query
             query = f(*args, **kwargs)
-            pagination = query.paginate(page, limit)
-            content = pagination.items
-
-            # prepare the meta portion of the json response
-            pages = {'page': page, 'limit': limit,
-                     'total': pagination.total, 'pages': pagination.pages}
-            if pagination.has_prev:
-                pages['prev'] = url_for(request.endpoint,
-                                        page=pagination.prev_num, limit=limit,
-                                        _external=True, **kwargs)
-            else:
-                pages['prev'] = None
+            if isinstance(query, wrappers.Response):
+                return query
 
-            if pagination.has_next:
-                pages['next'] = url_for(request.endpoint,
-                                        page=pagination.next_num, limit=limit,
-                                        _external=True, **kwargs)
+            # keep the other query parameters in the page URLs, but not the
+            # ones url_for takes for itself, such as `endpoint` or `_anchor`
+            params = dict((key, value) for key, value in request.args.items()
+                          if not key.startswith('_') and key not in (
+                              'page', 'limit', 'cursor', 'endpoint'))
+            params.update(kwargs)
+            if cursor_key is not None and 'cursor' in request.args:
+                try:
+                    content, pages = _cursor_page(query, cursor_key, limit,
+                                                  params)
+                except ValueError:
+                    return errors.bad_request(
+                        "The cursor supplied is invalid.")
             else:
-                pages['next'] = None
-
-            pages['first'] = url_for(request.endpoint, page=1,
-                                     limit=limit, _external=True,
-                                     **kwargs)
-            pages['last'] = url_for(request.endpoint, pages=pagination.pages,
-                                    limit=limit, _external=True,
-                                    **kwargs)
+                content, pages = _offset_page(query, limit, params)
+
             return jsonify({
                 'meta': pages,
-                'bucketlists': [each.to_json() for each in content]
+                collection: _serialize(content, serializer, fields)
             })
         return wrapped
     return decorator
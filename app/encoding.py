@@ -0,0 +1,165 @@
+"""
+Define the JSON encoding of the application.
+
+Every JSON response is built by `jsonify` here. Values that JSON has no type
+for (dates, decimals, UUIDs) are converted in one place, and the encoder used
+is picked by the JSON_BACKEND setting:
+- 'auto' uses the fastest backend installed.
+- 'orjson', 'rapidjson', 'simplejson' or 'json' picks one explicitly.
+Responses are compact unless JSONIFY_PRETTYPRINT_REGULAR is set.
+"""
+from datetime import date
+from decimal import Decimal
+import importlib
+import uuid
+
+from flask import current_app
+from flask.json import JSONEncoder as FlaskJSONEncoder
+from werkzeug.http import http_date
+
+# The backends tried, fastest first, when JSON_BACKEND is 'auto'.
+AUTO_BACKENDS = ('orjson', 'rapidjson', 'simplejson', 'json')
+
+
+def default(o):
+    """
+    Convert a value JSON has no type for.
+
+    Dates are sent as HTTP dates, the same as Flask does, and decimals and
+    UUIDs as strings.
+    """
+    if isinstance(o, date):
+        return http_date(o.timetuple())
+    if isinstance(o, (Decimal, uuid.UUID)):
+        return str(o)
+    raise TypeError('{0!r} is not JSON serializable'.format(o))
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """
+    Set up the JSON encoder of the application.
+
+    Flask uses this encoder for `flask.json`, so it converts values the same
+    way the responses do. It extends the Flask encoder because that one is
+    built on simplejson when simplejson is installed.
+    """
+
+    def default(self, o):
+        """
+        Convert a value JSON has no type for.
+
+        The conversion is done by the module level `default`.
+        """
+        return default(o)
+
+
+def _json_dumps(module):
+    """
+    Make a dumps function for a module with the API of the json module.
+
+    Both the standard library json and simplejson have this API.
+    """
+    options = {'use_decimal': False} if module.__name__ == 'simplejson' \
+        else {}
+
+    def dumps(obj, sort_keys, pretty):
+        if pretty:
+            return module.dumps(obj, default=default, sort_keys=sort_keys,
+                                indent=2, separators=(', ', ': '), **options)
+        return module.dumps(obj, default=default, sort_keys=sort_keys,
+                            separators=(',', ':'), **options)
+    return dumps
+
+
+def _orjson_dumps(module):
+    """
+    Make a dumps function for orjson.
+
+    Dates are passed through to `default` so they are sent as HTTP dates.
+    """
+    def dumps(obj, sort_keys, pretty):
+        option = module.OPT_PASSTHROUGH_DATETIME | module.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= module.OPT_SORT_KEYS
+        if pretty:
+            option |= module.OPT_INDENT_2
+        return module.dumps(obj, default=default, option=option)
+    return dumps
+
+
+def _rapidjson_dumps(module):
+    """
+    Make a dumps function for python-rapidjson.
+
+    Dates are left to `default` so they are sent as HTTP dates.
+    """
+    def dumps(obj, sort_keys, pretty):
+        return module.dumps(obj, default=default, sort_keys=sort_keys,
+                            indent=2 if pretty else None)
+    return dumps
+
+
+BACKENDS = {
+    'orjson': _orjson_dumps,
+    'rapidjson': _rapidjson_dumps,
+    'simplejson': _json_dumps,
+    'json': _json_dumps
+}
+
+
+def load_backend(name):
+    """
+    Load a JSON backend.
+
+    Returns the name of the backend loaded and its dumps function. An
+    ImportError is raised if the backend isn't installed and a ValueError if
+    there is no such backend.
+    """
+    if name == 'auto':
+        for backend in AUTO_BACKENDS:
+            try:
+                return load_backend(backend)
+            except ImportError:
+                continue
+    if name not in BACKENDS:
+        raise ValueError('Unknown JSON backend: {0}'.format(name))
+    return name, BACKENDS[name](importlib.import_module(name))
+
+
+def init_app(app):
+    """
+    Set up JSON encoding for an application.
+
+    The backend named by JSON_BACKEND is loaded once and used for every
+    response.
+    """
+    app.json_encoder = JSONEncoder
+    app.extensions['json_backend'] = load_backend(
+        app.config.get('JSON_BACKEND', 'auto'))
+
+
+def dumps(obj):
+    """
+    Encode an object as JSON.
+
+    Returns the encoded object using the backend of the current application.
+    """
+    name, encode = current_app.extensions['json_backend']
+    return encode(obj, current_app.config['JSON_SORT_KEYS'],
+                  current_app.config['JSONIFY_PRETTYPRINT_REGULAR'])
+
+
+def jsonify(*args, **kwargs):
+    """
+    Create a JSON response.
+
+    Works like `flask.jsonify`: a single argument is sent as is, several
+    arguments as an array and keyword arguments as an object.
+    """
+    if len(args) == 1 and not kwargs:
+        data = args[0]
+    else:
+        data = args or kwargs
+    return current_app.response_class(
+        (dumps(data), b'\n'),
+        mimetype=current_app.config['JSONIFY_MIMETYPE'])
@@ -3,7 +3,7 @@ This script contains the routes for the error handlers.
 
 This installs application-wide error handlers
 """
-from flask import jsonify
+from app.encoding import jsonify
 
 
 def not_found(message):
@@ -51,6 +51,21 @@ def unauthorized(message):
     return response
 
 
+def conflict(message):
+    """
+    The handler handles the 409 (Conflict) error.
+
+    This returns a json object with a description of the error type.
+    """
+    response = jsonify({
+        'status': 409,
+        'error': "Conflict",
+        'message': message
+    })
+    response.status_code = 409
+    return response
+
+
 def token_error(message):
     """
     Handle errors relating to token.
@@ -64,3 +79,20 @@ def token_error(message):
     })
     response.status_code = 401
     return response
+
+
+def service_unavailable(message, retry_after):
+    """
+    The handler handles the 503 (Service Unavailable) error.
+
+    This returns a json object with a description of the error type and
+    tells the client how many seconds to wait before retrying.
+    """
+    response = jsonify({
+        'status': 503,
+        'error': "Service Unavailable",
+        'message': message
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
@@ -0,0 +1,256 @@
+"""
+Define the password hashing of the application.
+
+Password hashes are slow on purpose, so they are computed on a bounded
+process pool instead of the request thread:
+- PASSWORD_HASH_WORKERS is the number of processes (0 hashes in the request
+  thread).
+- PASSWORD_HASH_QUEUE_DEPTH is the number of hashes that can wait for a
+  process. Beyond that, requests are turned away with a 503 and a
+  Retry-After of PASSWORD_HASH_RETRY_AFTER seconds.
+- PASSWORD_HASH_TIMEOUT is the most seconds a request waits for its hash.
+The pool and its limits belong to each process of the server. A request
+waiting for its hash holds its thread, so under gunicorn the threaded
+workers of `gunicorn_config.py` keep serving the rest of the API during a
+burst of logins or registrations.
+"""
+import multiprocessing
+import os
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from . import errors
+
+
+class HashingUnavailable(Exception):
+    """
+    Set up the error raised when a password can't be hashed right now.
+
+    The request is answered with a 503 telling the client when to retry.
+    """
+
+    def __init__(self, message, retry_after):
+        """
+        Create the error.
+
+        `retry_after` is the number of seconds the client should wait.
+        """
+        super(HashingUnavailable, self).__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordHasher(object):
+    """
+    Set up the pool that hashes and checks passwords.
+
+    At most `workers` hashes run at once and `queue_depth` more wait for a
+    process. The time taken by each hash, the requests waiting and the
+    requests turned away are counted.
+    """
+
+    def __init__(self, app=None):
+        """
+        Create the hasher.
+
+        Passwords are hashed in the request thread until it is configured
+        with `init_app`.
+        """
+        self.workers = 0
+        self.queue_depth = 0
+        self.timeout = None
+        self.retry_after = 1
+        self._pool = None
+        self._pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the hasher for an application.
+
+        A 503 with a Retry-After header is sent when the hasher turns a
+        request away.
+        """
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        self.queue_depth = app.config.get('PASSWORD_HASH_QUEUE_DEPTH', 0)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT')
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+        self.close()
+        self.reset()
+        app.register_error_handler(HashingUnavailable, hashing_unavailable)
+
+    def reset(self):
+        """
+        Reset the metrics.
+
+        The counters start at zero again.
+        """
+        with self._lock:
+            self.hashes = 0
+            self.rejected = 0
+            self.timeouts = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.seconds = 0.0
+            self.max_seconds = 0.0
+
+    def generate(self, password):
+        """
+        Hash a password.
+
+        Returns the hash to be stored for the password.
+        """
+        return self._run(generate_password_hash, password)
+
+    def check(self, pwhash, password):
+        """
+        Check a password against its hash.
+
+        Returns True when the password matches.
+        """
+        return self._run(check_password_hash, pwhash, password)
+
+    def stats(self):
+        """
+        Get the hashing statistics.
+
+        Returns the counters, the hashes in flight and the time taken by the
+        hashes, including the time they waited for a process.
+        """
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue_depth,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'hashes': self.hashes,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'seconds': self.seconds,
+                'max_seconds': self.max_seconds
+            }
+
+    def close(self):
+        """
+        Stop the processes of the pool.
+
+        They are started again the next time a password is hashed. The
+        hashes that were running never finish, so their slots are given
+        back by starting with new slots.
+        """
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.terminate()
+        self._pool = None
+        self._pid = None
+        self._slots = None
+        if self.workers:
+            self._slots = threading.BoundedSemaphore(
+                self.workers + self.queue_depth)
+
+    def _run(self, function, *args):
+        """
+        Run a hashing function.
+
+        The function runs on the pool when it has a slot left, otherwise
+        HashingUnavailable is raised. The slot is given back when the
+        function finishes on the pool, not when the request stops waiting
+        for it, so hashes that timed out still count against the queue.
+        """
+        slots = self._slots
+        if slots is None:
+            return self._timed(function, *args)
+        if not slots.acquire(False):
+            self._count('rejected')
+            raise HashingUnavailable('Too many passwords are being hashed.',
+                                     self.retry_after)
+
+        def release(outcome):
+            slots.release()
+
+        try:
+            result = self._get_pool().apply_async(_call, (function, args),
+                                                  callback=release)
+        except Exception:
+            slots.release()
+            raise
+        try:
+            error, value = self._timed(result.get, self.timeout)
+        except multiprocessing.TimeoutError:
+            self._count('timeouts')
+            raise HashingUnavailable('Hashing the password took too long.',
+                                     self.retry_after)
+        if error:
+            raise value
+        return value
+
+    def _timed(self, function, *args):
+        """
+        Call a function and record the time it takes.
+
+        The call is counted in flight until it returns.
+        """
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            seconds = time.time() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.hashes += 1
+                self.seconds += seconds
+                self.max_seconds = max(self.max_seconds, seconds)
+
+    def _get_pool(self):
+        """
+        Get the process pool.
+
+        The pool is started on first use in each process, so the processes
+        of a pre-forking server each get their own.
+        """
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = multiprocessing.Pool(self.workers)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _count(self, counter):
+        """
+        Add one to a counter.
+
+        The counters are shared by every thread of the process.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def _call(function, args):
+    """
+    Call a function on the pool.
+
+    Returns whether it raised and its result or exception. It never raises
+    itself, so the callback giving back its slot always runs.
+    """
+    try:
+        return False, function(*args)
+    except Exception as error:
+        return True, error
+
+
+def hashing_unavailable(error):
+    """
+    Handle a password that can't be hashed right now.
+
+    Returns a 503 response telling the client when to retry.
+    """
+    return errors.service_unavailable(str(error), error.retry_after)
+
+
+password_hasher = PasswordHasher()
@@ -3,54 +3,67 @@ This script contains the routes for the different API methods.
 
 This handles the overall routing of the application.
 """
-from flask import g, jsonify, request
+from flask import current_app, g, request, stream_with_context
 from flask_cors import cross_origin
 
 from . import main
 from app import db, errors
 from app.auth.routes import auth
-from app.decorators import json, paginate
+from app.decorators import conditional, json, paginate
+from app.encoding import jsonify
 from app.models import BucketList, Items
+from app.search import search_bucketlists
+from app.serializers import (
+    BUCKETLIST_FIELDS, ITEM_FIELDS, bucketlist_columns, bucketlists_to_json,
+    item_columns, items_to_json)
+from app.transfer import MAX_NAME_LENGTH, export_lines, import_lines
 import sqlalchemy
 
 
 @main.route('/bucketlists/', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @auth.login_required
-@paginate()
+@conditional(lambda: BucketList.list_version(g.user.user_id))
+@paginate(serializer=bucketlists_to_json,
+          cursor_key=BucketList.bucketlist_id, fields=BUCKETLIST_FIELDS)
 def get_bucketlists():
     """
     List all the created BucketLists.
 
     Displays a json of all the created BucketLists and the various items
-    associated with them.
+    associated with them. BucketLists matching the search query `q` are
+    ordered by relevance. Only the columns of the requested fields are
+    selected.
     """
+    query = BucketList.query.filter_by(created_by=g.user.user_id)
     if request.args.get('q'):
-        return BucketList.query.filter_by(created_by=g.user.user_id).filter(
-            BucketList.name.contains(request.args.get('q')))
-    else:
-        return BucketList.query.filter_by(created_by=g.user.user_id)
+        query = search_bucketlists(query, request.args.get('q'))
+    return query.with_entities(*bucketlist_columns(g.fields))
 
 
 @main.route('/bucketlists/<int:list_id>', methods=['GET'])
 @auth.login_required
-@json
+@conditional(lambda list_id: BucketList.version(list_id, g.user.user_id))
+@json(fields=BUCKETLIST_FIELDS)
 def get_bucketlist(list_id):
     """
     Get single bucket list.
 
-    Return a json of all the information as regards a particular BucketList.
+    Return a json of all the information as regards a particular BucketList,
+    or of the requested fields only.
     """
-    bucketlist = BucketList.query.filter_by(bucketlist_id=list_id).first()
-    if not bucketlist or bucketlist.created_by != g.user.user_id:
+    bucketlist = db.session.query(*bucketlist_columns(g.fields)).filter(
+        BucketList.bucketlist_id == list_id,
+        BucketList.created_by == g.user.user_id).first()
+    if not bucketlist:
         return errors.not_found("The BucketList with the id: {0} doesn't"
                                 " exist.".format(list_id))
-    return bucketlist, 200
+    return bucketlists_to_json([bucketlist], g.fields)[0], 200
 
 
 @main.route('/bucketlists/', methods=['POST'], strict_slashes=False)
 @auth.login_required
-@json
+@json(fields=BUCKETLIST_FIELDS)
 def create_bucketlist():
     """
     Create a new BucketList.
@@ -77,7 +90,7 @@ def create_bucketlist():
 
 @main.route('/bucketlists/<int:list_id>', methods=['PUT'])
 @auth.login_required
-@json
+@json(fields=BUCKETLIST_FIELDS)
 def update_bucketlist(list_id):
     """
     Update BucketList.
@@ -118,11 +131,42 @@ def delete_bucketlist(list_id):
         return jsonify({'Delete': True}), 200
 
 
+@main.route('/bucketlists/<int:list_id>/items/', methods=['GET'])
+@auth.login_required
+@conditional(lambda list_id: BucketList.version(list_id, g.user.user_id))
+@paginate(serializer=items_to_json, cursor_key=Items.item_id,
+          fields=ITEM_FIELDS, collection='items')
+def get_bucketlist_items(list_id):
+    """
+    List the items of a BucketList.
+
+    Displays a page of the items of a BucketList in id order, so large
+    BucketLists don't have to be loaded at once. The items can be filtered
+    by `done` (true or false) and by the `prefix` of their name.
+    """
+    bucketlist = db.session.query(BucketList.bucketlist_id).filter(
+        BucketList.bucketlist_id == list_id,
+        BucketList.created_by == g.user.user_id).first()
+    if not bucketlist:
+        return errors.not_found("The BucketList with the id: {0} doesn't"
+                                " exist.".format(list_id))
+
+    done = request.args.get('done')
+    if done is not None:
+        if done.lower() not in ('true', 'false'):
+            return errors.bad_request("The value of 'done' must be true or "
+                                      "false.")
+        done = done.lower() == 'true'
+    query = Items.in_bucketlist(list_id, done=done,
+                                prefix=request.args.get('prefix'))
+    return query.with_entities(*item_columns(g.fields))
+
+
 @main.route(
     '/bucketlists/<int:list_id>/items/', methods=['POST'], strict_slashes=False
 )
 @auth.login_required
-@json
+@json(fields=BUCKETLIST_FIELDS)
 def add_bucketlist_item(list_id):
     """
     Add new item.
@@ -146,11 +190,102 @@ def add_bucketlist_item(list_id):
     return bucketlist, 201
 
 
+def validate_items(bucketlist, entries):
+    """
+    Validate an array of new items.
+
+    Each entry is read with `Items.from_json`, its name must be a string that
+    fits the column, and it is checked against the items already in the
+    BucketList and earlier entries. Returns a result
+    for every entry and the items that can be created.
+    """
+    names = set(name for (name,) in db.session.query(Items.name).filter_by(
+        bucketlist_id=bucketlist.bucketlist_id))
+    results, items = [], []
+    for index, entry in enumerate(entries):
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError('Each item must be a JSON object.')
+            item = Items().from_json(entry)
+            if not isinstance(item.name, type(u'')) or \
+                    len(item.name) > MAX_NAME_LENGTH:
+                raise ValueError("The key 'name' must be a string of 1 to "
+                                 "{0} characters.".format(MAX_NAME_LENGTH))
+        except ValueError as e:
+            results.append({'index': index, 'status': 400, 'error': str(e)})
+            continue
+        except AttributeError:
+            results.append({'index': index, 'status': 400,
+                            'error': "The key 'done' must be a string."})
+            continue
+        if item.name in names:
+            results.append({'index': index, 'status': 409,
+                            'error': "An item with the name {0} exists."
+                            .format(item.name)})
+            continue
+        names.add(item.name)
+        item.bucketlist_id = bucketlist.bucketlist_id
+        results.append({'index': index, 'status': 201, 'name': item.name})
+        items.append(item)
+    return results, items
+
+
 @main.route(
-    '/bucketlists/<int:list_id>/items/<int:item_id>', methods=['PUT']
+    '/bucketlists/<int:list_id>/items/batch', methods=['POST']
 )
 @auth.login_required
 @json
+def add_bucketlist_items(list_id):
+    """
+    Add many items.
+
+    This function adds an array of items to a BucketList in one transaction.
+    Every item is validated and checked against the names that already exist
+    in the BucketList, and a result is returned for each item in the array.
+    """
+    bucketlist = BucketList.query.filter_by(bucketlist_id=list_id).first()
+
+    if not bucketlist or bucketlist.created_by != g.user.user_id:
+        return errors.not_found("The BucketList with the id: {0} doesn't"
+                                " exist.".format(list_id))
+
+    entries = request.json
+    if isinstance(entries, dict):
+        entries = entries.get('items')
+    if not isinstance(entries, list) or not entries:
+        return errors.bad_request("Only a JSON array of items is accepted.")
+    if len(entries) > current_app.config['MAX_BATCH_SIZE']:
+        return errors.bad_request(
+            "At most {0} items can be added at once.".format(
+                current_app.config['MAX_BATCH_SIZE']))
+
+    results, items = validate_items(bucketlist, entries)
+    if items:
+        try:
+            Items.insert_many(items)
+        except sqlalchemy.exc.IntegrityError:
+            db.session.rollback()
+            return errors.conflict("The items were changed by another "
+                                   "request. Please try again.")
+
+        # look up the created items to return them with their ids
+        created = dict((item.name, item.to_json()) for item in
+                       Items.query.filter(
+                           Items.bucketlist_id == bucketlist.bucketlist_id,
+                           Items.name.in_([each.name for each in items])))
+        for result in results:
+            if result['status'] == 201:
+                result['item'] = created[result.pop('name')]
+
+    return {'created': len(items), 'results': results}, \
+        201 if items else 200
+
+
+@main.route(
+    '/bucketlists/<int:list_id>/items/<int:item_id>', methods=['PUT']
+)
+@auth.login_required
+@json(fields=BUCKETLIST_FIELDS)
 def update_bucketlist_item(list_id, item_id):
     """
     Update item.
@@ -184,7 +319,7 @@ def update_bucketlist_item(list_id, item_id):
     '/bucketlists/<int:list_id>/items/<int:item_id>', methods=['DELETE']
 )
 @auth.login_required
-@json
+@json(fields=BUCKETLIST_FIELDS)
 def delete_bucketlist_item(list_id, item_id):
     """
     Delete an item.
@@ -205,6 +340,37 @@ def delete_bucketlist_item(list_id, item_id):
         return bucketlist, 200
 
 
+@main.route('/export', methods=['GET'])
+@auth.login_required
+def export():
+    """
+    Export all the BucketLists and items of the user.
+
+    The data is streamed as newline-delimited JSON while it is read, so the
+    export doesn't have to fit in memory.
+    """
+    return current_app.response_class(
+        stream_with_context(export_lines(g.user.user_id)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=export.ndjson'})
+
+
+@main.route('/import', methods=['POST'])
+@auth.login_required
+def import_bucketlists():
+    """
+    Import BucketLists and items for the user.
+
+    The request body is newline-delimited JSON in the format of the export
+    and is read line by line while the rows are inserted in chunks. The
+    progress and the errors of each line are streamed back as
+    newline-delimited JSON.
+    """
+    return current_app.response_class(
+        stream_with_context(import_lines(g.user.user_id, request.stream)),
+        mimetype='application/x-ndjson')
+
+
 @main.route('/login', methods=["POST"], strict_slashes=False)
 def login2():
     """
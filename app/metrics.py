@@ -0,0 +1,200 @@
+"""
+Define the Prometheus metrics of the application.
+
+With METRICS set, `/metrics` serves in the Prometheus text format:
+- The requests per endpoint, method and status, and their latency.
+- The requests in progress.
+- The SQL statements run per endpoint.
+- The token cache, connection pool and password hashing statistics.
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory before
+the workers start, so every worker writes its metrics there and `/metrics`
+adds them up whichever worker answers. `gunicorn_config.py` cleans up after
+workers that exit.
+"""
+import os
+import time
+
+from flask import current_app, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+    Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+
+from . import db
+from .cache import token_cache
+from .hashing import password_hasher
+from .pool import pool_stats
+
+# The upper bounds of the latency buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUESTS = Counter('http_requests_total', 'Requests handled.',
+                   ['endpoint', 'method', 'status'])
+LATENCY = Histogram('http_request_duration_seconds',
+                    'Time taken to handle requests.', ['endpoint'],
+                    buckets=LATENCY_BUCKETS)
+IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled.',
+                    multiprocess_mode='livesum')
+QUERIES = Counter('db_queries_total', 'SQL statements run.', ['endpoint'])
+
+# The statistics of the token cache, connection pool and password hasher,
+# copied to gauges by `refresh_stats`. The gauges of every live worker are
+# added up.
+STATS = {
+    'token_cache': (token_cache.stats, ('size', 'hits', 'misses')),
+    'db_pool': (lambda: pool_stats(db.engine),
+                ('size', 'checked_out', 'overflow', 'checkouts', 'timeouts',
+                 'invalidations', 'failed_pings', 'wait_seconds')),
+    'password_hash': (password_hasher.stats,
+                      ('in_flight', 'hashes', 'rejected', 'timeouts',
+                       'seconds'))
+}
+GAUGES = dict(((group, name), Gauge(
+    '{0}_{1}'.format(group, name), 'The {0} of the {1}.'.format(
+        name.replace('_', ' '), group.replace('_', ' ')),
+    multiprocess_mode='livesum'))
+    for group, (stats, names) in STATS.items() for name in names)
+
+# The last time this worker refreshed the statistics gauges.
+_last_refresh = [0.0]
+
+# The labelled metrics of each endpoint, method and status, cached since
+# looking them up through `labels` costs more than recording.
+_children = {}
+
+
+def init_app(app):
+    """
+    Set up the metrics of an application.
+
+    Without METRICS neither the hooks nor `/metrics` are installed.
+    """
+    if not app.config.get('METRICS'):
+        return
+
+    @app.before_first_request
+    def listen_to_engine():
+        """
+        Count the statements run by the engine of the application.
+
+        The engine is only created once the application is configured.
+        """
+        engine = db.get_engine(app)
+        if not event.contains(engine, 'after_cursor_execute', count_query):
+            event.listen(engine, 'after_cursor_execute', count_query)
+
+    app.before_request(start_request)
+    app.after_request(record_response)
+    app.teardown_request(end_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
+
+
+def start_request():
+    """
+    Start recording a request.
+
+    The request is in progress until it is torn down.
+    """
+    IN_PROGRESS.inc()
+    g.metrics = [time.time(), False]
+
+
+def record_response(response):
+    """
+    Record the response to a request.
+
+    The request is counted by status and its latency observed.
+    """
+    recording = g.get('metrics')
+    if recording is not None:
+        _record(response.status_code, time.time() - recording[0])
+        recording[1] = True
+    return response
+
+
+def end_request(exc):
+    """
+    Stop recording a request.
+
+    A request that raised an exception never got to `record_response`, so
+    it is recorded here as a 500.
+    """
+    recording = g.pop('metrics', None)
+    if recording is None:
+        return
+    if not recording[1]:
+        _record(500, time.time() - recording[0])
+    IN_PROGRESS.dec()
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    """
+    Count a statement.
+
+    The statement is counted for the endpoint of the current request.
+    """
+    endpoint = request.endpoint if has_request_context() else None
+    _child(QUERIES, endpoint or 'none').inc()
+
+
+def refresh_stats():
+    """
+    Copy the statistics of this worker to the gauges.
+
+    This is done when the metrics are read, and by every worker at most
+    once per METRICS_REFRESH_INTERVAL seconds as it handles requests.
+    """
+    for group, (stats, names) in STATS.items():
+        values = stats()
+        if values is None:
+            continue
+        for name in names:
+            GAUGES[group, name].set(values[name])
+
+
+def metrics():
+    """
+    Serve the metrics.
+
+    In multiprocess mode the metrics of every worker are read from the
+    shared directory and added up.
+    """
+    refresh_stats()
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), 200, {
+        'Content-Type': CONTENT_TYPE_LATEST}
+
+
+def _record(status, seconds):
+    """
+    Record a request.
+
+    Requests that didn't match a route are recorded under 'none'. The
+    statistics gauges are refreshed when METRICS_REFRESH_INTERVAL has
+    passed.
+    """
+    current = request._get_current_object()
+    endpoint = current.endpoint or 'none'
+    _child(REQUESTS, endpoint, current.method, str(status)).inc()
+    _child(LATENCY, endpoint).observe(seconds)
+    now = time.time()
+    if now - _last_refresh[0] >= \
+            current_app.config['METRICS_REFRESH_INTERVAL']:
+        _last_refresh[0] = now
+        refresh_stats()
+
+
+def _child(metric, *labels):
+    """
+    Get a labelled metric.
+
+    The metric is looked up once for every set of labels.
+    """
+    key = (metric,) + labels
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
@@ -4,15 +4,23 @@ Define SQLAlchemy models.
 The SQLAlchemy models for the database is defined here.
 """
 
-from datetime import datetime
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+import hashlib
+import hmac
+import os
 
 from flask import current_app, url_for
 from itsdangerous import (
     TimedJSONWebSignatureSerializer as Serializer,
     BadSignature, SignatureExpired)
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session
 
 from . import db
+from .cache import Identity, token_cache
+from .hashing import password_hasher
+from .transactions import save_changes
 
 
 class CRUDMixin(object):
@@ -24,28 +32,30 @@ class CRUDMixin(object):
     """
 
     date_created = db.Column(
-        db.DateTime, default=datetime.now(), nullable=False)
+        db.DateTime, default=datetime.now, nullable=False)
     date_modified = db.Column(
-        db.DateTime, default=datetime.now(),
-        onupdate=datetime.now(), nullable=False)
+        db.DateTime, default=datetime.now,
+        onupdate=datetime.now, nullable=False)
 
     def save(self):
         """
         Save to database.
 
-        Save instance of the object to database and commit.
+        Save instance of the object to database and commit, or only flush
+        it within the unit of work of a request.
         """
         db.session.add(self)
-        db.session.commit()
+        save_changes()
 
     def delete(self):
         """
         Delete from database.
 
-        Deletes instance of an object from database
+        Deletes instance of an object from database, committed right away or
+        with the unit of work of a request.
         """
         db.session.delete(self)
-        db.session.commit()
+        save_changes()
 
 
 class User(CRUDMixin, db.Model):
@@ -65,18 +75,20 @@ class User(CRUDMixin, db.Model):
         """
         Hash user password.
 
-        Passwords shouldn't be stored as string so we hash them.
+        Passwords shouldn't be stored as string so we hash them. The hash
+        is computed on the password hashing pool.
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.generate(password)
 
     def verify_password(self, password):
         """
         Verify password.
 
         Use the pwd_context to decrypt the password hash and confirm if it
-        matches the initial password set by the user.
+        matches the initial password set by the user. The check runs on the
+        password hashing pool.
         """
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
 
     def generate_auth_token(self, expiration=36000):
         """
@@ -84,8 +96,18 @@ class User(CRUDMixin, db.Model):
 
         This function generates a token to be used by the user for requests.
         """
+        return User.auth_token(self.user_id, expiration)
+
+    @staticmethod
+    def auth_token(user_id, expiration=36000):
+        """
+        Generate a token for a user id.
+
+        The token is signed without loading the user, e.g. when it is
+        refreshed.
+        """
         s = Serializer(current_app.config['SECRET_KEY'], expires_in=expiration)
-        return s.dumps({'id': self.user_id})
+        return s.dumps({'id': user_id})
 
     @staticmethod
     def verify_auth_token(token):
@@ -94,19 +116,49 @@ class User(CRUDMixin, db.Model):
 
         Verify that the token is valid and return the user id.
         """
+        user, expires_at = User.load_auth_token(token)
+        return user
+
+    @staticmethod
+    def load_auth_token(token):
+        """
+        Load the user and expiry time of a token.
+
+        Returns the user the token belongs to and the unix timestamp the
+        token expires at, or None for both if the token isn't valid.
+        """
         s = Serializer(current_app.config['SECRET_KEY'])
         try:
-            data = s.loads(token)
+            data, header = s.loads(token, return_header=True)
         except SignatureExpired:
-            return None
+            return None, None
 
             # valid token, but expired
         except BadSignature:
-            return None
+            return None, None
 
             # invalid token
         user = User.query.get(data['id'])
-        return user
+        return user, header['exp']
+
+    @staticmethod
+    def touch(connection, user_ids):
+        """
+        Mark users as modified.
+
+        This is done whenever one of the BucketLists of a user changes, so
+        the modification time of a user versions all their BucketLists.
+        """
+        connection.execute(User.__table__.update().where(
+            User.user_id.in_(user_ids)).values(date_modified=datetime.now()))
+
+    def identity(self):
+        """
+        Get the identity of the user.
+
+        Returns the lightweight identity stored in the token cache.
+        """
+        return Identity(self.user_id, self.username)
 
     def to_json(self):
         """
@@ -127,6 +179,128 @@ class User(CRUDMixin, db.Model):
         return '<User: {}>'.format(self.username)
 
 
+class RefreshToken(CRUDMixin, db.Model):
+    """
+    Set up the RefreshToken model.
+
+    A refresh token gets a user new auth tokens without sending their
+    password again. Only the HMAC of the token is stored, so the tokens
+    can't be used by someone reading the table, and a token is revoked by
+    marking it.
+    """
+
+    __tablename__ = 'refresh_tokens'
+    token_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer,
+                        db.ForeignKey('users.user_id', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    token_hash = db.Column(db.String(64), unique=True, index=True,
+                           nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime)
+
+    @staticmethod
+    def hash_token(token):
+        """
+        Hash a refresh token.
+
+        The token is random, so an HMAC keyed with the SECRET_KEY is enough
+        to store it and is cheap to check, unlike a password hash.
+        """
+        key = current_app.config['SECRET_KEY']
+        if isinstance(key, type(u'')):
+            key = key.encode('utf-8')
+        if isinstance(token, type(u'')):
+            token = token.encode('utf-8')
+        return hmac.new(key, token, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def issue(user_id, expiration=None):
+        """
+        Issue a new refresh token for a user.
+
+        Returns the token, which is only known to the client from now on.
+        It expires after REFRESH_TOKEN_EXPIRATION seconds by default. The
+        tokens of the user that can't be used anymore are pruned first, so
+        logging in again and again doesn't grow the table.
+        """
+        if expiration is None:
+            expiration = current_app.config['REFRESH_TOKEN_EXPIRATION']
+        RefreshToken.prune(user_id)
+        token = urlsafe_b64encode(os.urandom(32)).rstrip(b'=').decode('ascii')
+        expires_at = datetime.now() + timedelta(seconds=expiration)
+        RefreshToken(user_id=user_id,
+                     token_hash=RefreshToken.hash_token(token),
+                     expires_at=expires_at).save()
+        return token
+
+    @staticmethod
+    def prune(user_id):
+        """
+        Delete the expired and revoked refresh tokens of a user.
+
+        The tokens are deleted with one statement through the user's index.
+        """
+        RefreshToken.query.filter(
+            RefreshToken.user_id == user_id,
+            (RefreshToken.expires_at <= datetime.now()) |
+            (RefreshToken.revoked_at.isnot(None))
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def find(token):
+        """
+        Find the refresh token a client sent.
+
+        Returns None when the token isn't a string, doesn't exist, has
+        expired or was revoked.
+        """
+        if not token or not isinstance(token, (type(u''), bytes)):
+            return None
+        refresh_token = RefreshToken.query.filter_by(
+            token_hash=RefreshToken.hash_token(token)).first()
+        if refresh_token is None or not refresh_token.is_active():
+            return None
+        return refresh_token
+
+    @staticmethod
+    def revoke_user(connection, user_id):
+        """
+        Revoke all the refresh tokens of a user.
+
+        This is done when the password of the user changes.
+        """
+        table = RefreshToken.__table__
+        connection.execute(table.update().where(
+            (table.c.user_id == user_id) & (table.c.revoked_at.is_(None))
+        ).values(revoked_at=datetime.now()))
+
+    def is_active(self):
+        """
+        Check if the token can be used.
+
+        A token can be used until it expires or is revoked.
+        """
+        return self.revoked_at is None and self.expires_at > datetime.now()
+
+    def revoke(self):
+        """
+        Revoke the token.
+
+        The token can't be used to refresh auth tokens anymore.
+        """
+        self.revoked_at = datetime.now()
+        self.save()
+
+    def __repr__(self):
+        """
+        Display the object.
+
+        Displays the string representation of the RefreshToken object.
+        """
+        return '<RefreshToken: {}>'.format(self.token_id)
+
+
 class BucketList(CRUDMixin, db.Model):
     """
     Set up the BucketList model.
@@ -139,32 +313,120 @@ class BucketList(CRUDMixin, db.Model):
         super(BucketList, self).__init__(**kwargs)
 
     __table_args__ = (db.UniqueConstraint(
-        'name', 'created_by', name='unique_constraint_bucketlist'),)
+        'name', 'created_by', name='unique_constraint_bucketlist'),
+        db.Index('ix_bucketlist_created_by_bucketlist_id',
+                 'created_by', 'bucketlist_id'))
     __tablename__ = 'bucketlist'
     bucketlist_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.user_id'),
                            nullable=False)
+    item_count = db.Column(db.Integer, nullable=False, default=0,
+                           server_default='0')
+    done_count = db.Column(db.Integer, nullable=False, default=0,
+                           server_default='0')
     items = db.relationship('Items', backref="bucketlist",
                             cascade="all, delete-orphan", lazy='dynamic')
 
-    def to_json(self):
+    def to_json(self, items=None, fields=None):
         """
         Display the object properties as a json object.
 
         Mold up all the properties of BucketList object into
-        an object for display.
+        an object for display. Items that have already been loaded can be
+        passed in to avoid querying the database for them again. Only the
+        `fields` given are displayed, and the items are only queried when
+        they are among them.
         """
-        items = [item.to_json() for item in self.items]
-        return {
+        json = {
             'id': self.bucketlist_id,
             'name': self.name,
-            'items': items,
             'date_created': self.date_created,
             'date_modified': self.date_modified,
             'bucketlist_url': self.get_url(),
-            'created_by': self.created_by
+            'created_by': self.created_by,
+            'item_count': self.item_count,
+            'done_count': self.done_count
         }
+        if fields is None or 'items' in fields:
+            if items is None:
+                items = self.items
+            json['items'] = [item.to_json() for item in items]
+        if fields is not None:
+            json = dict((field, value) for field, value in json.items()
+                        if field in fields)
+        return json
+
+    def delete(self):
+        """
+        Delete from database.
+
+        The items of the BucketList are deleted with a single statement
+        first, instead of one at a time by the cascade with a counter update
+        for each of them.
+        """
+        db.session.execute(Items.__table__.delete().where(
+            Items.bucketlist_id == self.bucketlist_id))
+        super(BucketList, self).delete()
+
+    @staticmethod
+    def count_items(connection, counts):
+        """
+        Update the item counters of BucketLists.
+
+        `counts` maps BucketList ids to the change in their number of items
+        and of items done, e.g. `{1: (1, 0)}` for a new item that isn't done.
+        The counters are changed by a single executemany in the transaction
+        of the caller and the BucketLists are marked as modified.
+        """
+        if not counts:
+            return
+        table = BucketList.__table__
+        connection.execute(table.update().where(
+            table.c.bucketlist_id == bindparam('list_id')).values(
+            item_count=table.c.item_count + bindparam('items'),
+            done_count=table.c.done_count + bindparam('done'),
+            date_modified=datetime.now()), [
+            {'list_id': list_id, 'items': items, 'done': done}
+            for list_id, (items, done) in counts.items()])
+        owners = db.select([BucketList.created_by]).where(
+            BucketList.bucketlist_id.in_(list(counts)))
+        User.touch(connection, owners)
+
+    @staticmethod
+    def version(list_id, user_id):
+        """
+        Get the version of a BucketList.
+
+        Returns a string that changes whenever the BucketList or its items
+        change and the time of the latest change, without loading the
+        BucketList. None is returned if the user has no such BucketList.
+        Changes to the items update the modification time and counters of
+        the BucketList, so this is a single lookup by primary key.
+        """
+        row = db.session.query(
+            BucketList.date_modified, BucketList.item_count,
+            BucketList.done_count).filter(
+            BucketList.bucketlist_id == list_id,
+            BucketList.created_by == user_id).first()
+        if row is None:
+            return None
+        return 'bucketlist:{0}:{1}:{2}:{3}'.format(list_id, *row), \
+            row.date_modified
+
+    @staticmethod
+    def list_version(user_id):
+        """
+        Get the version of all the BucketLists of a user.
+
+        Returns a string that changes whenever a BucketList of the user is
+        created, deleted or modified (including changes to its items) and
+        the time of the latest change. The user is marked as modified on
+        each of those changes, so this is a single lookup by primary key.
+        """
+        modified = db.session.query(User.date_modified).filter_by(
+            user_id=user_id).scalar()
+        return 'bucketlists:{0}:{1}'.format(user_id, modified), modified
 
     def from_json(self, json):
         """
@@ -217,14 +479,19 @@ class Items(CRUDMixin, db.Model):
         super(Items, self).__init__(**kwargs)
 
     __table_args__ = (db.UniqueConstraint(
-        'name', 'bucketlist_id', name='unique_constraint_item'),)
+        'name', 'bucketlist_id', name='unique_constraint_item'),
+        db.Index('ix_items_bucketlist_id_item_id',
+                 'bucketlist_id', 'item_id'))
     __tablename__ = 'items'
     item_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
-    done = db.Column(db.Boolean, nullable=False)
-    bucketlist_id = db.Column(
-        db.Integer, db.ForeignKey('bucketlist.bucketlist_id'), nullable=False
-    )
+    # the previous values of these are needed to update the counters of
+    # the BucketLists when an item changes
+    done = db.column_property(
+        db.Column(db.Boolean, nullable=False), active_history=True)
+    bucketlist_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('bucketlist.bucketlist_id'),
+                  nullable=False), active_history=True)
 
     def to_json(self):
         """
@@ -261,6 +528,44 @@ class Items(CRUDMixin, db.Model):
                 'keys allowed'.format(json.keys()))
         return self
 
+    @staticmethod
+    def in_bucketlist(list_id, done=None, prefix=None):
+        """
+        Query the items of a BucketList.
+
+        The items can be filtered by their done value and by the start of
+        their name. The query is ordered by id, which the
+        (bucketlist_id, item_id) index serves without sorting.
+        """
+        query = Items.query.filter(Items.bucketlist_id == list_id)
+        if done is not None:
+            query = query.filter(Items.done == done)
+        if prefix:
+            escaped = prefix.replace('\\', '\\\\').replace(
+                '%', '\\%').replace('_', '\\_')
+            query = query.filter(Items.name.like(escaped + '%', escape='\\'))
+        return query.order_by(Items.item_id)
+
+    @staticmethod
+    def insert_many(items):
+        """
+        Insert many items at once.
+
+        The items are written with a single executemany in the current
+        transaction, without loading them into the session, and the counters
+        of their BucketLists are updated. The caller is responsible for
+        committing.
+        """
+        columns = ['name', 'done', 'bucketlist_id', 'date_created',
+                   'date_modified']
+        db.session.execute(Items.__table__.insert(), [
+            dict((column, getattr(item, column)) for column in columns)
+            for item in items])
+        counts = {}
+        for item in items:
+            _add_count(counts, item.bucketlist_id, 1, item.done)
+        BucketList.count_items(db.session, counts)
+
     def get_url(self):
         """
         Get the URL for this instance.
@@ -279,3 +584,121 @@ class Items(CRUDMixin, db.Model):
         Displays the string representation of the Items object.
         """
         return '<Item: {}>'.format(self.name)
+
+
+@event.listens_for(User, 'after_delete')
+def invalidate_deleted_user(mapper, connection, target):
+    """
+    Drop the cached tokens of a deleted user.
+
+    The tokens of a deleted user must not authenticate requests anymore.
+    """
+    token_cache.invalidate_user(target.user_id)
+
+
+@event.listens_for(User, 'after_update')
+def invalidate_updated_user(mapper, connection, target):
+    """
+    Drop the cached tokens of a user whose password changed.
+
+    Tokens are verified against the database again after a password change
+    and the refresh tokens of the user are revoked.
+    """
+    if db.inspect(target).attrs.password_hash.history.has_changes():
+        token_cache.invalidate_user(target.user_id)
+        RefreshToken.revoke_user(connection, target.user_id)
+
+
+def _counted(target, list_ids):
+    """
+    Record the BucketLists whose counters changed in a flush.
+
+    The counters are changed in the database directly, so the BucketLists
+    loaded in the session are expired once the flush is done.
+    """
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault('counted_bucketlists', set()).update(list_ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def expire_counted_bucketlists(session, flush_context):
+    """
+    Expire the counters of BucketLists whose items changed.
+
+    Without this, a BucketList loaded before its items changed would show
+    its old counters until the session is committed.
+    """
+    mapper = db.inspect(BucketList)
+    for list_id in session.info.pop('counted_bucketlists', ()):
+        bucketlist = session.identity_map.get(
+            mapper.identity_key_from_primary_key((list_id,)))
+        if bucketlist is not None:
+            session.expire(bucketlist, ['item_count', 'done_count',
+                                        'date_modified'])
+
+
+def _add_count(counts, list_id, items, done):
+    """
+    Add a change to the item counters of a BucketList.
+
+    `done` is the done value of the item changed and `items` is 1 when the
+    item is added to the BucketList or -1 when it is removed.
+    """
+    total, total_done = counts.get(list_id, (0, 0))
+    counts[list_id] = (total + items, total_done + (items if done else 0))
+
+
+@event.listens_for(Items, 'after_insert')
+def count_inserted_item(mapper, connection, target):
+    """
+    Count a new item in its BucketList.
+
+    This runs in the same transaction as the insert of the item.
+    """
+    BucketList.count_items(
+        connection, {target.bucketlist_id: (1, 1 if target.done else 0)})
+    _counted(target, [target.bucketlist_id])
+
+
+@event.listens_for(Items, 'after_update')
+def count_updated_item(mapper, connection, target):
+    """
+    Update the counters of the BucketList of a changed item.
+
+    An item can change its done value or move to another BucketList. The
+    BucketList is marked as modified even when the counters don't change.
+    This runs in the same transaction as the update of the item.
+    """
+    attrs = db.inspect(target).attrs
+    done = attrs.done.history.deleted or [target.done]
+    list_id = attrs.bucketlist_id.history.deleted or [target.bucketlist_id]
+    counts = {}
+    _add_count(counts, list_id[0], -1, done[0])
+    _add_count(counts, target.bucketlist_id, 1, target.done)
+    BucketList.count_items(connection, counts)
+    _counted(target, counts)
+
+
+@event.listens_for(Items, 'after_delete')
+def count_deleted_item(mapper, connection, target):
+    """
+    Stop counting a deleted item in its BucketList.
+
+    This runs in the same transaction as the delete of the item.
+    """
+    BucketList.count_items(
+        connection, {target.bucketlist_id: (-1, -1 if target.done else 0)})
+    _counted(target, [target.bucketlist_id])
+
+
+@event.listens_for(BucketList, 'after_insert')
+@event.listens_for(BucketList, 'after_update')
+@event.listens_for(BucketList, 'after_delete')
+def touch_owner(mapper, connection, target):
+    """
+    Mark the owner of a changed BucketList as modified.
+
+    This runs in the same transaction as the change to the BucketList.
+    """
+    User.touch(connection, [target.created_by])
@@ -0,0 +1,216 @@
+"""
+Define the database connection pool of the application.
+
+The pool is configured from the SQLALCHEMY_POOL_* settings:
+- SQLALCHEMY_POOL_SIZE and SQLALCHEMY_MAX_OVERFLOW bound the connections.
+- SQLALCHEMY_POOL_TIMEOUT is the most seconds a request waits for one.
+- SQLALCHEMY_POOL_RECYCLE replaces connections older than this many seconds.
+- SQLALCHEMY_POOL_PRE_PING tests connections before they are used.
+Checkouts, checkins and the time spent waiting for a connection are counted
+through pool events. SQLite keeps the pools Flask-SQLAlchemy picks for it.
+"""
+import threading
+import time
+
+from flask_sqlalchemy import SQLAlchemy as BaseSQLAlchemy
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics(object):
+    """
+    Set up the counters of a connection pool.
+
+    The counters only grow. The current state of the pool, e.g. the number
+    of connections checked out, is read from the pool itself.
+    """
+
+    def __init__(self):
+        """
+        Create the counters.
+
+        Every counter starts at zero.
+        """
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.failed_pings = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def listen(self, pool):
+        """
+        Count the events of a pool.
+
+        The counters are updated by listeners on the events of the pool.
+        """
+        event.listen(pool, 'connect', lambda *args: self.count('connects'))
+        event.listen(pool, 'checkout', lambda *args: self.count('checkouts'))
+        event.listen(pool, 'checkin', lambda *args: self.count('checkins'))
+        event.listen(pool, 'invalidate',
+                     lambda *args: self.count('invalidations'))
+
+    def count(self, counter):
+        """
+        Add one to a counter.
+
+        The counters are shared by every thread using the pool.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def wait(self, seconds):
+        """
+        Record the time spent waiting for a connection.
+
+        The total and the longest wait are kept.
+        """
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self, pool):
+        """
+        Get the pool statistics.
+
+        Returns the counters along with the size of the pool and the number
+        of connections checked out and in overflow.
+        """
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'invalidations': self.invalidations,
+            'failed_pings': self.failed_pings,
+            'timeouts': self.timeouts,
+            'wait_seconds': self.wait_seconds,
+            'max_wait_seconds': self.max_wait_seconds
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    Set up a queue pool that counts its use.
+
+    The pool works like the SQLAlchemy QueuePool and keeps PoolMetrics. With
+    `pre_ping`, connections are tested with a `SELECT 1` when checked out
+    and replaced if the database dropped them.
+    """
+
+    def __init__(self, creator, pre_ping=False, **kwargs):
+        """
+        Create the pool.
+
+        The listeners are registered once, a recreated pool shares them and
+        the metrics of the pool it replaces.
+        """
+        super(InstrumentedQueuePool, self).__init__(creator, **kwargs)
+        self.pre_ping = pre_ping
+        self.metrics = PoolMetrics()
+        if '_dispatch' not in kwargs:
+            self.metrics.listen(self)
+            if pre_ping:
+                event.listen(self, 'checkout', self._ping)
+
+    def recreate(self):
+        """
+        Create a new pool with the same settings.
+
+        This is done when the engine is disposed of.
+        """
+        pool = super(InstrumentedQueuePool, self).recreate()
+        pool.pre_ping = self.pre_ping
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self):
+        """
+        Get the pool statistics.
+
+        Returns the counters and state of the pool.
+        """
+        return self.metrics.stats(self)
+
+    def _do_get(self):
+        """
+        Check out a connection.
+
+        The time spent waiting for it is recorded, and so is a timeout.
+        """
+        start = time.time()
+        try:
+            return super(InstrumentedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            self.metrics.count('timeouts')
+            raise
+        finally:
+            self.metrics.wait(time.time() - start)
+
+    def _ping(self, dbapi_connection, connection_record, connection_proxy):
+        """
+        Test a connection before it is used.
+
+        A connection the database dropped raises DisconnectionError, which
+        makes the pool replace it and try again.
+        """
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except Exception:
+            self.metrics.count('failed_pings')
+            raise exc.DisconnectionError()
+
+
+class SQLAlchemy(BaseSQLAlchemy):
+    """
+    Set up Flask-SQLAlchemy with the instrumented pool.
+
+    Databases other than SQLite use an InstrumentedQueuePool configured from
+    the SQLALCHEMY_POOL_* settings.
+    """
+
+    def apply_pool_defaults(self, app, options):
+        """
+        Leave the pool options out of the defaults.
+
+        They are set by `apply_driver_hacks` once the database is known.
+        """
+
+    def apply_driver_hacks(self, app, info, options):
+        """
+        Set the engine options for a database.
+
+        SQLite keeps the pools set by Flask-SQLAlchemy, the other databases
+        get the instrumented pool.
+        """
+        super(SQLAlchemy, self).apply_driver_hacks(app, info, options)
+        if info.drivername.startswith('sqlite'):
+            return
+        options['poolclass'] = InstrumentedQueuePool
+        options['pre_ping'] = app.config.get('SQLALCHEMY_POOL_PRE_PING',
+                                             False)
+        settings = [('pool_size', 'SQLALCHEMY_POOL_SIZE'),
+                    ('max_overflow', 'SQLALCHEMY_MAX_OVERFLOW'),
+                    ('pool_timeout', 'SQLALCHEMY_POOL_TIMEOUT'),
+                    ('pool_recycle', 'SQLALCHEMY_POOL_RECYCLE')]
+        for option, setting in settings:
+            if app.config.get(setting) is not None:
+                options[option] = app.config[setting]
+
+
+def pool_stats(engine):
+    """
+    Get the statistics of the pool of an engine.
+
+    Returns None when the engine doesn't use the instrumented pool.
+    """
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        return engine.pool.stats()
+    return None
@@ -0,0 +1,155 @@
+"""
+Define the search index for BucketLists.
+
+BucketList names are indexed with trigrams so that the `q` filter of the API
+finds names containing the search text without scanning every BucketList:
+- SQLite uses an FTS5 table with the trigram tokenizer kept in sync by
+  triggers.
+- PostgreSQL uses a pg_trgm GIN index on the name column.
+Any other database, or search text shorter than a trigram, falls back to a
+plain LIKE filter.
+"""
+from weakref import WeakKeyDictionary
+
+from flask import current_app
+from sqlalchemy import column, event, func, table
+
+from . import db
+from .models import BucketList
+
+# The shortest search text the trigram indexes can match.
+MIN_SEARCH_LENGTH = 3
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS bucketlist_fts USING fts5("
+    "name, content='bucketlist', content_rowid='bucketlist_id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS bucketlist_fts_insert "
+    "AFTER INSERT ON bucketlist BEGIN "
+    "INSERT INTO bucketlist_fts(rowid, name) "
+    "VALUES (new.bucketlist_id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS bucketlist_fts_delete "
+    "AFTER DELETE ON bucketlist BEGIN "
+    "INSERT INTO bucketlist_fts(bucketlist_fts, rowid, name) "
+    "VALUES ('delete', old.bucketlist_id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS bucketlist_fts_update "
+    "AFTER UPDATE OF name ON bucketlist BEGIN "
+    "INSERT INTO bucketlist_fts(bucketlist_fts, rowid, name) "
+    "VALUES ('delete', old.bucketlist_id, old.name); "
+    "INSERT INTO bucketlist_fts(rowid, name) "
+    "VALUES (new.bucketlist_id, new.name); END",
+    "INSERT INTO bucketlist_fts(bucketlist_fts) VALUES ('rebuild')"
+]
+
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS bucketlist_fts"
+]
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_bucketlist_name_trgm "
+    "ON bucketlist USING gin (name gin_trgm_ops)"
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS ix_bucketlist_name_trgm"
+]
+
+bucketlist_fts = table('bucketlist_fts', column('rowid'), column('rank'),
+                       column('bucketlist_fts'))
+
+# Whether the SQLite search index exists, for each engine.
+_fts_tables = WeakKeyDictionary()
+
+
+def sqlite_supports_fts(connection):
+    """
+    Check if SQLite can build the search index.
+
+    The trigram tokenizer needs FTS5 and SQLite 3.34 or newer.
+    """
+    if connection.dialect.dbapi.sqlite_version_info < (3, 34, 0):
+        return False
+    options = [row[0] for row in connection.execute('PRAGMA compile_options')]
+    return 'ENABLE_FTS5' in options
+
+
+def index_statements(connection, drop=False):
+    """
+    Get the statements that create or drop the search index.
+
+    Returns an empty list when the database can't be indexed.
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite' and sqlite_supports_fts(connection):
+        return SQLITE_DROP if drop else SQLITE_CREATE
+    if dialect == 'postgresql':
+        return POSTGRES_DROP if drop else POSTGRES_CREATE
+    return []
+
+
+@event.listens_for(BucketList.__table__, 'after_create')
+def create_search_index(target, connection, **kwargs):
+    """
+    Create the search index.
+
+    The index is created along with the bucketlist table, e.g by
+    `db.create_all()`.
+    """
+    statements = index_statements(connection)
+    for statement in statements:
+        connection.execute(statement)
+    if connection.dialect.name == 'sqlite':
+        _fts_tables[connection.engine] = bool(statements)
+
+
+@event.listens_for(BucketList.__table__, 'before_drop')
+def drop_search_index(target, connection, **kwargs):
+    """
+    Drop the search index.
+
+    The index is dropped along with the bucketlist table, e.g by
+    `db.drop_all()`.
+    """
+    for statement in index_statements(connection, drop=True):
+        connection.execute(statement)
+    if connection.dialect.name == 'sqlite':
+        _fts_tables[connection.engine] = False
+
+
+def search_bucketlists(query, q):
+    """
+    Filter a BucketList query by name.
+
+    Returns the BucketLists whose name contains the search text, ordered by
+    relevance when the search index can be used.
+    """
+    dialect = db.engine.dialect.name
+    if len(q) < MIN_SEARCH_LENGTH or \
+            not current_app.config['SEARCH_USE_INDEX']:
+        dialect = None
+
+    if dialect == 'sqlite' and _has_fts_table(db.engine):
+        phrase = '"{0}"'.format(q.replace('"', '""'))
+        return query.join(
+            bucketlist_fts,
+            bucketlist_fts.c.rowid == BucketList.bucketlist_id).filter(
+            bucketlist_fts.c.bucketlist_fts.match(phrase)).order_by(
+            bucketlist_fts.c.rank)
+
+    query = query.filter(BucketList.name.contains(q))
+    if dialect == 'postgresql':
+        query = query.order_by(func.similarity(BucketList.name, q).desc())
+    return query
+
+
+def _has_fts_table(engine):
+    """
+    Check if the SQLite search index exists.
+
+    The index is looked up once for databases that weren't created by this
+    process, e.g. ones set up by the migrations.
+    """
+    if engine not in _fts_tables:
+        _fts_tables[engine] = engine.has_table('bucketlist_fts')
+    return _fts_tables[engine]
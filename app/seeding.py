@@ -0,0 +1,185 @@
+"""
+Define the generation of synthetic data.
+
+Users, BucketLists and items are generated in batches and written with bulk
+inserts, one transaction per batch, so millions of rows take minutes:
+- Every user shares one password hash, computed once.
+- The ids are assigned after the largest ids in the database, so the data
+  can be added to a database that isn't empty. On PostgreSQL the id
+  sequences are then moved past the seeded rows, so the API can go on
+  inserting.
+- The names and done flags come from a seeded random generator, so the same
+  seed gives the same data.
+The BucketList item counters are written along with the BucketLists.
+"""
+from datetime import datetime
+import random
+import time
+
+from sqlalchemy import func, text
+
+from . import db
+from .hashing import password_hasher
+from .models import User, BucketList, Items
+
+# The tables seeded with explicit ids, and their id columns.
+SEQUENCES = ((User.__table__, 'user_id'),
+             (BucketList.__table__, 'bucketlist_id'))
+
+WORDS = ['travel', 'learn', 'visit', 'climb', 'cook', 'write', 'swim',
+         'mountain', 'guitar', 'novel', 'marathon', 'paris', 'lagos',
+         'jollof', 'ocean', 'desert', 'language', 'painting', 'garden']
+
+
+class Seeder(object):
+    """
+    Set up the generation of synthetic data.
+
+    Rows are collected per table and inserted once `batch_size` rows are
+    pending. The rows written to each table are counted.
+    """
+
+    def __init__(self, seed=0, batch_size=10000, password='password',
+                 prefix='user', progress=None):
+        """
+        Create the generator.
+
+        `progress` is called with the counts after each batch.
+        """
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.password = password
+        self.prefix = prefix
+        self.progress = progress
+        self.counts = {'users': 0, 'bucketlists': 0, 'items': 0}
+        self._rows = {'users': [], 'bucketlists': [], 'items': []}
+        self._pending = 0
+
+    def run(self, users, lists_per_user, items_per_list):
+        """
+        Generate the data.
+
+        Returns the number of rows written to each table.
+        """
+        password_hash = password_hasher.generate(self.password)
+        now = datetime.now()
+        user_id = _max_id(User.user_id)
+        list_id = _max_id(BucketList.bucketlist_id)
+        for each in range(users):
+            user_id += 1
+            self.add('users', {
+                'user_id': user_id,
+                'username': '{0}{1}'.format(self.prefix, user_id),
+                'password_hash': password_hash,
+                'date_created': now, 'date_modified': now})
+            for index in range(lists_per_user):
+                list_id += 1
+                self.add_bucketlist(list_id, user_id, items_per_list, now)
+        self.flush()
+        _reset_sequences()
+        return self.counts
+
+    def add_bucketlist(self, list_id, user_id, items, now):
+        """
+        Add a BucketList and its items.
+
+        About half of the items are done.
+        """
+        done = [self.rng.random() < 0.5 for each in range(items)]
+        self.add('bucketlists', {
+            'bucketlist_id': list_id,
+            'name': '{0} {1}'.format(' '.join(self.rng.sample(WORDS, 3)),
+                                     list_id),
+            'created_by': user_id,
+            'item_count': items, 'done_count': sum(done),
+            'date_created': now, 'date_modified': now})
+        for index, item_done in enumerate(done):
+            self.add('items', {
+                'name': 'Item {0}'.format(index + 1),
+                'done': item_done,
+                'bucketlist_id': list_id,
+                'date_created': now, 'date_modified': now})
+
+    def add(self, table, row):
+        """
+        Add a row to be inserted.
+
+        The pending rows are inserted once there are `batch_size` of them.
+        """
+        self._rows[table].append(row)
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Insert the pending rows.
+
+        The rows of a batch are inserted in one transaction, parents first.
+        """
+        if not self._pending:
+            return
+        tables = [('users', User.__table__),
+                  ('bucketlists', BucketList.__table__),
+                  ('items', Items.__table__)]
+        with db.engine.begin() as connection:
+            for name, table in tables:
+                rows = self._rows[name]
+                if rows:
+                    connection.execute(table.insert(), rows)
+                    self.counts[name] += len(rows)
+                    self._rows[name] = []
+        self._pending = 0
+        if self.progress is not None:
+            self.progress(self.counts)
+
+
+def seed(users, lists_per_user, items_per_list, report=None, **kwargs):
+    """
+    Generate synthetic users, BucketLists and items.
+
+    The options of Seeder can be given as keywords. When `report` is given,
+    it is called with a line of progress after each batch, including the
+    rows written per second. Returns the number of rows written to each
+    table.
+    """
+    start = time.time()
+
+    def progress(counts):
+        total = sum(counts.values())
+        seconds = time.time() - start
+        report('{0} users, {1} bucketlists, {2} items: {3} rows in '
+               '{4:.1f}s ({5:.0f} rows/s)'.format(
+                   counts['users'], counts['bucketlists'], counts['items'],
+                   total, seconds, total / seconds if seconds else 0))
+
+    seeder = Seeder(progress=progress if report else None, **kwargs)
+    return seeder.run(users, lists_per_user, items_per_list)
+
+
+def _max_id(column):
+    """
+    Get the largest id of a table.
+
+    Returns 0 for an empty table.
+    """
+    return db.session.query(func.max(column)).scalar() or 0
+
+
+def _reset_sequences():
+    """
+    Move the id sequences past the seeded rows.
+
+    Explicit ids don't advance the sequences PostgreSQL uses for SERIAL
+    columns, so the next insert through the models would reuse a seeded id.
+    Other databases assign ids after the largest one and are left alone.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.begin() as connection:
+        for table, column in SEQUENCES:
+            connection.execute(text(
+                'SELECT setval(pg_get_serial_sequence(:table, :column), '
+                'coalesce(max({1}), 1), max({1}) IS NOT NULL) '
+                'FROM {0}'.format(table.name, column)),
+                table=table.name, column=column)
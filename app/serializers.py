@@ -0,0 +1,230 @@
+"""
+Define the column-level serializers of the application.
+
+Read-only endpoints select the columns they need as plain rows instead of
+loading model instances, and the rows are turned into the same json objects
+`to_json` produces for the models. Clients can ask for some of the fields
+only, in which case only the columns of those fields are selected.
+"""
+from flask import request, url_for
+
+from . import db
+from .models import BucketList, Items
+
+# The columns needed to display a BucketList.
+BUCKETLIST_COLUMNS = (
+    BucketList.bucketlist_id, BucketList.name, BucketList.date_created,
+    BucketList.date_modified, BucketList.created_by, BucketList.item_count,
+    BucketList.done_count)
+
+# The columns needed to display an item.
+ITEM_COLUMNS = (
+    Items.item_id, Items.name, Items.done, Items.date_created,
+    Items.date_modified, Items.bucketlist_id)
+
+# The fields of a displayed BucketList and the column of each, if any.
+BUCKETLIST_FIELDS = (
+    'id', 'name', 'items', 'date_created', 'date_modified', 'bucketlist_url',
+    'created_by', 'item_count', 'done_count')
+_BUCKETLIST_FIELD_COLUMNS = {
+    'name': BucketList.name,
+    'date_created': BucketList.date_created,
+    'date_modified': BucketList.date_modified,
+    'created_by': BucketList.created_by,
+    'item_count': BucketList.item_count,
+    'done_count': BucketList.done_count
+}
+
+# The fields of a displayed item and the column of each, if any.
+ITEM_FIELDS = ('id', 'name', 'done', 'date_created', 'date_modified')
+_ITEM_FIELD_COLUMNS = {
+    'name': Items.name,
+    'done': Items.done,
+    'date_created': Items.date_created,
+    'date_modified': Items.date_modified
+}
+
+# The fields that hold the items of a BucketList or their counters.
+COUNTERS = ('item_count', 'done_count')
+INCLUDE_ITEMS = ('false', 'count', 'all')
+
+# A value that can't otherwise appear in a URL, used to build URL templates.
+_PLACEHOLDER = 9876543210123
+
+
+def url_template(endpoint, key):
+    """
+    Build the URL of an endpoint once for many values.
+
+    Returns a function that makes the external URL of the endpoint for a
+    value of the URL parameter `key`, without going through `url_for` again.
+    """
+    url = url_for(endpoint, _external=True, **{key: _PLACEHOLDER})
+    before, after = url.split(str(_PLACEHOLDER), 1)
+    return lambda value: '{0}{1}{2}'.format(before, value, after)
+
+
+def item_to_json(row):
+    """
+    Display an item row as a json object.
+
+    The json object is the same as the one `Items.to_json` returns.
+    """
+    return {
+        'id': row.item_id,
+        'name': row.name,
+        'done': row.done,
+        'date_created': row.date_created,
+        'date_modified': row.date_modified
+    }
+
+
+def requested_fields(available):
+    """
+    Get the fields of a resource requested by the client.
+
+    `fields` is a comma separated list of the fields wanted and
+    `include_items` is one of INCLUDE_ITEMS:
+    - 'all' adds the items and their counters.
+    - 'count' leaves the items out but keeps their counters.
+    - 'false' leaves the items and their counters out.
+    `summary=true` is the same as `include_items=count`. Returns the set of
+    fields wanted out of the `available` ones, or None when every field is
+    wanted. A ValueError is raised for fields that aren't available or an
+    empty list of fields.
+    """
+    fields = request.args.get('fields')
+    include_items = request.args.get('include_items')
+    if include_items is None and \
+            request.args.get('summary', '').lower() == 'true':
+        include_items = 'count'
+    if fields is None and include_items is None:
+        return None
+
+    selected = set(available)
+    if fields is not None:
+        selected = set(each.strip() for each in fields.split(',')
+                       if each.strip())
+        if not selected:
+            raise ValueError('No fields were requested. The fields available '
+                             'are: {0}.'.format(', '.join(available)))
+        unknown = selected - set(available)
+        if unknown:
+            raise ValueError('Unknown fields: {0}. The fields available '
+                             'are: {1}.'.format(', '.join(sorted(unknown)),
+                                                ', '.join(available)))
+
+    if include_items is not None:
+        include_items = include_items.lower()
+        if include_items not in INCLUDE_ITEMS:
+            raise ValueError('include_items must be one of: {0}.'.format(
+                ', '.join(INCLUDE_ITEMS)))
+        if include_items == 'all':
+            selected.update(('items',) + COUNTERS)
+        elif include_items == 'count':
+            selected.discard('items')
+            selected.update(COUNTERS)
+        else:
+            selected.difference_update(('items',) + COUNTERS)
+    return frozenset(selected.intersection(available))
+
+
+def _field_columns(key, available, field_columns, fields):
+    """
+    Get the columns needed to display some of the fields of a resource.
+
+    The `key` column is always selected, followed by the columns of the
+    `fields` wanted in the order of the `available` fields.
+    """
+    columns = [key]
+    for field in available:
+        column = field_columns.get(field)
+        if field in fields and column is not None:
+            columns.append(column)
+    return columns
+
+
+def bucketlist_columns(fields=None):
+    """
+    Get the columns needed to display BucketLists.
+
+    Returns the columns for the `fields` wanted, or all the
+    BUCKETLIST_COLUMNS when every field is wanted. The id is always selected
+    since the URL, the items and cursors depend on it.
+    """
+    if fields is None:
+        return BUCKETLIST_COLUMNS
+    return _field_columns(BucketList.bucketlist_id, BUCKETLIST_FIELDS,
+                          _BUCKETLIST_FIELD_COLUMNS, fields)
+
+
+def item_columns(fields=None):
+    """
+    Get the columns needed to display items.
+
+    Returns the columns for the `fields` wanted, or all the ITEM_COLUMNS
+    when every field is wanted. The id is always selected for cursors.
+    """
+    if fields is None:
+        return ITEM_COLUMNS
+    return _field_columns(Items.item_id, ITEM_FIELDS, _ITEM_FIELD_COLUMNS,
+                          fields)
+
+
+def items_to_json(rows, fields=None):
+    """
+    Display item rows as json objects.
+
+    The rows hold the `item_columns` of the `fields` wanted and the json
+    objects are the same as the ones `Items.to_json` returns, with only
+    those fields.
+    """
+    if fields is None:
+        return [item_to_json(row) for row in rows]
+    values = {
+        'id': lambda row: row.item_id,
+        'name': lambda row: row.name,
+        'done': lambda row: row.done,
+        'date_created': lambda row: row.date_created,
+        'date_modified': lambda row: row.date_modified
+    }
+    values = dict((field, value) for field, value in values.items()
+                  if field in fields)
+    return [dict((field, value(row)) for field, value in values.items())
+            for row in rows]
+
+
+def bucketlists_to_json(rows, fields=None):
+    """
+    Display BucketList rows as json objects.
+
+    The rows hold the `bucketlist_columns` of the `fields` wanted. The items
+    of all the BucketLists are selected in one query, only when they are
+    wanted, and the json objects are the same as the ones
+    `BucketList.to_json` returns.
+    """
+    items = {}
+    ids = [row.bucketlist_id for row in rows]
+    if ids and (fields is None or 'items' in fields):
+        query = db.session.query(*ITEM_COLUMNS).filter(
+            Items.bucketlist_id.in_(ids)).order_by(Items.item_id)
+        for item in query:
+            items.setdefault(item.bucketlist_id, []).append(item_to_json(item))
+
+    bucketlist_url = url_template('main.get_bucketlist', 'list_id')
+    values = {
+        'id': lambda row: row.bucketlist_id,
+        'name': lambda row: row.name,
+        'items': lambda row: items.get(row.bucketlist_id, []),
+        'date_created': lambda row: row.date_created,
+        'date_modified': lambda row: row.date_modified,
+        'bucketlist_url': lambda row: bucketlist_url(row.bucketlist_id),
+        'created_by': lambda row: row.created_by,
+        'item_count': lambda row: row.item_count,
+        'done_count': lambda row: row.done_count
+    }
+    if fields is not None:
+        values = dict((field, value) for field, value in values.items()
+                      if field in fields)
+    return [dict((field, value(row)) for field, value in values.items())
+            for row in rows]
@@ -0,0 +1,250 @@
+"""
+Define the slow query log.
+
+With SLOW_QUERY_THRESHOLD set, every SQL statement that takes longer than
+that many seconds is logged as one JSON line on the `app.slow_queries`
+logger, with:
+- The statement and how long it took, and with SLOW_QUERY_LOG_PARAMETERS
+  its parameters, which can hold password hashes and token digests.
+- The method, path and endpoint of the request that ran it, and the id of
+  the authenticated user.
+- With SLOW_QUERY_EXPLAIN, the plan of the statement.
+So the log can't slow down the API when the database does, a share of the
+slow statements given by SLOW_QUERY_SAMPLE_RATE is logged, at most
+SLOW_QUERY_LOG_RATE lines per second. Statements left out by the rate limit
+are counted in the next line logged.
+"""
+import json
+import logging
+import random
+import threading
+import time
+
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from . import db
+
+logger = logging.getLogger('app.slow_queries')
+
+# The longest parameters logged, in characters.
+MAX_PARAMETERS_LENGTH = 500
+
+# The statement that shows the plan of a statement on each dialect, and on
+# every other dialect, with SLOW_QUERY_EXPLAIN set to 'analyze'.
+EXPLAIN = {'sqlite': 'EXPLAIN QUERY PLAN '}
+EXPLAIN_ANALYZE = {'sqlite': 'EXPLAIN QUERY PLAN ',
+                   'postgresql': 'EXPLAIN ANALYZE ',
+                   'mysql': 'EXPLAIN ANALYZE '}
+
+
+class RateLimiter(object):
+    """
+    Set up a token bucket.
+
+    Tokens are added at `rate` per second, up to `burst` tokens.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Create a bucket.
+
+        The bucket starts full.
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """
+        Take a token.
+
+        Returns False when the bucket is empty.
+        """
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class SlowQueryLog(object):
+    """
+    Set up the slow query log of an application.
+
+    The statements logged and the ones left out are counted.
+    """
+
+    def __init__(self, threshold, sample_rate=1.0, log_rate=1, explain=None,
+                 log_parameters=False):
+        """
+        Create the log.
+
+        `explain` is None, 'explain' or 'analyze'.
+        """
+        self.threshold = threshold
+        self.log_parameters = log_parameters
+        self.sample_rate = sample_rate
+        self.limiter = RateLimiter(log_rate)
+        self.explain = explain
+        self.logged = 0
+        self.skipped = 0
+        self.suppressed = 0
+
+    def before(self, conn, cursor, statement, parameters, context,
+               executemany):
+        """
+        Record the time a statement starts.
+
+        The start time is kept on the execution context of the statement, so
+        nothing is left behind on the connection when the statement fails.
+        The probes the dialect runs on its first connection have no context
+        and aren't timed.
+        """
+        if context is not None:
+            context._slow_query_start = time.time()
+
+    def after(self, conn, cursor, statement, parameters, context,
+              executemany):
+        """
+        Log a statement that took longer than the threshold.
+
+        Sampling comes first, so the statements sampled out don't take from
+        the rate limit.
+        """
+        start = getattr(context, '_slow_query_start', None)
+        if start is None:
+            return
+        seconds = time.time() - start
+        if seconds < self.threshold:
+            return
+        if random.random() >= self.sample_rate:
+            self.skipped += 1
+            return
+        if not self.limiter.allow():
+            self.suppressed += 1
+            return
+        suppressed, self.suppressed = self.suppressed, 0
+        self.logged += 1
+        entry = {
+            'duration_ms': round(seconds * 1000, 2),
+            'statement': statement,
+            'parameters': _format_parameters(parameters)
+            if self.log_parameters else None,
+            'executemany': executemany,
+            'suppressed': suppressed
+        }
+        entry.update(_request_details())
+        if self.explain and not executemany:
+            entry['plan'] = self.plan(conn, statement, parameters)
+        logger.warning(json.dumps(entry, sort_keys=True, default=str))
+
+    def plan(self, conn, statement, parameters):
+        """
+        Get the plan of a statement.
+
+        Only SELECT statements are explained, since EXPLAIN ANALYZE runs the
+        statement again. The plan is read on a cursor of its own, so it isn't
+        logged or timed itself. On PostgreSQL it runs in a savepoint, so a
+        failure doesn't abort the transaction of the request. Returns the
+        rows of the plan, or the error that stopped it.
+        """
+        if statement.lstrip()[:6].upper() != 'SELECT':
+            return None
+        dialect = conn.dialect.name
+        prefixes = EXPLAIN_ANALYZE if self.explain == 'analyze' else EXPLAIN
+        prefix = prefixes.get(dialect, 'EXPLAIN ')
+        savepoint = dialect == 'postgresql'
+        cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute('SAVEPOINT slow_query_plan')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = [' '.join(str(column) for column in row)
+                        for row in cursor.fetchall()]
+            except Exception as error:
+                if savepoint:
+                    cursor.execute('ROLLBACK TO SAVEPOINT slow_query_plan')
+                return 'EXPLAIN failed: {0}'.format(error)
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT slow_query_plan')
+            return rows
+        finally:
+            cursor.close()
+
+    def stats(self):
+        """
+        Get the statistics of the log.
+
+        `skipped` counts the slow statements sampled out and `suppressed`
+        the ones waiting to be reported as rate limited.
+        """
+        return {'logged': self.logged, 'skipped': self.skipped,
+                'suppressed': self.suppressed}
+
+
+def init_app(app):
+    """
+    Set up the slow query log of an application.
+
+    Without SLOW_QUERY_THRESHOLD no listeners are installed, so statements
+    don't pay for them.
+    """
+    threshold = app.config.get('SLOW_QUERY_THRESHOLD')
+    if not threshold:
+        return
+    explain = app.config.get('SLOW_QUERY_EXPLAIN') or None
+    if explain not in (None, 'explain', 'analyze'):
+        raise ValueError('SLOW_QUERY_EXPLAIN must be "explain" or "analyze"')
+    log = app.extensions['slow_query_log'] = SlowQueryLog(
+        threshold, app.config.get('SLOW_QUERY_SAMPLE_RATE', 1.0),
+        app.config.get('SLOW_QUERY_LOG_RATE', 1), explain,
+        app.config.get('SLOW_QUERY_LOG_PARAMETERS', False))
+
+    @app.before_first_request
+    def listen_to_engine():
+        """
+        Time the statements run by the engine of the application.
+
+        The engine is only created once the application is configured.
+        """
+        engine = db.get_engine(app)
+        if not event.contains(engine, 'before_cursor_execute', log.before):
+            event.listen(engine, 'before_cursor_execute', log.before)
+            event.listen(engine, 'after_cursor_execute', log.after)
+
+
+def _request_details():
+    """
+    Get the request that ran a statement.
+
+    Statements run outside of a request have none.
+    """
+    details = {'method': None, 'path': None, 'endpoint': None,
+               'user_id': None}
+    if has_request_context():
+        details.update(method=request.method, path=request.path,
+                       endpoint=request.endpoint)
+    if has_app_context():
+        user = g.get('user')
+        details['user_id'] = getattr(user, 'user_id', None)
+    return details
+
+
+def _format_parameters(parameters):
+    """
+    Format the parameters of a statement for the log.
+
+    Long parameters, such as those of a bulk insert, are cut short.
+    """
+    text = repr(parameters)
+    if len(text) > MAX_PARAMETERS_LENGTH:
+        text = text[:MAX_PARAMETERS_LENGTH] + '...'
+    return text
@@ -0,0 +1,171 @@
+"""
+Define the timing of requests.
+
+With REQUEST_TIMING set, every request records:
+- The wall time from the start of the request to its response.
+- The number of SQL statements run and the time spent in the database.
+- The time spent encoding JSON.
+They are sent in a Server-Timing header and logged as one JSON line on the
+`app.timing` logger. Without REQUEST_TIMING none of the hooks and listeners
+are installed, so requests don't pay for them.
+"""
+import functools
+import json
+import logging
+import time
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+from . import db
+
+logger = logging.getLogger('app.timing')
+
+
+class RequestTiming(object):
+    """
+    Set up the timings of a request.
+
+    The database and encoding times are added up as the request runs.
+    """
+
+    def __init__(self):
+        """
+        Start timing a request.
+
+        Every counter starts at zero.
+        """
+        self.start = time.time()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+    def header(self, total):
+        """
+        Build the Server-Timing header.
+
+        The durations are in milliseconds.
+        """
+        return ('db;dur={0:.2f};desc="{1} queries", '
+                'serialize;dur={2:.2f}, total;dur={3:.2f}').format(
+                    self.db_seconds * 1000, self.queries,
+                    self.serialize_seconds * 1000, total * 1000)
+
+
+def init_app(app):
+    """
+    Set up the timing of requests for an application.
+
+    This must be done after the JSON backend is loaded, since the encoding
+    is timed by wrapping it.
+    """
+    if not app.config.get('REQUEST_TIMING'):
+        return
+
+    name, encode = app.extensions['json_backend']
+    app.extensions['json_backend'] = (name, _timed_encode(encode))
+
+    @app.before_first_request
+    def listen_to_engine():
+        """
+        Time the statements run by the engine of the application.
+
+        The engine is only created once the application is configured.
+        """
+        engine = db.get_engine(app)
+        if not event.contains(engine, 'before_cursor_execute', _before):
+            event.listen(engine, 'before_cursor_execute', _before)
+            event.listen(engine, 'after_cursor_execute', _after)
+
+    app.before_request(start_timing)
+    app.after_request(end_timing)
+
+
+def start_timing():
+    """
+    Start timing a request.
+
+    The timings are kept on `g` until the response is ready.
+    """
+    g.timing = RequestTiming()
+
+
+def end_timing(response):
+    """
+    Report the timings of a request.
+
+    The timings are sent in the Server-Timing header of the response and
+    logged.
+    """
+    timing = g.pop('timing', None)
+    if timing is None:
+        return response
+    total = time.time() - timing.start
+    response.headers['Server-Timing'] = timing.header(total)
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+        'db_ms': round(timing.db_seconds * 1000, 2),
+        'queries': timing.queries,
+        'serialize_ms': round(timing.serialize_seconds * 1000, 2)
+    }, sort_keys=True))
+    return response
+
+
+def _current_timing():
+    """
+    Get the timings of the current request.
+
+    Returns None outside of a timed request.
+    """
+    return g.get('timing') if has_app_context() else None
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    """
+    Record the time a statement starts.
+
+    The start time is kept on the execution context of the statement, so
+    nothing is left behind on the connection when the statement fails. The
+    probes the dialect runs on its first connection have no context and
+    aren't timed.
+    """
+    if context is not None:
+        context._timing_start = time.time()
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    """
+    Add the time a statement took to the current request.
+
+    Statements run outside of a timed request aren't counted.
+    """
+    start = getattr(context, '_timing_start', None)
+    if start is None:
+        return
+    seconds = time.time() - start
+    timing = _current_timing()
+    if timing is not None:
+        timing.queries += 1
+        timing.db_seconds += seconds
+
+
+def _timed_encode(encode):
+    """
+    Time a JSON encode function.
+
+    The time is added to the current request.
+    """
+    @functools.wraps(encode)
+    def timed(*args):
+        start = time.time()
+        try:
+            return encode(*args)
+        finally:
+            timing = _current_timing()
+            if timing is not None:
+                timing.serialize_seconds += time.time() - start
+    return timed
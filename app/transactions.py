@@ -0,0 +1,85 @@
+"""
+Define the unit of work of a request.
+
+With UNIT_OF_WORK set, models saved or deleted while handling a request are
+only flushed to the database, and the request commits once when its
+response is ready:
+- A successful response (below 400) commits the changes of the request.
+- An error response or an exception rolls them back.
+Outside of requests, e.g. in scripts and the shell, `save()` and `delete()`
+commit right away as before.
+"""
+from flask import current_app, g, has_app_context
+
+from . import db
+
+
+def init_app(app):
+    """
+    Set up the unit of work for an application.
+
+    The unit of work is used by the requests handled while UNIT_OF_WORK is
+    set.
+    """
+    @app.before_request
+    def begin_unit_of_work():
+        """
+        Start the unit of work of a request.
+
+        Models saved from now on are only flushed.
+        """
+        g.unit_of_work = bool(current_app.config.get('UNIT_OF_WORK'))
+
+    @app.after_request
+    def end_unit_of_work(response):
+        """
+        Commit or roll back the changes of a request.
+
+        The changes are committed once if the response is successful, before
+        it is sent, so a failed commit is reported to the client.
+        """
+        if not g.get('unit_of_work', False):
+            return response
+        if response.status_code >= 400:
+            db.session.rollback()
+            return response
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return response
+
+    @app.teardown_request
+    def clear_unit_of_work(exc):
+        """
+        Clear the unit of work of a request.
+
+        Changes that weren't committed, e.g. because of an exception, are
+        rolled back.
+        """
+        if g.pop('unit_of_work', False) and exc is not None:
+            db.session.rollback()
+
+
+def in_unit_of_work():
+    """
+    Check if changes are part of the unit of work of a request.
+
+    Returns False outside of requests or when UNIT_OF_WORK isn't set.
+    """
+    return has_app_context() and g.get('unit_of_work', False)
+
+
+def save_changes():
+    """
+    Save the changes staged in the session.
+
+    The changes are flushed within the unit of work of a request, so errors
+    such as constraint violations are raised right away, and committed
+    otherwise.
+    """
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
@@ -0,0 +1,335 @@
+"""
+Define the bulk export and import of a user's data.
+
+The BucketLists and items of a user are streamed as newline-delimited JSON,
+one object per line:
+- `{"type": "bucketlist", "id": ..., "name": ..., ...}` for each BucketList.
+- `{"type": "item", "bucketlist_id": ..., "id": ..., ...}` for each of its
+  items, right after the BucketList.
+Every line is read from a single query, so the export is a consistent
+snapshot, and rows are fetched in batches from a server-side cursor so the
+memory used doesn't grow with the size of the account.
+
+Imports read the same format line by line from the request stream. Items
+belong to the BucketList line before them, and the rows are inserted in
+chunks with a commit for each chunk.
+"""
+from datetime import datetime
+import json
+
+from flask import current_app
+import sqlalchemy
+
+from . import db
+from .encoding import dumps
+from .models import BucketList, Items, User
+
+# The longest name a BucketList or an item can have.
+MAX_NAME_LENGTH = 64
+
+# The columns of an exported BucketList and of each of its items.
+EXPORT_COLUMNS = (
+    BucketList.bucketlist_id, BucketList.name, BucketList.date_created,
+    BucketList.date_modified, BucketList.item_count, BucketList.done_count,
+    Items.item_id, Items.name.label('item_name'), Items.done,
+    Items.date_created.label('item_date_created'),
+    Items.date_modified.label('item_date_modified'))
+
+
+def export_query(user_id):
+    """
+    Query the BucketLists of a user with their items.
+
+    Each row holds a BucketList and one of its items, or no item for an
+    empty BucketList. The rows are ordered so the items of a BucketList
+    follow each other, which both the owner and the item indexes serve.
+    """
+    return db.session.query(*EXPORT_COLUMNS).outerjoin(
+        Items, Items.bucketlist_id == BucketList.bucketlist_id).filter(
+        BucketList.created_by == user_id).order_by(
+        BucketList.bucketlist_id, Items.item_id)
+
+
+def export_lines(user_id):
+    """
+    Export the BucketLists and items of a user.
+
+    Yields chunks of newline-delimited JSON, one chunk for every
+    EXPORT_BATCH_SIZE rows fetched from the database.
+    """
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    lines = []
+    current = None
+    for row in export_query(user_id).yield_per(batch_size):
+        if row.bucketlist_id != current:
+            current = row.bucketlist_id
+            lines.append(_line({
+                'type': 'bucketlist',
+                'id': row.bucketlist_id,
+                'name': row.name,
+                'date_created': row.date_created,
+                'date_modified': row.date_modified,
+                'item_count': row.item_count,
+                'done_count': row.done_count
+            }))
+        if row.item_id is not None:
+            lines.append(_line({
+                'type': 'item',
+                'bucketlist_id': row.bucketlist_id,
+                'id': row.item_id,
+                'name': row.item_name,
+                'done': row.done,
+                'date_created': row.item_date_created,
+                'date_modified': row.item_date_modified
+            }))
+        if len(lines) >= batch_size:
+            yield b''.join(lines)
+            lines = []
+    if lines:
+        yield b''.join(lines)
+
+
+def _line(obj):
+    """
+    Encode an object as a line of JSON.
+
+    Some JSON backends return bytes and others text, so the line is always
+    returned as UTF-8 bytes.
+    """
+    line = dumps(obj)
+    if not isinstance(line, bytes):
+        line = line.encode('utf-8')
+    return line + b'\n'
+
+
+class Importer(object):
+    """
+    Set up the import of BucketLists and items for a user.
+
+    Lines are read one at a time and the rows they describe are staged until
+    `flush` inserts them with bulk insert mappings and commits. A BucketList
+    whose name the user already has isn't created again, its items are
+    added to the existing one. Only the rows of the current chunk are kept
+    in memory, along with the names and ids of the BucketLists of the user.
+    """
+
+    def __init__(self, user_id):
+        """
+        Create the importer.
+
+        The BucketLists the user already has are looked up once.
+        """
+        self.user_id = user_id
+        self.lists = dict(db.session.query(
+            BucketList.name, BucketList.bucketlist_id).filter(
+            BucketList.created_by == user_id))
+        self.lines = 0
+        self.created_lists = 0
+        self.created_items = 0
+        self.errors = 0
+        self.current = None
+        self._new_lists = {}
+        self._items = []
+
+    def read(self, number, line):
+        """
+        Read a line of the import.
+
+        Returns an error for the line, or None when the line is staged. A
+        rejected line that may be a BucketList ends the current BucketList,
+        so the items after it are rejected instead of added to the one
+        before.
+        """
+        self.lines += 1
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            self.current = None
+            return self._error(number, 400, 'Invalid JSON.')
+        if not isinstance(entry, dict) or \
+                entry.get('type') not in ('bucketlist', 'item'):
+            self.current = None
+            return self._error(number, 400, "Each line must be a JSON object "
+                               "with a 'type' of bucketlist or item.")
+
+        name = entry.get('name')
+        if not name or not isinstance(name, type(u'')) or \
+                len(name) > MAX_NAME_LENGTH:
+            if entry['type'] == 'bucketlist':
+                self.current = None
+            return self._error(number, 400, "The key 'name' must be a string "
+                               "of 1 to {0} characters.".format(
+                                   MAX_NAME_LENGTH))
+
+        if entry['type'] == 'bucketlist':
+            self.current = name
+            if name in self.lists or name in self._new_lists:
+                return self._error(
+                    number, 409, "A BucketList with the name {0} exists. Its "
+                    "items are added to it.".format(name))
+            self._new_lists[name] = number
+            return None
+
+        done = _read_done(entry.get('done', False))
+        if done is None:
+            return self._error(number, 400, "The key 'done' must be true or "
+                               "false.")
+        if self.current is None:
+            return self._error(number, 400, "An item must follow the "
+                               "BucketList it belongs to.")
+        self._items.append((number, self.current, name, done))
+        return None
+
+    def pending(self):
+        """
+        Get the number of lines staged.
+
+        The lines are inserted by the next `flush`.
+        """
+        return len(self._new_lists) + len(self._items)
+
+    def flush(self):
+        """
+        Insert the staged rows and commit.
+
+        Returns the errors of the lines that couldn't be inserted. When
+        another request changes the same rows meanwhile, the chunk is rolled
+        back and each of its lines is reported as a conflict.
+        """
+        new_lists, items = self._new_lists, self._items
+        self._new_lists, self._items = {}, []
+        try:
+            created, errors, rows = self._insert(new_lists, items)
+            db.session.commit()
+        except sqlalchemy.exc.IntegrityError:
+            db.session.rollback()
+            numbers = sorted(list(new_lists.values()) +
+                             [each[0] for each in items])
+            return [self._error(number, 409, "The line was changed by "
+                                "another request. Please try again.")
+                    for number in numbers]
+        self.lists.update(created)
+        self.created_lists += len(created)
+        self.created_items += rows
+        return errors
+
+    def progress(self, kind='progress'):
+        """
+        Get the progress of the import.
+
+        Returns the lines read and the rows created so far.
+        """
+        return {'type': kind, 'lines': self.lines,
+                'bucketlists': self.created_lists,
+                'items': self.created_items, 'errors': self.errors}
+
+    def _insert(self, new_lists, items):
+        """
+        Insert the rows of a chunk.
+
+        Returns the names and ids of the new BucketLists, the errors of the
+        items that couldn't be inserted and the number of items inserted.
+        """
+        now = datetime.now()
+        created = {}
+        if new_lists:
+            db.session.bulk_insert_mappings(BucketList, [
+                {'name': name, 'created_by': self.user_id,
+                 'date_created': now, 'date_modified': now}
+                for name in new_lists])
+            created = dict(db.session.query(
+                BucketList.name, BucketList.bucketlist_id).filter(
+                BucketList.created_by == self.user_id,
+                BucketList.name.in_(list(new_lists))))
+            User.touch(db.session, [self.user_id])
+
+        errors, rows, counts = [], [], {}
+        for number, list_id, name, done, error in self._check(items, created):
+            if error is not None:
+                errors.append(error)
+                continue
+            rows.append({'name': name, 'done': done, 'bucketlist_id': list_id,
+                         'date_created': now, 'date_modified': now})
+            total, total_done = counts.get(list_id, (0, 0))
+            counts[list_id] = (total + 1, total_done + (1 if done else 0))
+        if rows:
+            db.session.bulk_insert_mappings(Items, rows)
+            BucketList.count_items(db.session, counts)
+        return created, errors, len(rows)
+
+    def _check(self, items, created):
+        """
+        Check staged items against their BucketLists.
+
+        Yields each item with the id of its BucketList and an error when
+        the BucketList wasn't imported or already has an item with the same
+        name.
+        """
+        ids = {}
+        for number, list_name, name, done in items:
+            ids[list_name] = created.get(list_name, self.lists.get(list_name))
+        known = [each for each in ids.values() if each is not None]
+        seen = set()
+        if known:
+            seen.update(db.session.query(Items.bucketlist_id, Items.name)
+                        .filter(Items.bucketlist_id.in_(known),
+                                Items.name.in_([each[2] for each in items])))
+
+        for number, list_name, name, done in items:
+            list_id, error = ids[list_name], None
+            if list_id is None:
+                error = self._error(number, 409, "The BucketList {0} wasn't "
+                                    "imported.".format(list_name))
+            elif (list_id, name) in seen:
+                error = self._error(number, 409, "An item with the name {0} "
+                                    "exists.".format(name))
+            seen.add((list_id, name))
+            yield number, list_id, name, done, error
+
+    def _error(self, number, status, message):
+        """
+        Record an error for a line.
+
+        Returns the error to report.
+        """
+        self.errors += 1
+        return {'type': 'error', 'line': number, 'status': status,
+                'error': message}
+
+
+def _read_done(done):
+    """
+    Read the done value of an imported item.
+
+    Accepts a boolean or the strings 'true' and 'false' in any case. Returns
+    None for any other value.
+    """
+    if isinstance(done, type(u'')) and done.lower() in ('true', 'false'):
+        return done.lower() == 'true'
+    return done if isinstance(done, bool) else None
+
+
+def import_lines(user_id, stream):
+    """
+    Import BucketLists and items for a user from a stream of lines.
+
+    Yields newline-delimited JSON: an error for each line that couldn't be
+    imported, the progress after each chunk of IMPORT_CHUNK_SIZE rows is
+    committed and a summary at the end.
+    """
+    chunk_size = current_app.config['IMPORT_CHUNK_SIZE']
+    importer = Importer(user_id)
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        error = importer.read(number, line.decode('utf-8', 'replace'))
+        if error is not None:
+            yield _line(error)
+        if importer.pending() >= chunk_size:
+            for error in importer.flush():
+                yield _line(error)
+            yield _line(importer.progress())
+    for error in importer.flush():
+        yield _line(error)
+    yield _line(importer.progress('summary'))
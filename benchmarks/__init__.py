@@ -0,0 +1,6 @@
+"""
+Benchmarks for the BucketList API.
+
+Each module in this package is a script that can be run with
+`python -m benchmarks.<module>`.
+"""
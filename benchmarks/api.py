@@ -0,0 +1,220 @@
+"""
+Benchmark the hot endpoints of the API.
+
+Seeds a SQLite or PostgreSQL database with users, BucketLists and items,
+then measures the latency percentiles and requests per second of login, the
+list endpoint with several `page`, `limit`, `cursor` and `q` parameters, and
+get, create, update and delete through the Flask test client. The results
+are written to a JSON file that `benchmarks.compare` checks for regressions.
+
+Usage: python -m benchmarks.api --users 10 --bucketlists 100 --items 10 \
+    --output results.json
+"""
+from datetime import datetime
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+from app import db, create_app
+from app.models import User, BucketList
+from app.seeding import seed
+
+PASSWORD = 'benchmark'
+
+# The percentiles reported for each scenario.
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(timings, percent):
+    """
+    Get a percentile of sorted latencies.
+
+    Uses the nearest rank, so the value is one of the latencies measured.
+    """
+    rank = max(int(round(percent / 100.0 * len(timings))), 1)
+    return timings[rank - 1]
+
+
+def summarize(timings, seconds, errors):
+    """
+    Summarize the latencies of a scenario.
+
+    Returns the number of requests and errors, the requests per second and
+    the latency percentiles in milliseconds.
+    """
+    timings = sorted(timings)
+    result = {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': len(timings) / seconds if seconds else 0.0,
+        'mean': sum(timings) / len(timings),
+        'max': timings[-1]
+    }
+    for percent in PERCENTILES:
+        result['p{0}'.format(percent)] = percentile(timings, percent)
+    return result
+
+
+def run(request, count, expected):
+    """
+    Run the requests of a scenario.
+
+    `request` is called with the number of the request and returns the
+    response. Returns the summary of the latencies.
+    """
+    timings = []
+    errors = 0
+    start = time.time()
+    for number in range(count):
+        before = time.time()
+        response = request(number)
+        timings.append((time.time() - before) * 1000)
+        if response.status_code != expected:
+            errors += 1
+    return summarize(timings, time.time() - start, errors)
+
+
+def scenarios(client, headers, list_ids):
+    """
+    Define the scenarios measured.
+
+    Returns a list of the name, the request function and the status code
+    expected of each scenario. The BucketLists created are deleted by the
+    delete scenario, so the database ends as it was seeded. When creating
+    fails, updates and deletes ask for a BucketList that doesn't exist, so
+    they are counted as errors instead of stopping the benchmark.
+    """
+    created = []
+    login = json.dumps({'username': 'user1', 'password': PASSWORD})
+
+    def create(number):
+        response = client.post(
+            '/api/v1/bucketlists/', headers=headers,
+            data=json.dumps({'name': 'benchmark {0}'.format(number)}))
+        if response.status_code == 201:
+            created.append(json.loads(response.data.decode())['id'])
+        return response
+
+    def update(number):
+        list_id = created[number % len(created)] if created else 0
+        return client.put(
+            '/api/v1/bucketlists/{0}'.format(list_id), headers=headers,
+            data=json.dumps({'name': 'updated {0}'.format(number)}))
+
+    def delete(number):
+        list_id = created.pop() if created else 0
+        return client.delete('/api/v1/bucketlists/{0}'.format(list_id),
+                             headers=headers)
+
+    def listing(**query_string):
+        return lambda number: client.get('/api/v1/bucketlists/',
+                                         query_string=query_string,
+                                         headers=headers)
+
+    return [
+        ('login', lambda number: client.post(
+            '/auth/login', data=login, content_type='application/json'), 200),
+        ('list', listing(), 200),
+        ('list_limit_100', listing(limit=100), 200),
+        ('list_page_2', listing(page=2, limit=20), 200),
+        ('list_cursor', listing(cursor='', limit=20), 200),
+        ('list_q', listing(q='travel'), 200),
+        ('get', lambda number: client.get(
+            '/api/v1/bucketlists/{0}'.format(
+                list_ids[number % len(list_ids)]), headers=headers), 200),
+        ('create', create, 201),
+        ('update', update, 200),
+        ('delete', delete, 200)
+    ]
+
+
+def main():
+    """
+    Run the benchmark.
+
+    Prints the results of each scenario and writes them to the output file.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--uri', help='database to benchmark, a temporary '
+                        'SQLite file by default; it is emptied')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--bucketlists', type=int, default=100,
+                        help='BucketLists per user')
+    parser.add_argument('--items', type=int, default=10,
+                        help='items per BucketList')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per scenario')
+    parser.add_argument('--login-requests', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = \
+        args.uri or 'sqlite:///' + os.path.join(directory, 'api.sqlite')
+    app.config['SECRET_KEY'] = app.config['SECRET_KEY'] or 'benchmark'
+    results = {}
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            start = time.time()
+            seed(args.users, args.bucketlists, args.items, seed=args.seed,
+                 password=PASSWORD)
+            print('Seeded {0} users, {1} bucketlists and {2} items in '
+                  '{3:.1f}s'.format(args.users, args.users * args.bucketlists,
+                                    args.users * args.bucketlists * args.items,
+                                    time.time() - start))
+
+            token = User.query.get(1).generate_auth_token()
+            auth = base64.b64encode(token + b':').decode('ascii')
+            headers = {'Authorization': 'Basic ' + auth,
+                       'Content-Type': 'application/json'}
+            list_ids = [list_id for list_id, in db.session.query(
+                BucketList.bucketlist_id).filter_by(created_by=1)]
+            db.session.remove()
+
+            print('{0:<16} {1:>8} {2:>6} {3:>10} {4:>9} {5:>9} {6:>9}'.format(
+                'scenario', 'requests', 'errors', 'req/s', 'p50 (ms)',
+                'p95 (ms)', 'p99 (ms)'))
+            client = app.test_client()
+            for name, request, expected in scenarios(client, headers,
+                                                     list_ids):
+                count = args.login_requests if name == 'login' \
+                    else args.requests
+                result = results[name] = run(request, count, expected)
+                print('{0:<16} {1:>8} {2:>6} {3:>10.1f} {4:>9.2f} {5:>9.2f} '
+                      '{6:>9.2f}'.format(name, result['requests'],
+                                         result['errors'], result['rps'],
+                                         result['p50'], result['p95'],
+                                         result['p99']))
+            dialect = db.engine.dialect.name
+            db.session.remove()
+            db.drop_all()
+    finally:
+        shutil.rmtree(directory)
+
+    with open(args.output, 'w') as output:
+        json.dump({
+            'meta': {
+                'date': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'database': dialect,
+                'users': args.users,
+                'bucketlists': args.bucketlists,
+                'items': args.items,
+                'seed': args.seed
+            },
+            'results': results
+        }, output, indent=2, sort_keys=True)
+    print('Results written to {0}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare two runs of the API benchmark.
+
+Reads the JSON results of `benchmarks.api` for a baseline and a new run and
+reports the change of the median and 95th percentile latency and of the
+requests per second of every scenario. Exits with status 1 when a scenario
+got slower than the threshold allows or started failing, so it can gate a
+build.
+
+Usage: python -m benchmarks.compare baseline.json results.json \
+    --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+# The metrics compared, and whether a higher value is worse.
+METRICS = (('p50', True), ('p95', True), ('rps', False))
+
+
+def load(path):
+    """
+    Load the results of a benchmark run.
+
+    Returns the results keyed by scenario.
+    """
+    with open(path) as results:
+        return json.load(results)['results']
+
+
+def change(before, after):
+    """
+    Get the relative change between two values.
+
+    Returns 0 when the baseline is 0.
+    """
+    return (after - before) / before if before else 0.0
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare the results of two runs.
+
+    Returns a row per scenario and metric with the values, the change and
+    whether it is a regression beyond the threshold, and a row for each
+    scenario that has new errors.
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        for metric, higher_is_worse in METRICS:
+            before = baseline[name][metric]
+            after = current[name][metric]
+            delta = change(before, after)
+            worse = delta if higher_is_worse else -delta
+            rows.append((name, metric, before, after, delta,
+                         worse > threshold))
+        if current[name]['errors'] > baseline[name]['errors']:
+            rows.append((name, 'errors', baseline[name]['errors'],
+                         current[name]['errors'], 0.0, True))
+    return rows
+
+
+def main():
+    """
+    Run the comparison.
+
+    Prints the changes and exits with status 1 on a regression.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='largest relative slowdown allowed')
+    args = parser.parse_args()
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    print('{0:<16} {1:<7} {2:>10} {3:>10} {4:>8}'.format(
+        'scenario', 'metric', 'baseline', 'current', 'change'))
+    for name, metric, before, after, delta, regressed in rows:
+        print('{0:<16} {1:<7} {2:>10.2f} {3:>10.2f} {4:>+7.1%}{5}'.format(
+            name, metric, before, after, delta,
+            '  REGRESSION' if regressed else ''))
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print('{0} regression(s) beyond {1:.0%}'.format(
+            len(regressions), args.threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the compression of responses.
+
+Compresses a full page of BucketLists with items, as returned by the list
+endpoint, and reports the bytes saved and the CPU time spent by gzip and
+deflate at several levels, for the compact and the pretty printed JSON.
+
+Usage: python -m benchmarks.compression --bucketlists 100 --items 10
+"""
+import argparse
+import timeit
+import zlib
+
+from app import create_app
+from app.compression import ENCODINGS
+from app.encoding import jsonify
+from benchmarks.encoding import make_page
+
+
+def measure(data, encoding, level, number):
+    """
+    Measure compressing a body.
+
+    Returns the compressed size in bytes and the time to compress it in
+    milliseconds.
+    """
+    wbits = dict(ENCODINGS)[encoding]
+
+    def compress():
+        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+        return compressor.compress(data) + compressor.flush()
+
+    size = len(compress())
+    seconds = min(timeit.repeat(compress, number=number, repeat=3)) / number
+    return size, seconds * 1000
+
+
+def main():
+    """
+    Run the benchmark.
+
+    Prints the size, savings and compression time of the page for each
+    encoding and level.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--bucketlists', type=int, default=100)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--levels', default='1,6,9')
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = \
+        app.config['SQLALCHEMY_DATABASE_URI'] or 'sqlite://'
+    page = make_page(args.bucketlists, args.items)
+    print('{0:<8} {1:<10} {2:>6} {3:>10} {4:>10} {5:>8} {6:>8}'.format(
+        'json', 'encoding', 'level', 'bytes', 'saved', 'ratio', 'ms'))
+    with app.test_request_context():
+        for pretty in (False, True):
+            app.config['JSONIFY_PRETTYPRINT_REGULAR'] = pretty
+            data = jsonify(page).get_data()
+            style = 'pretty' if pretty else 'compact'
+            print('{0:<8} {1:<10} {2:>6} {3:>10} {4:>10} {5:>8} {6:>8}'
+                  .format(style, 'identity', '-', len(data), 0, '1.00', '-'))
+            for encoding, wbits in ENCODINGS:
+                for level in [int(each) for each in args.levels.split(',')]:
+                    size, ms = measure(data, encoding, level, args.number)
+                    print('{0:<8} {1:<10} {2:>6} {3:>10} {4:>10} {5:>8.2f} '
+                          '{6:>8.2f}'.format(style, encoding, level, size,
+                                             len(data) - size,
+                                             float(len(data)) / size, ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark the JSON encoding of responses.
+
+Encodes a full page of BucketLists with items, as returned by the list
+endpoint, and reports the size and encode time of each response for the old
+pretty printed `flask.jsonify` and for every JSON backend installed.
+
+Usage: python -m benchmarks.encoding --bucketlists 100 --items 10
+"""
+from datetime import datetime
+import argparse
+import timeit
+
+import flask
+
+from app import create_app
+from app.encoding import AUTO_BACKENDS, jsonify, load_backend
+
+
+def make_page(bucketlists, items):
+    """
+    Make the data of a page of BucketLists.
+
+    The data has the same shape as the response of the list endpoint.
+    """
+    now = datetime.now()
+    return {
+        'meta': {'page': 1, 'limit': bucketlists, 'total': bucketlists,
+                 'pages': 1, 'next': None, 'prev': None,
+                 'first': 'http://localhost/api/v1/bucketlists/?page=1',
+                 'last': 'http://localhost/api/v1/bucketlists/?pages=1'},
+        'bucketlists': [{
+            'id': index,
+            'name': 'BucketList {0}'.format(index),
+            'items': [{'id': item, 'name': 'Item {0}'.format(item),
+                       'done': item % 2 == 0, 'date_created': now,
+                       'date_modified': now} for item in range(items)],
+            'date_created': now,
+            'date_modified': now,
+            'bucketlist_url': 'http://localhost/api/v1/bucketlists/{0}'
+                              .format(index),
+            'created_by': 1
+        } for index in range(bucketlists)]
+    }
+
+
+def measure(encode, number):
+    """
+    Measure a response.
+
+    Returns the size of the response in bytes and the time to build it in
+    milliseconds.
+    """
+    size = len(encode().get_data())
+    seconds = min(timeit.repeat(encode, number=number, repeat=3)) / number
+    return size, seconds * 1000
+
+
+def main():
+    """
+    Run the benchmark.
+
+    Prints the size and encode time of the page for each encoder.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--bucketlists', type=int, default=100)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = \
+        app.config['SQLALCHEMY_DATABASE_URI'] or 'sqlite://'
+    page = make_page(args.bucketlists, args.items)
+    print('{0:<24} {1:>10} {2:>10}'.format('encoder', 'bytes', 'ms'))
+    with app.test_request_context():
+        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+        size, ms = measure(lambda: flask.jsonify(page), args.number)
+        print('{0:<24} {1:>10} {2:>10.2f}'.format(
+            'flask.jsonify (pretty)', size, ms))
+
+        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
+        for name in AUTO_BACKENDS:
+            try:
+                app.extensions['json_backend'] = load_backend(name)
+            except ImportError:
+                continue
+            size, ms = measure(lambda: jsonify(page), args.number)
+            print('{0:<24} {1:>10} {2:>10.2f}'.format(name, size, ms))
+
+
+if __name__ == '__main__':
+    main()
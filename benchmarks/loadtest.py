@@ -0,0 +1,604 @@
+"""
+Load test a running instance of the API.
+
+Registers users and logs them in through `/auth`, gives each a BucketList
+with items, then runs a weighted mix of list, get, create and toggle-done
+requests from a pool of threads for a while. The load is closed-loop by
+default, each thread sending its next request once the last one returned.
+With a rate, requests arrive on a Poisson schedule whatever the response
+times, and their latency counts from the time they were due, so a saturated
+server shows up as growing latency instead of a lower request rate.
+
+Reports the throughput, the error rate, the latency percentiles of each
+request type and a latency histogram.
+
+Usage: python -m benchmarks.loadtest --url http://127.0.0.1:5000 \
+    --users 10 --threads 10 --duration 30 --rate 0 \
+    --mix list=50,get=30,create=10,toggle=10
+"""
+from __future__ import print_function
+
+import argparse
+import base64
+import json
+import random
+import socket
+import threading
+import time
+
+try:
+    from http.client import HTTPConnection, HTTPException
+    from queue import Empty, Queue
+    from urllib.parse import urlparse
+except ImportError:
+    from httplib import HTTPConnection, HTTPException
+    from Queue import Empty, Queue
+    from urlparse import urlparse
+
+PREFIX = '/api/v1'
+
+# The upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# The percentiles reported for each request type.
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Client(object):
+    """
+    Set up an HTTP client for one thread.
+
+    The connection is kept open between requests. The client is logged in
+    as one of the users of the load test.
+    """
+
+    def __init__(self, url, timeout):
+        """
+        Create the client.
+
+        The connection is opened on the first request.
+        """
+        parts = urlparse(url)
+        self.connection = HTTPConnection(parts.hostname, parts.port or 80,
+                                         timeout=timeout)
+        self.headers = {'Content-Type': 'application/json',
+                        'Accept': 'application/json'}
+
+    def login(self, token):
+        """
+        Send a token with every request.
+
+        The token is sent with HTTP basic authentication.
+        """
+        auth = base64.b64encode((token + ':').encode('utf-8'))
+        self.headers['Authorization'] = 'Basic ' + auth.decode('ascii')
+
+    def request(self, method, path, body=None):
+        """
+        Send a request.
+
+        Returns the status code and the decoded JSON body, if any. A failed
+        connection is closed so the next request opens a new one.
+        """
+        data = json.dumps(body) if body is not None else None
+        try:
+            self.connection.request(method, path, data, self.headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (HTTPException, socket.error):
+            self.connection.close()
+            raise
+        try:
+            return response.status, json.loads(content.decode('utf-8'))
+        except ValueError:
+            return response.status, None
+
+
+class User(object):
+    """
+    Set up a user of the load test.
+
+    Holds the BucketLists and items of the user, which the requests of the
+    workload pick from.
+    """
+
+    def __init__(self, username, password):
+        """
+        Create the user.
+
+        The user has no BucketLists until it is set up.
+        """
+        self.username = username
+        self.password = password
+        self.token = None
+        self.list_ids = []
+        self.items = []
+        self.lock = threading.Lock()
+
+    def setup(self, client, items):
+        """
+        Register the user and create their data through the API.
+
+        The user logs in through `/auth/login` and gets a BucketList with
+        `items` items.
+        """
+        body = {'username': self.username, 'password': self.password}
+        client.request('POST', '/auth/register', body)
+        status, content = client.request('POST', '/auth/login', body)
+        if status != 200:
+            raise RuntimeError('Logging in {0} failed with {1}.'.format(
+                self.username, status))
+        self.token = content['token']
+        client.login(self.token)
+        status, content = client.request(
+            'POST', PREFIX + '/bucketlists/', {'name': 'loadtest'})
+        list_id = content['id']
+        self.list_ids.append(list_id)
+        for index in range(items):
+            client.request('POST', PREFIX + '/bucketlists/{0}/items/'.format(
+                list_id), {'name': 'item {0}'.format(index), 'done': 'false'})
+        status, content = client.request(
+            'GET', PREFIX + '/bucketlists/{0}/items/?limit=100'.format(
+                list_id))
+        self.items = [(list_id, item['id'], item['name'], item['done'])
+                      for item in content['items']]
+
+
+class Workload(object):
+    """
+    Set up the weighted mix of requests.
+
+    Each request type is picked with a probability proportional to its
+    weight.
+    """
+
+    def __init__(self, mix, rng):
+        """
+        Create the workload.
+
+        `mix` maps the request types to their weights.
+        """
+        unknown = set(mix) - set(self.operations())
+        if unknown:
+            raise ValueError('Unknown request types: {0}'.format(
+                ', '.join(sorted(unknown))))
+        self.names = sorted(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.total = float(sum(self.weights))
+        self.rng = rng
+        self.lock = threading.Lock()
+
+    @classmethod
+    def operations(cls):
+        """
+        Get the request types.
+
+        Returns the names of the request types of the workload.
+        """
+        return ('list', 'get', 'create', 'toggle')
+
+    def pick(self):
+        """
+        Pick the type of the next request.
+
+        The random generator is shared by the threads.
+        """
+        with self.lock:
+            point = self.rng.random() * self.total
+        for name, weight in zip(self.names, self.weights):
+            point -= weight
+            if point < 0:
+                return name
+        return self.names[-1]
+
+    def run(self, name, client, user, number):
+        """
+        Send a request of a type for a user.
+
+        Returns the status code of the response.
+        """
+        return getattr(self, name)(client, user, number)
+
+    def list(self, client, user, number):
+        """
+        List the BucketLists of the user.
+
+        The first page of 20 is fetched.
+        """
+        status, content = client.request(
+            'GET', PREFIX + '/bucketlists/?limit=20')
+        return status
+
+    def get(self, client, user, number):
+        """
+        Get one of the BucketLists of the user.
+
+        The BucketLists are taken in turn.
+        """
+        with user.lock:
+            list_id = user.list_ids[number % len(user.list_ids)]
+        status, content = client.request(
+            'GET', PREFIX + '/bucketlists/{0}'.format(list_id))
+        return status
+
+    def create(self, client, user, number):
+        """
+        Create a BucketList for the user.
+
+        The new BucketList can be picked by later get requests.
+        """
+        status, content = client.request(
+            'POST', PREFIX + '/bucketlists/',
+            {'name': 'loadtest {0} {1}'.format(number, time.time())})
+        if status == 201:
+            with user.lock:
+                user.list_ids.append(content['id'])
+        return status
+
+    def toggle(self, client, user, number):
+        """
+        Toggle one of the items of the user between done and not done.
+
+        The items are taken in turn.
+        """
+        with user.lock:
+            index = number % len(user.items)
+            list_id, item_id, name, done = user.items[index]
+            user.items[index] = (list_id, item_id, name, not done)
+        status, content = client.request(
+            'PUT', PREFIX + '/bucketlists/{0}/items/{1}'.format(
+                list_id, item_id), {'name': name, 'done': not done})
+        return status
+
+
+class Results(object):
+    """
+    Set up the results of a load test.
+
+    The latency and status of every request are recorded by type.
+    """
+
+    def __init__(self):
+        """
+        Create the results.
+
+        No request is recorded yet.
+        """
+        self.latencies = {}
+        self.errors = {}
+        self.missed = 0
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, error):
+        """
+        Record a request.
+
+        `error` is True for failed requests and error responses.
+        """
+        with self.lock:
+            self.latencies.setdefault(name, []).append(seconds * 1000)
+            self.errors[name] = self.errors.get(name, 0) + int(error)
+
+    def summary(self, seconds):
+        """
+        Summarize the results.
+
+        Returns the totals and, for each request type, the number of
+        requests and errors and the latency percentiles.
+        """
+        every = sorted(latency for latencies in self.latencies.values()
+                       for latency in latencies)
+        requests = len(every)
+        errors = sum(self.errors.values())
+        summary = {
+            'seconds': seconds,
+            'requests': requests,
+            'errors': errors,
+            'missed': self.missed,
+            'throughput': requests / seconds if seconds else 0.0,
+            'error_rate': float(errors) / requests if requests else 0.0,
+            'histogram': histogram(every),
+            'types': {}
+        }
+        for name, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            result = summary['types'][name] = {
+                'requests': len(latencies),
+                'errors': self.errors[name],
+                'mean': sum(latencies) / len(latencies),
+                'max': latencies[-1]
+            }
+            for percent in PERCENTILES:
+                result['p{0}'.format(percent)] = percentile(latencies,
+                                                            percent)
+        return summary
+
+
+def percentile(latencies, percent):
+    """
+    Get a percentile of sorted latencies.
+
+    Uses the nearest rank, so the value is one of the latencies measured.
+    """
+    rank = max(int(round(percent / 100.0 * len(latencies))), 1)
+    return latencies[rank - 1]
+
+
+def histogram(latencies):
+    """
+    Count the latencies in each bucket.
+
+    Returns the upper bound and count of every bucket, the last bucket
+    holding the latencies above the largest bound.
+    """
+    counts = [0] * (len(BUCKETS) + 1)
+    for latency in latencies:
+        index = 0
+        while index < len(BUCKETS) and latency > BUCKETS[index]:
+            index += 1
+        counts[index] += 1
+    bounds = [str(bound) for bound in BUCKETS] + ['inf']
+    return list(zip(bounds, counts))
+
+
+class LoadTest(object):
+    """
+    Set up a load test.
+
+    Threads send the requests of the workload for `duration` seconds, each
+    as one of the users.
+    """
+
+    def __init__(self, url, threads, duration, workload, rate=0, timeout=30):
+        """
+        Create the load test.
+
+        A `rate` above 0 sends that many requests per second on average.
+        """
+        self.url = url
+        self.threads = threads
+        self.duration = duration
+        self.workload = workload
+        self.rate = rate
+        self.timeout = timeout
+        self.results = Results()
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def next_number(self):
+        """
+        Number the next request.
+
+        The number picks the BucketList or item a request uses.
+        """
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def send(self, client, user, due):
+        """
+        Send the next request of the workload.
+
+        The latency is measured from the time the request was due.
+        """
+        name = self.workload.pick()
+        try:
+            status = self.workload.run(name, client, user,
+                                       self.next_number())
+            error = status >= 400
+        except (HTTPException, socket.error):
+            error = True
+        self.results.record(name, time.time() - due, error)
+
+    def closed_loop(self, user, deadline):
+        """
+        Send requests back to back until the deadline.
+
+        Each request is due when the previous one returned.
+        """
+        client = self.client(user)
+        while time.time() < deadline:
+            self.send(client, user, time.time())
+
+    def open_loop(self, user, arrivals, deadline):
+        """
+        Send the requests that arrive until the deadline.
+
+        Requests still waiting at the deadline are counted as missed.
+        """
+        client = self.client(user)
+        while True:
+            try:
+                due = arrivals.get(timeout=max(deadline - time.time(), 0))
+            except Empty:
+                return
+            if due is None or time.time() >= deadline:
+                return
+            self.send(client, user, due)
+
+    def schedule(self, arrivals, deadline, rng):
+        """
+        Put the requests on a Poisson schedule.
+
+        The time between arrivals is drawn from an exponential distribution
+        with the mean of the rate.
+        """
+        due = time.time()
+        while True:
+            due += rng.expovariate(self.rate)
+            if due >= deadline:
+                break
+            time.sleep(max(due - time.time(), 0))
+            arrivals.put(due)
+        for each in range(self.threads):
+            arrivals.put(None)
+
+    def client(self, user):
+        """
+        Create a client logged in as a user.
+
+        Each thread has its own connection.
+        """
+        client = Client(self.url, self.timeout)
+        client.login(user.token)
+        return client
+
+    def run(self, users, rng):
+        """
+        Run the load test.
+
+        Returns the summary of the results.
+        """
+        start = time.time()
+        deadline = start + self.duration
+        if self.rate:
+            arrivals = Queue()
+            target, args = self.open_loop, (arrivals, deadline)
+        else:
+            target, args = self.closed_loop, (deadline,)
+        workers = [threading.Thread(target=target,
+                                    args=(users[index % len(users)],) + args)
+                   for index in range(self.threads)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        if self.rate:
+            self.schedule(arrivals, deadline, rng)
+        for worker in workers:
+            worker.join()
+        if self.rate:
+            self.results.missed = missed(arrivals)
+        return self.results.summary(time.time() - start)
+
+
+def missed(arrivals):
+    """
+    Count the requests that were never sent.
+
+    These arrived while every thread was busy until the deadline.
+    """
+    count = 0
+    while not arrivals.empty():
+        if arrivals.get_nowait() is not None:
+            count += 1
+    return count
+
+
+def parse_mix(mix):
+    """
+    Parse the weights of the workload.
+
+    The weights are given as `name=weight` pairs separated by commas.
+    """
+    weights = {}
+    for pair in mix.split(','):
+        name, weight = pair.split('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def setup_users(url, count, items, password, timeout=30):
+    """
+    Register and log in the users of a load test.
+
+    Returns the users, each with a BucketList of `items` items. The
+    usernames are new on every run, so runs against the same database
+    don't collide.
+    """
+    run_id = '{0:x}'.format(int(time.time() * 1000))
+    users = []
+    for index in range(count):
+        user = User('loadtest-{0}-{1}'.format(run_id, index), password)
+        user.setup(Client(url, timeout), items)
+        users.append(user)
+    return users
+
+
+def report(summary, out=print):
+    """
+    Report the summary of a load test.
+
+    Prints the totals, the latencies of each request type and the latency
+    histogram.
+    """
+    out('{0} requests in {1:.1f}s: {2:.1f} req/s, {3:.2%} errors, {4} '
+        'missed'.format(summary['requests'], summary['seconds'],
+                        summary['throughput'], summary['error_rate'],
+                        summary['missed']))
+    out('{0:<8} {1:>8} {2:>7} {3:>9} {4:>9} {5:>9} {6:>9}'.format(
+        'type', 'requests', 'errors', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)',
+        'max (ms)'))
+    for name in sorted(summary['types']):
+        result = summary['types'][name]
+        out('{0:<8} {1:>8} {2:>7} {3:>9.1f} {4:>9.1f} {5:>9.1f} '
+            '{6:>9.1f}'.format(name, result['requests'], result['errors'],
+                               result['p50'], result['p95'], result['p99'],
+                               result['max']))
+    total = max(summary['requests'], 1)
+    out('latency histogram')
+    for bound, count in summary['histogram']:
+        label = '<= {0} ms'.format(bound) if bound != 'inf' else '> {0} ms'\
+            .format(BUCKETS[-1])
+        out('{0:>12} {1:>8} {2}'.format(label, count,
+                                        '#' * int(50.0 * count / total)))
+
+
+def loadtest(url, users=10, threads=10, duration=30, rate=0, mix=None,
+             items=10, password='loadtest', seed=0, timeout=30):
+    """
+    Set up and run a load test against a running instance.
+
+    Returns the summary of the results.
+    """
+    rng = random.Random(seed)
+    workload = Workload(parse_mix(mix or 'list=50,get=30,create=10,toggle=10'),
+                        rng)
+    accounts = setup_users(url, users, items, password, timeout)
+    test = LoadTest(url, threads, duration, workload, rate, timeout)
+    return test.run(accounts, rng)
+
+
+def add_arguments(parser):
+    """
+    Add the options of a load test to an argument parser.
+
+    The same options are used by `manage.py loadtest`.
+    """
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30,
+                        help='seconds the load runs for')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='requests per second on a Poisson schedule, '
+                        'or 0 for back to back requests per thread')
+    parser.add_argument('--mix', default='list=50,get=30,create=10,toggle=10',
+                        help='weights of the request types')
+    parser.add_argument('--items', type=int, default=10,
+                        help='items per user for the get and toggle requests')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--output', help='file to write the results to as '
+                        'JSON')
+
+
+def main(argv=None):
+    """
+    Run a load test from the command line.
+
+    Prints the results and writes them to the output file if one is given.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    summary = loadtest(args.url, args.users, args.threads, args.duration,
+                       args.rate, args.mix, args.items, seed=args.seed,
+                       timeout=args.timeout)
+    report(summary)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(summary, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
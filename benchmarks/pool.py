@@ -0,0 +1,104 @@
+"""
+Stress the database connection pool.
+
+Runs a growing number of threads that each check out a connection, run a
+query and hold the connection for a while, against a pool configured like
+the application's. Reports the throughput, the timeouts and the time spent
+waiting for a connection at each level of concurrency, which shows how the
+pool behaves once it is saturated.
+
+Usage: python -m benchmarks.pool --pool-size 5 --max-overflow 10 \
+    --threads 5,15,30 --hold 0.05
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, exc
+
+from app.pool import InstrumentedQueuePool
+
+
+def run(engine, threads, requests, hold):
+    """
+    Run the threads against the pool.
+
+    Each thread makes `requests` checkouts. Returns the number of checkouts
+    that succeeded and timed out and the seconds taken.
+    """
+    results = {'ok': 0, 'timeout': 0}
+    lock = threading.Lock()
+
+    def work():
+        for each in range(requests):
+            try:
+                connection = engine.connect()
+            except exc.TimeoutError:
+                outcome = 'timeout'
+            else:
+                connection.execute('SELECT 1')
+                time.sleep(hold)
+                connection.close()
+                outcome = 'ok'
+            with lock:
+                results[outcome] += 1
+
+    workers = [threading.Thread(target=work) for each in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results['ok'], results['timeout'], time.time() - start
+
+
+def main():
+    """
+    Run the benchmark.
+
+    Prints a line of results for each number of threads.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--uri', help='database to connect to, a temporary '
+                        'SQLite file by default')
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--max-overflow', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=1)
+    parser.add_argument('--threads', default='5,15,30,60')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--hold', type=float, default=0.05)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    uri = args.uri or 'sqlite:///' + os.path.join(directory, 'pool.db')
+    options = {}
+    if uri.startswith('sqlite'):
+        options['connect_args'] = {'check_same_thread': False}
+
+    print('{0:>8} {1:>8} {2:>8} {3:>10} {4:>10} {5:>10}'.format(
+        'threads', 'ok', 'timeout', 'req/s', 'avg wait', 'max wait'))
+    try:
+        for threads in [int(each) for each in args.threads.split(',')]:
+            engine = create_engine(
+                uri, poolclass=InstrumentedQueuePool, pre_ping=True,
+                pool_size=args.pool_size, max_overflow=args.max_overflow,
+                pool_timeout=args.timeout, **options)
+            ok, timeouts, seconds = run(engine, threads, args.requests,
+                                        args.hold)
+            stats = engine.pool.stats()
+            attempts = stats['checkouts'] + stats['timeouts']
+            print('{0:>8} {1:>8} {2:>8} {3:>10.1f} {4:>9.1f}ms '
+                  '{5:>8.1f}ms'.format(
+                      threads, ok, timeouts, ok / seconds,
+                      stats['wait_seconds'] / attempts * 1000,
+                      stats['max_wait_seconds'] * 1000))
+            engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark the search of BucketLists.
+
+Seeds a SQLite database with BucketLists and measures the latency of the `q`
+filter of the list endpoint with and without the search index.
+
+Usage: python -m benchmarks.search --bucketlists 100000
+"""
+from datetime import datetime
+import argparse
+import base64
+import os
+import random
+import tempfile
+import time
+
+from app import db, create_app
+from app.models import User, BucketList
+
+WORDS = ['travel', 'learn', 'visit', 'climb', 'cook', 'write', 'swim',
+         'mountain', 'guitar', 'novel', 'marathon', 'paris', 'lagos',
+         'jollof', 'ocean', 'desert', 'language', 'painting', 'garden']
+
+
+def seed(bucketlists, users, rng):
+    """
+    Seed the database.
+
+    The BucketLists are spread evenly across the users and named with random
+    words.
+    """
+    now = datetime.now()
+    user = User(username='seed')
+    user.hash_password('benchmark')
+    db.session.execute(User.__table__.insert(), [
+        {'user_id': user_id, 'username': 'user{0}'.format(user_id),
+         'password_hash': user.password_hash,
+         'date_created': now, 'date_modified': now}
+        for user_id in range(1, users + 1)])
+    rows = []
+    for index in range(bucketlists):
+        rows.append({
+            'name': '{0} {1}'.format(' '.join(rng.sample(WORDS, 3)), index),
+            'created_by': index % users + 1,
+            'date_created': now, 'date_modified': now})
+    db.session.execute(BucketList.__table__.insert(), rows)
+    db.session.commit()
+
+
+def measure(client, headers, q, repeat):
+    """
+    Measure the latency of a search.
+
+    Returns the latencies of the requests in milliseconds, sorted.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        response = client.get('/api/v1/bucketlists/',
+                              query_string={'q': q}, headers=headers)
+        timings.append((time.time() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return sorted(timings)
+
+
+def main():
+    """
+    Run the benchmark.
+
+    Prints the median and 95th percentile latency of each search with and
+    without the search index.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--bucketlists', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'search.sqlite')
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    app.config['SECRET_KEY'] = app.config['SECRET_KEY'] or 'benchmark'
+    with app.app_context():
+        db.create_all()
+        start = time.time()
+        seed(args.bucketlists, args.users, random.Random(args.seed))
+        print('Seeded {0} bucketlists in {1:.1f}s'.format(
+            args.bucketlists, time.time() - start))
+
+        token = User.query.get(1).generate_auth_token()
+        auth = base64.b64encode(token + b':').decode('ascii')
+        headers = {'Authorization': 'Basic ' + auth}
+        client = app.test_client()
+
+        print('{0:<12} {1:>8} {2:>12} {3:>12}'.format(
+            'q', 'index', 'median (ms)', 'p95 (ms)'))
+        for q in ['travel', 'jollof', 'ocean pai', '4242', 'zzz']:
+            for use_index in (True, False):
+                app.config['SEARCH_USE_INDEX'] = use_index
+                timings = measure(client, headers, q, args.repeat)
+                print('{0:<12} {1:>8} {2:>12.2f} {3:>12.2f}'.format(
+                    q, 'on' if use_index else 'off',
+                    timings[len(timings) // 2],
+                    timings[int(len(timings) * 0.95) - 1]))
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
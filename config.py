@@ -24,13 +24,54 @@ class Config:
     """
 
     SECRET_KEY = os.environ.get("SECRET_KEY")
-    SQLALCHEMY_COMMIT_ON_TEARDOWN = True
+    # requests commit once through the unit of work instead of at teardown
+    SQLALCHEMY_COMMIT_ON_TEARDOWN = False
+    UNIT_OF_WORK = True
+    SQLALCHEMY_POOL_SIZE = int(os.environ.get("SQLALCHEMY_POOL_SIZE", 5))
+    SQLALCHEMY_MAX_OVERFLOW = int(
+        os.environ.get("SQLALCHEMY_MAX_OVERFLOW", 10))
+    SQLALCHEMY_POOL_TIMEOUT = int(
+        os.environ.get("SQLALCHEMY_POOL_TIMEOUT", 30))
+    SQLALCHEMY_POOL_RECYCLE = int(
+        os.environ.get("SQLALCHEMY_POOL_RECYCLE", 1800))
+    SQLALCHEMY_POOL_PRE_PING = os.environ.get(
+        "SQLALCHEMY_POOL_PRE_PING", "true").lower() == "true"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     USE_TOKEN_AUTH = True
     DEBUG = False
     SSLIFY_SUBDOMAINS = True
     DEFAULT_PER_PAGE = 20
     MAX_PER_PAGE = 100
+    MAX_BATCH_SIZE = 1000
+    EXPORT_BATCH_SIZE = 1000
+    IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+    TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+    TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 300))
+    REFRESH_TOKEN_EXPIRATION = int(
+        os.environ.get("REFRESH_TOKEN_EXPIRATION", 30 * 24 * 3600))
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE_DEPTH = int(
+        os.environ.get("PASSWORD_HASH_QUEUE_DEPTH", 8))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+    PASSWORD_HASH_RETRY_AFTER = 1
+    SEARCH_USE_INDEX = True
+    JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+    JSONIFY_PRETTYPRINT_REGULAR = False
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_MIMETYPES = ('application/json', 'application/x-ndjson')
+    REQUEST_TIMING = os.environ.get(
+        "REQUEST_TIMING", "false").lower() == "true"
+    METRICS = os.environ.get("METRICS", "false").lower() == "true"
+    METRICS_REFRESH_INTERVAL = 1
+    SLOW_QUERY_THRESHOLD = float(
+        os.environ.get("SLOW_QUERY_THRESHOLD", 0.5))
+    SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN")
+    SLOW_QUERY_SAMPLE_RATE = float(
+        os.environ.get("SLOW_QUERY_SAMPLE_RATE", 1.0))
+    SLOW_QUERY_LOG_RATE = float(os.environ.get("SLOW_QUERY_LOG_RATE", 1))
+    SLOW_QUERY_LOG_PARAMETERS = os.environ.get(
+        "SLOW_QUERY_LOG_PARAMETERS", "false").lower() == "true"
 
 
 class DevelopmentConfig(Config):
@@ -56,6 +97,8 @@ class TestingConfig(Config):
 
     USE_RATE_LIMITS = False
     TESTING = True
+    # hash passwords in the request thread instead of starting processes
+    PASSWORD_HASH_WORKERS = 0
     SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DB")
     SERVER_NAME = os.environ.get("SERVER_NAME")
 
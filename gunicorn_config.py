@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for the BucketList API.
+
+Workers serve requests on GUNICORN_THREADS threads, so a worker keeps
+serving while some of its requests wait for a password hash on the hashing
+pool. Cleans up the Prometheus metrics of workers that exit when the
+metrics are shared between workers through PROMETHEUS_MULTIPROC_DIR.
+"""
+import os
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def child_exit(server, worker):
+    """
+    Forget the live gauges of a worker that exited.
+
+    Its counters and histograms are kept, so the totals don't go down.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
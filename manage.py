@@ -3,13 +3,15 @@ Python script for managing the flask application.
 
 This is the script that starts the flask application.
 """
+from __future__ import print_function
+
 from os.path import join, dirname
 import os
 import unittest
 
 from dotenv import load_dotenv
 from flask_migrate import Migrate, MigrateCommand
-from flask_script import Shell, Manager, prompt_bool, Server
+from flask_script import Command, Shell, Manager, prompt_bool, Server
 from flask_sslify import SSLify
 
 from app import db, create_app
@@ -28,6 +30,29 @@ manager.add_command('db', MigrateCommand)
 manager.add_command('runserver', Server())
 
 
+class LoadTest(Command):
+    """
+    Load test a running instance of the API.
+
+    The options are those of `python -m benchmarks.loadtest`, see
+    `python manage.py loadtest --help`.
+    """
+
+    capture_all_args = True
+
+    def run(self, remaining_args):
+        """
+        Run the load test.
+
+        The arguments are passed on to the load test.
+        """
+        from benchmarks.loadtest import main
+        main(remaining_args)
+
+
+manager.add_command('loadtest', LoadTest())
+
+
 @manager.command
 def test():
     """
@@ -39,6 +64,28 @@ def test():
     unittest.TextTestRunner(verbosity=2).run(tests)
 
 
+@manager.option('--users', type=int, default=100)
+@manager.option('--lists-per-user', type=int, default=10)
+@manager.option('--items-per-list', type=int, default=10)
+@manager.option('--seed', type=int, default=0)
+@manager.option('--batch-size', type=int, default=10000)
+@manager.option('--password', default='password')
+@manager.option('--prefix', default='user')
+def seed(users, lists_per_user, items_per_list, seed, batch_size, password,
+         prefix):
+    """
+    Generate synthetic data.
+
+    Writes the users, bucketlists and items with bulk inserts, a batch per
+    transaction, and reports the rows written per second.
+    """
+    from app.seeding import seed as seed_data
+    db.session.remove()
+    seed_data(users, lists_per_user, items_per_list, report=print,
+              seed=seed, batch_size=batch_size, password=password,
+              prefix=prefix)
+
+
 @manager.command
 def create_db():
     """
@@ -0,0 +1,63 @@
+"""bucketlist search index
+
+Revision ID: 5b7e2f1a9c3d
+Revises: c90e0fa809e4
+Create Date: 2026-10-17 09:12:41.208314
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e2f1a9c3d'
+down_revision = 'c90e0fa809e4'
+branch_labels = None
+depends_on = None
+
+
+def sqlite_supports_fts(bind):
+    if bind.dialect.dbapi.sqlite_version_info < (3, 34, 0):
+        return False
+    options = [row[0] for row in bind.execute('PRAGMA compile_options')]
+    return 'ENABLE_FTS5' in options
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_bucketlist_name_trgm "
+                   "ON bucketlist USING gin (name gin_trgm_ops)")
+    elif bind.dialect.name == 'sqlite' and sqlite_supports_fts(bind):
+        op.execute("CREATE VIRTUAL TABLE bucketlist_fts USING fts5("
+                   "name, content='bucketlist', "
+                   "content_rowid='bucketlist_id', tokenize='trigram')")
+        op.execute("CREATE TRIGGER bucketlist_fts_insert "
+                   "AFTER INSERT ON bucketlist BEGIN "
+                   "INSERT INTO bucketlist_fts(rowid, name) "
+                   "VALUES (new.bucketlist_id, new.name); END")
+        op.execute("CREATE TRIGGER bucketlist_fts_delete "
+                   "AFTER DELETE ON bucketlist BEGIN "
+                   "INSERT INTO bucketlist_fts(bucketlist_fts, rowid, name) "
+                   "VALUES ('delete', old.bucketlist_id, old.name); END")
+        op.execute("CREATE TRIGGER bucketlist_fts_update "
+                   "AFTER UPDATE OF name ON bucketlist BEGIN "
+                   "INSERT INTO bucketlist_fts(bucketlist_fts, rowid, name) "
+                   "VALUES ('delete', old.bucketlist_id, old.name); "
+                   "INSERT INTO bucketlist_fts(rowid, name) "
+                   "VALUES (new.bucketlist_id, new.name); END")
+        # index the bucketlists that already exist
+        op.execute("INSERT INTO bucketlist_fts(bucketlist_fts) "
+                   "VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_bucketlist_name_trgm")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS bucketlist_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS bucketlist_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS bucketlist_fts_insert")
+        op.execute("DROP TABLE IF EXISTS bucketlist_fts")
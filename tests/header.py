@@ -4,6 +4,10 @@ Set the headers to be sent when testing.
 Contains functions that test_files use
 """
 import base64
+from contextlib import contextmanager
+import logging
+
+from sqlalchemy import event
 
 
 def create_api_headers(token):
@@ -19,3 +23,68 @@ def create_api_headers(token):
         'Accept': 'application/json',
         'Content-Type': 'application/json'
     }
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Count the SQL statements executed.
+
+    Yields a list which collects every statement sent to the database by the
+    engine while the context is active.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+@contextmanager
+def count_commits(engine):
+    """
+    Count the transactions committed.
+
+    Yields a list which collects an entry for every commit made by the engine
+    while the context is active.
+    """
+    commits = []
+
+    def record(conn):
+        commits.append(conn)
+
+    event.listen(engine, 'commit', record)
+    try:
+        yield commits
+    finally:
+        event.remove(engine, 'commit', record)
+
+
+class RecordingHandler(logging.Handler):
+    """
+    Set up a logging handler that keeps the messages.
+
+    The messages are kept in a list for the tests to check.
+    """
+
+    def __init__(self):
+        """
+        Create the handler.
+
+        No message is recorded yet.
+        """
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        """
+        Record a message.
+
+        The formatted message is kept.
+        """
+        self.messages.append(record.getMessage())
@@ -3,13 +3,14 @@ Test Authentication.
 
 Test user authentication and token generation.
 """
+from datetime import datetime, timedelta
 import unittest
 import json
 
 from flask import url_for
 
 from app import db, create_app
-from app.models import User
+from app.models import RefreshToken, User
 
 
 class TestUserModel(unittest.TestCase):
@@ -146,5 +147,178 @@ class TestUserModel(unittest.TestCase):
         self.assertEqual(response.status_code, 401)
 
 
+class TestRefreshTokens(unittest.TestCase):
+    """
+    Test the refresh tokens.
+
+    A refresh token gets new auth tokens without the password until it
+    expires or is revoked.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates a user.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.user = User(username='njirap')
+        self.user.hash_password('andela')
+        self.user.save()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post(self, endpoint, body):
+        """
+        Post a JSON body to an authentication route.
+
+        Returns the response.
+        """
+        return self.client.post(url_for(endpoint), data=json.dumps(body),
+                                content_type='application/json')
+
+    def login(self):
+        """
+        Log the user in.
+
+        Returns the JSON body of the response.
+        """
+        response = self.post('authentication.login',
+                             {'username': 'njirap', 'password': 'andela'})
+        return json.loads(response.data.decode())
+
+    def test_login_returns_refresh_token(self):
+        """
+        Test the refresh token returned on login.
+
+        Only the hash of the token is stored.
+        """
+        refresh_token = self.login()['refresh_token']
+        stored = RefreshToken.query.one()
+        self.assertEquals(stored.user_id, self.user.user_id)
+        self.assertNotEqual(stored.token_hash, refresh_token)
+        self.assertEquals(stored.token_hash,
+                          RefreshToken.hash_token(refresh_token))
+
+    def test_refresh(self):
+        """
+        Test refreshing the auth token.
+
+        The new token authenticates requests and the password isn't checked.
+        """
+        refresh_token = self.login()['refresh_token']
+        checks = []
+        verify_password = User.verify_password
+        User.verify_password = lambda user, password: checks.append(1)
+        try:
+            response = self.post('authentication.refresh',
+                                 {'refresh_token': refresh_token})
+        finally:
+            User.verify_password = verify_password
+        self.assertEqual(response.status_code, 200)
+        self.assertEquals(checks, [])
+        token = json.loads(response.data.decode())['token']
+        self.assertEquals(User.verify_auth_token(token).user_id,
+                          self.user.user_id)
+
+    def test_refresh_with_invalid_token(self):
+        """
+        Test refreshing with a token that wasn't issued.
+
+        The request is unauthorized.
+        """
+        self.login()
+        response = self.post('authentication.refresh',
+                             {'refresh_token': 'not-a-token'})
+        self.assertEqual(response.status_code, 401)
+        response = self.post('authentication.refresh',
+                             {'refresh_token': ''})
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_with_invalid_body(self):
+        """
+        Test refreshing with a body that isn't a JSON object of strings.
+
+        A token that isn't a string is unauthorized and a body that isn't an
+        object is a bad request.
+        """
+        self.login()
+        for endpoint in ('authentication.refresh', 'authentication.revoke'):
+            for token in (123, ['token'], {'token': 'x'}):
+                response = self.post(endpoint, {'refresh_token': token})
+                self.assertEqual(response.status_code, 401)
+            response = self.post(endpoint, ['token'])
+            self.assertEqual(response.status_code, 400)
+
+    def test_refresh_with_expired_token(self):
+        """
+        Test refreshing with an expired token.
+
+        The request is unauthorized.
+        """
+        refresh_token = self.login()['refresh_token']
+        stored = RefreshToken.query.one()
+        stored.expires_at = datetime.now() - timedelta(seconds=1)
+        stored.save()
+        response = self.post('authentication.refresh',
+                             {'refresh_token': refresh_token})
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoke(self):
+        """
+        Test revoking a refresh token.
+
+        The token can't be used to refresh auth tokens anymore.
+        """
+        refresh_token = self.login()['refresh_token']
+        response = self.post('authentication.revoke',
+                             {'refresh_token': refresh_token})
+        self.assertEqual(response.status_code, 200)
+        response = self.post('authentication.refresh',
+                             {'refresh_token': refresh_token})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_prunes_unusable_tokens(self):
+        """
+        Test logging in with expired and revoked tokens.
+
+        Only the tokens that can still be used are kept.
+        """
+        revoked = self.login()['refresh_token']
+        self.post('authentication.revoke', {'refresh_token': revoked})
+        self.login()
+        expired = RefreshToken.query.filter(
+            RefreshToken.revoked_at.is_(None)).one()
+        expired.expires_at = datetime.now() - timedelta(seconds=1)
+        expired.save()
+        active = self.login()['refresh_token']
+        self.assertEquals([each.token_hash for each in RefreshToken.query],
+                          [RefreshToken.hash_token(active)])
+
+    def test_password_change_revokes_tokens(self):
+        """
+        Test changing the password of a user.
+
+        The refresh tokens issued before the change are revoked.
+        """
+        refresh_token = self.login()['refresh_token']
+        self.user.hash_password('percila')
+        self.user.save()
+        self.assertIsNone(RefreshToken.find(refresh_token))
+
+
 if __name__ == '__main__':
     unittest.main()
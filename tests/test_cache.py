@@ -0,0 +1,168 @@
+"""
+Token Cache Test Case.
+
+Test the cache of verified auth tokens to be certain it's functioning well.
+"""
+import time
+import unittest
+
+from flask import url_for
+
+from app import db, create_app
+from app.cache import Identity, TokenCache, token_cache
+from app.models import User
+from tests.header import count_queries, create_api_headers
+
+
+class TokenCacheTestCase(unittest.TestCase):
+    """
+    Test the TokenCache on its own.
+
+    Test eviction, expiry, invalidation and the hit and miss counters.
+    """
+
+    def setUp(self):
+        """
+        Set up a small cache for testing.
+
+        The cache holds at most two tokens.
+        """
+        self.cache = TokenCache()
+        self.cache.max_size = 2
+        self.expires_at = time.time() + 60
+
+    def test_hit_and_miss(self):
+        """
+        Test the hit and miss counters.
+
+        A cached token counts as a hit and an unknown token as a miss.
+        """
+        self.cache.set('token', Identity(1, 'andela'), self.expires_at)
+        self.assertEquals(self.cache.get('token'), Identity(1, 'andela'))
+        self.assertIsNone(self.cache.get('unknown'))
+        self.assertEquals(self.cache.stats()['hits'], 1)
+        self.assertEquals(self.cache.stats()['misses'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        """
+        Test the cache size is bounded.
+
+        When the cache is full the least recently used token is evicted.
+        """
+        self.cache.set('first', Identity(1, 'andela'), self.expires_at)
+        self.cache.set('second', Identity(2, 'proton'), self.expires_at)
+        self.cache.get('first')
+        self.cache.set('third', Identity(3, 'njira'), self.expires_at)
+        self.assertIsNone(self.cache.get('second'))
+        self.assertIsNotNone(self.cache.get('first'))
+        self.assertIsNotNone(self.cache.get('third'))
+
+    def test_expired_token(self):
+        """
+        Test the token's own expiry is honoured.
+
+        A token isn't returned from the cache after it expires.
+        """
+        self.cache.set('token', Identity(1, 'andela'), time.time() - 1)
+        self.assertIsNone(self.cache.get('token'))
+        self.assertEquals(self.cache.stats()['size'], 0)
+
+    def test_invalidate_user(self):
+        """
+        Test invalidating the tokens of a user.
+
+        Only the tokens of the given user are dropped.
+        """
+        self.cache.set('first', Identity(1, 'andela'), self.expires_at)
+        self.cache.set('second', Identity(2, 'proton'), self.expires_at)
+        self.cache.invalidate_user(1)
+        self.assertIsNone(self.cache.get('first'))
+        self.assertIsNotNone(self.cache.get('second'))
+
+
+class TokenCacheRoutesTestCase(unittest.TestCase):
+    """
+    Test the token cache used by the API.
+
+    Test repeat requests skip the database and changes to a user invalidate
+    the cached tokens.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates a user with a token.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.user = User(username='andela')
+        self.user.hash_password('andela')
+        self.user.save()
+        self.token = self.user.generate_auth_token()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get_bucketlists(self):
+        """
+        Get the BucketLists of the user.
+
+        Returns the response and the statements sent to the database.
+        """
+        db.session.expunge_all()
+        with count_queries(db.engine) as statements:
+            response = self.client.get(
+                url_for('main.get_bucketlists'),
+                headers=create_api_headers(self.token))
+        return response, statements
+
+    def test_repeat_request_skips_user_lookup(self):
+        """
+        Test a repeat request with the same token.
+
+        The user isn't loaded from the database for a cached token.
+        """
+        response, first = self.get_bucketlists()
+        self.assertEquals(response.status_code, 200)
+        response, second = self.get_bucketlists()
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(second), len(first) - 1)
+        self.assertEquals(token_cache.stats()['hits'], 1)
+
+    def test_deleted_user_is_invalidated(self):
+        """
+        Test the token of a deleted user.
+
+        Deleting the user drops the cached token so it stops working.
+        """
+        self.get_bucketlists()
+        self.user.delete()
+        response, statements = self.get_bucketlists()
+        self.assertEquals(response.status_code, 401)
+
+    def test_password_change_is_invalidated(self):
+        """
+        Test the token of a user who changes password.
+
+        Changing the password drops the cached tokens of the user.
+        """
+        self.get_bucketlists()
+        self.user.hash_password('new password')
+        self.user.save()
+        self.assertEquals(token_cache.stats()['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Compression Test Case.
+
+Test the compression of responses to be certain it's functioning well.
+"""
+import json
+import unittest
+import zlib
+
+from flask import url_for
+
+from app import db, create_app
+from app.models import User, BucketList, Items
+from tests.header import create_api_headers
+
+
+class TestCompression(unittest.TestCase):
+    """
+    Test compressing responses.
+
+    Responses above COMPRESS_MIN_SIZE are compressed with the encoding the
+    client accepts.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates a user with BucketLists.
+        """
+        self.app = create_app('testing')
+        self.app.config['COMPRESS_MIN_SIZE'] = 500
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        for index in range(10):
+            bucketlist = BucketList(name='BucketList {0}'.format(index),
+                                    created_by=user.user_id)
+            bucketlist.save()
+            Items(name='Item {0}'.format(index), done=False,
+                  bucketlist_id=bucketlist.bucketlist_id).save()
+        self.bucketlist_id = bucketlist.bucketlist_id
+        self.headers = create_api_headers(user.generate_auth_token())
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get(self, url, encoding=None, **headers):
+        """
+        Get a URL accepting an encoding.
+
+        Returns the response.
+        """
+        headers.update(self.headers)
+        if encoding is not None:
+            headers['Accept-Encoding'] = encoding
+        return self.client.get(url, headers=headers)
+
+    def test_gzip(self):
+        """
+        Test a response sent to a client accepting gzip.
+
+        The body is gzipped and decompresses to the uncompressed response.
+        """
+        url = url_for('main.get_bucketlists')
+        plain = self.get(url)
+        response = self.get(url, 'gzip, deflate')
+        self.assertEquals(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEquals(
+            zlib.decompress(response.data, 16 + zlib.MAX_WBITS), plain.data)
+
+    def test_deflate(self):
+        """
+        Test a response sent to a client accepting deflate only.
+
+        The body is compressed with deflate.
+        """
+        url = url_for('main.get_bucketlists')
+        plain = self.get(url)
+        response = self.get(url, 'deflate')
+        self.assertEquals(response.headers['Content-Encoding'], 'deflate')
+        self.assertEquals(zlib.decompress(response.data), plain.data)
+
+    def test_uncompressed(self):
+        """
+        Test responses that aren't compressed.
+
+        Clients that don't accept an encoding and small responses get the
+        body as it is.
+        """
+        response = self.get(url_for('main.get_bucketlists'))
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        url = url_for('main.get_bucketlists', limit=1)
+        self.app.config['COMPRESS_MIN_SIZE'] = len(self.get(url).data) + 1
+        response = self.get(url, 'gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+        json.loads(response.data.decode())
+
+        self.app.config['COMPRESS_LEVEL'] = 0
+        response = self.get(url_for('main.get_bucketlists'), 'gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streamed_response(self):
+        """
+        Test compressing a streamed response.
+
+        The export is gzipped while it is streamed.
+        """
+        plain = self.get(url_for('main.export'))
+        response = self.get(url_for('main.export'), 'gzip')
+        self.assertEquals(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEquals(
+            zlib.decompress(response.data, 16 + zlib.MAX_WBITS), plain.data)
+
+    def test_conditional_request(self):
+        """
+        Test revalidating a compressed response.
+
+        The weak ETag of the compressed response still matches.
+        """
+        self.app.config['COMPRESS_MIN_SIZE'] = 0
+        url = url_for('main.get_bucketlist', list_id=self.bucketlist_id)
+        response = self.get(url, 'gzip')
+        self.assertEquals(response.headers['Content-Encoding'], 'gzip')
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.get(url, 'gzip', **{'If-None-Match': etag})
+        self.assertEquals(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
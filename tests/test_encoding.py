@@ -0,0 +1,90 @@
+"""
+Encoding Test Case.
+
+Test the JSON encoding of responses to be certain it's functioning well.
+"""
+from datetime import datetime
+from decimal import Decimal
+import json
+import unittest
+
+from app import create_app
+from app.encoding import AUTO_BACKENDS, jsonify, load_backend
+
+
+class TestEncoding(unittest.TestCase):
+    """
+    Test the responses built by `app.encoding.jsonify`.
+
+    Test the output is compact and the same for every backend installed.
+    """
+
+    data = {
+        'name': 'Travel',
+        'date_created': datetime(2017, 3, 26, 19, 11, 6),
+        'price': Decimal('10.50'),
+        'items': [{'done': False, 'id': 1}]
+    }
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.test_request_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        self.app_context.pop()
+
+    def test_compact_output(self):
+        """
+        Test the response is compact.
+
+        There is no whitespace between keys and values and dates are sent as
+        HTTP dates.
+        """
+        self.app.extensions['json_backend'] = load_backend('json')
+        response = jsonify(self.data)
+        self.assertEquals(response.mimetype, 'application/json')
+        self.assertEquals(
+            response.get_data(as_text=True),
+            '{"date_created":"Sun, 26 Mar 2017 19:11:06 GMT",'
+            '"items":[{"done":false,"id":1}],"name":"Travel",'
+            '"price":"10.50"}\n')
+
+    def test_backends_agree(self):
+        """
+        Test every backend installed.
+
+        Each backend encodes the same data to the same JSON.
+        """
+        outputs = []
+        for name in AUTO_BACKENDS:
+            try:
+                self.app.extensions['json_backend'] = load_backend(name)
+            except ImportError:
+                continue
+            outputs.append(jsonify(self.data).get_data())
+        self.assertEquals(len(set(outputs)), 1)
+        self.assertEquals(json.loads(outputs[0].decode('utf-8'))['price'],
+                          '10.50')
+
+    def test_unknown_backend(self):
+        """
+        Test an unknown backend.
+
+        Loading a backend that doesn't exist raises a ValueError.
+        """
+        self.assertRaises(ValueError, load_backend, 'marshal')
+
+
+if __name__ == '__main__':
+    unittest.main()
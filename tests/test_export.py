@@ -0,0 +1,181 @@
+"""
+Export Test Case.
+
+Test the export of a user's data to be certain it's functioning well.
+"""
+from datetime import datetime
+from os import environ
+import json
+import resource
+import unittest
+
+from flask import url_for
+
+from app import db, create_app
+from app.models import User, BucketList, Items
+from tests.header import create_api_headers
+
+
+class TestExport(unittest.TestCase):
+    """
+    Test the export endpoint.
+
+    The export must hold every BucketList and item of the user and nothing
+    of other users.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates two users with BucketLists.
+        """
+        self.app = create_app('testing')
+        self.app.config['EXPORT_BATCH_SIZE'] = 2
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        users = [User(username=name) for name in ['andela', 'proton']]
+        for user in users:
+            user.hash_password(user.username)
+        db.session.add_all(users)
+        db.session.commit()
+        travel = BucketList(name='Travel', created_by=users[0].user_id)
+        empty = BucketList(name='Empty', created_by=users[0].user_id)
+        other = BucketList(name='Other', created_by=users[1].user_id)
+        db.session.add_all([travel, empty, other])
+        db.session.commit()
+        db.session.add_all([
+            Items(name='Paris', done=True, bucketlist_id=travel.bucketlist_id),
+            Items(name='Lisbon', done=False,
+                  bucketlist_id=travel.bucketlist_id),
+            Items(name='Hidden', done=False,
+                  bucketlist_id=other.bucketlist_id)])
+        db.session.commit()
+        self.token = users[0].generate_auth_token()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_export(self):
+        """
+        Test the exported lines.
+
+        Each BucketList of the user is followed by its items and the data of
+        other users isn't exported.
+        """
+        response = self.client.get(url_for('main.export'),
+                                   headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in
+                 response.get_data(as_text=True).splitlines()]
+        self.assertEquals(
+            [(line['type'], line['name']) for line in lines],
+            [('bucketlist', 'Travel'), ('item', 'Paris'), ('item', 'Lisbon'),
+             ('bucketlist', 'Empty')])
+        self.assertEquals(lines[0]['item_count'], 2)
+        self.assertEquals(lines[0]['done_count'], 1)
+        self.assertEquals(lines[1]['bucketlist_id'], lines[0]['id'])
+        self.assertTrue(lines[1]['done'])
+
+    def test_export_requires_authentication(self):
+        """
+        Test exporting without a token.
+
+        The API returns a 401 error.
+        """
+        response = self.client.get(url_for('main.export'))
+        self.assertEquals(response.status_code, 401)
+
+
+@unittest.skipUnless(environ.get('TEST_EXPORT_ITEMS'),
+                     'TEST_EXPORT_ITEMS is not set')
+class TestExportMemory(unittest.TestCase):
+    """
+    Test the memory used by a large export.
+
+    TEST_EXPORT_ITEMS sets the number of items of the account exported, e.g.
+    1000000. The peak memory of the process must not grow with it.
+    """
+
+    # the most the peak memory may grow while exporting, in kilobytes
+    max_growth = 64 * 1024
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' starts the application in test mode and creates a
+        user with TEST_EXPORT_ITEMS items in 100 BucketLists.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        self.token = user.generate_auth_token()
+
+        now = datetime.now()
+        db.session.execute(BucketList.__table__.insert(), [
+            {'name': 'List {0}'.format(index), 'created_by': user.user_id,
+             'date_created': now, 'date_modified': now}
+            for index in range(1, 101)])
+        self.total = int(environ.get('TEST_EXPORT_ITEMS'))
+        for start in range(0, self.total, 10000):
+            db.session.execute(Items.__table__.insert(), [
+                {'name': 'Item {0}'.format(index), 'done': index % 2 == 0,
+                 'bucketlist_id': index % 100 + 1, 'date_created': now,
+                 'date_modified': now}
+                for index in range(start, min(start + 10000, self.total))])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_export_memory(self):
+        """
+        Test the peak memory of a large export.
+
+        The export is read chunk by chunk and the peak memory of the process
+        grows by much less than the size of the export.
+        """
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        response = self.client.get(url_for('main.export'),
+                                   headers=create_api_headers(self.token),
+                                   buffered=False)
+        size = lines = 0
+        for chunk in response.response:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        response.close()
+        growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+        self.assertEquals(lines, self.total + 100)
+        self.assertLess(growth, self.max_growth)
+        self.assertLess(growth * 1024, size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Hashing Test Case.
+
+Test the password hashing pool to be certain it's functioning well.
+"""
+import json
+import time
+import unittest
+
+from flask import url_for
+
+from app import db, create_app
+from app.hashing import HashingUnavailable, password_hasher
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """
+    Test hashing passwords on a process pool.
+
+    The pool has one process and no queue, so a second hash at the same
+    time is turned away.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' starts the application in test mode with a
+        hashing pool.
+        """
+        self.app = create_app('testing')
+        self.app.config.update(PASSWORD_HASH_WORKERS=1,
+                               PASSWORD_HASH_QUEUE_DEPTH=0,
+                               PASSWORD_HASH_RETRY_AFTER=2)
+        password_hasher.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method stops the pool and removes every information related to
+        the test cases.
+        """
+        password_hasher.close()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_hash_on_pool(self):
+        """
+        Test hashing and checking a password on the pool.
+
+        The hashes are timed.
+        """
+        pwhash = password_hasher.generate('andela')
+        self.assertTrue(password_hasher.check(pwhash, 'andela'))
+        self.assertFalse(password_hasher.check(pwhash, 'percila'))
+        stats = password_hasher.stats()
+        self.assertEquals(stats['hashes'], 3)
+        self.assertEquals(stats['in_flight'], 0)
+        self.assertGreater(stats['max_seconds'], 0)
+
+    def test_full_pool_rejects(self):
+        """
+        Test hashing while every slot of the pool is taken.
+
+        The hash is turned away instead of waiting.
+        """
+        password_hasher._slots.acquire()
+        try:
+            with self.assertRaises(HashingUnavailable):
+                password_hasher.generate('andela')
+        finally:
+            password_hasher._slots.release()
+        self.assertEquals(password_hasher.stats()['rejected'], 1)
+        self.assertTrue(password_hasher.generate('andela'))
+
+    def test_timeout(self):
+        """
+        Test a hash that takes longer than the timeout.
+
+        The request stops waiting for it.
+        """
+        password_hasher.timeout = 0.001
+        with self.assertRaises(HashingUnavailable):
+            password_hasher.generate('andela')
+        self.assertEquals(password_hasher.stats()['timeouts'], 1)
+
+    def test_timed_out_hash_keeps_its_slot(self):
+        """
+        Test hashing while a hash that timed out is still running.
+
+        The hash that timed out holds its slot until it finishes, so the
+        next hash is turned away, and gets through once it has finished.
+        """
+        password_hasher.timeout = 0.05
+        with self.assertRaises(HashingUnavailable):
+            password_hasher._run(time.sleep, 1)
+        with self.assertRaises(HashingUnavailable):
+            password_hasher.generate('andela')
+        stats = password_hasher.stats()
+        self.assertEquals((stats['timeouts'], stats['rejected']), (1, 1))
+
+        password_hasher.timeout = 10
+        deadline = time.time() + 10
+        while not password_hasher._slots.acquire(False):
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.05)
+        password_hasher._slots.release()
+        self.assertTrue(password_hasher.generate('andela'))
+
+    def test_errors_raised(self):
+        """
+        Test a hash that raises an error on the pool.
+
+        The error is raised in the request and the slot is given back.
+        """
+        with self.assertRaises(ValueError):
+            password_hasher._run(int, 'andela')
+        self.assertTrue(password_hasher.generate('andela'))
+
+    def test_register_when_full(self):
+        """
+        Test registering while every slot of the pool is taken.
+
+        The client is told to retry later and no user is created.
+        """
+        password_hasher._slots.acquire()
+        try:
+            response = self.client.post(
+                url_for('authentication.register_user'),
+                data=json.dumps({'username': 'proton', 'password': 'andela'}),
+                content_type='application/json')
+        finally:
+            password_hasher._slots.release()
+        self.assertEquals(response.status_code, 503)
+        self.assertEquals(response.headers['Retry-After'], '2')
+        self.assertEquals(json.loads(response.data.decode())['status'], 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
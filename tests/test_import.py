@@ -0,0 +1,175 @@
+"""
+Import Test Case.
+
+Test the import of a user's data to be certain it's functioning well.
+"""
+import json
+import unittest
+
+from flask import url_for
+
+from app import db, create_app
+from app.models import User, BucketList, Items
+from tests.header import count_queries, create_api_headers
+
+
+class TestImport(unittest.TestCase):
+    """
+    Test the import endpoint.
+
+    Every valid line must be imported in chunks and every invalid line must
+    be reported.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates a user with a BucketList and an item.
+        """
+        self.app = create_app('testing')
+        self.app.config['IMPORT_CHUNK_SIZE'] = 3
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        self.user = user
+        bucketlist = BucketList(name='Travel', created_by=user.user_id)
+        bucketlist.save()
+        Items(name='Paris', done=False,
+              bucketlist_id=bucketlist.bucketlist_id).save()
+        self.token = user.generate_auth_token()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post(self, lines, token=None):
+        """
+        Post lines to the import endpoint.
+
+        Returns the response and the lines of JSON it holds.
+        """
+        body = '\n'.join(json.dumps(line) if isinstance(line, dict) else line
+                         for line in lines)
+        response = self.client.post(
+            url_for('main.import_bucketlists'), data=body,
+            headers=create_api_headers(token or self.token))
+        return response, [json.loads(line) for line in
+                          response.get_data(as_text=True).splitlines()]
+
+    def test_import(self):
+        """
+        Test importing BucketLists and items.
+
+        The rows are inserted in chunks, each with one statement per table,
+        and the counters of the BucketLists are updated.
+        """
+        with count_queries(db.engine) as statements:
+            response, results = self.post([
+                {'type': 'bucketlist', 'name': 'Cook'},
+                {'type': 'item', 'name': 'Pasta', 'done': True},
+                {'type': 'item', 'name': 'Jollof', 'done': 'false'},
+                {'type': 'bucketlist', 'name': 'Read'},
+                {'type': 'item', 'name': 'Dune'}
+            ])
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([each['type'] for each in results],
+                          ['progress', 'summary'])
+        self.assertEquals(results[-1], {
+            'type': 'summary', 'lines': 5, 'bucketlists': 2, 'items': 3,
+            'errors': 0})
+        self.assertEquals(len([each for each in statements
+                               if each.startswith('INSERT INTO items')]), 2)
+
+        cook = BucketList.query.filter_by(name='Cook').first()
+        self.assertEquals((cook.item_count, cook.done_count), (2, 1))
+        self.assertEquals(sorted(each.name for each in cook.items),
+                          ['Jollof', 'Pasta'])
+
+    def test_import_errors(self):
+        """
+        Test importing invalid lines.
+
+        Each invalid line and each conflict is reported with its line number
+        and the other lines are imported. The items of an existing BucketList
+        are added to it.
+        """
+        response, results = self.post([
+            'not json',
+            {'type': 'item', 'name': 'Orphan'},
+            {'type': 'bucketlist'},
+            {'type': 'bucketlist', 'name': 'Travel'},
+            {'type': 'item', 'name': 'Paris'},
+            {'type': 'item', 'name': 'Lisbon', 'done': 'maybe'},
+            {'type': 'item', 'name': 'Lisbon'},
+            {'type': 'item', 'name': 'Lisbon'}
+        ])
+        errors = [(each['line'], each['status']) for each in results
+                  if each['type'] == 'error']
+        self.assertEquals(sorted(errors), [
+            (1, 400), (2, 400), (3, 400), (4, 409), (5, 409), (6, 400),
+            (8, 409)])
+        self.assertEquals(results[-1]['items'], 1)
+        travel = BucketList.query.filter_by(name='Travel').first()
+        self.assertEquals(travel.item_count, 2)
+
+    def test_items_after_rejected_bucketlist(self):
+        """
+        Test importing the items of a rejected BucketList.
+
+        The items following a BucketList line that was rejected aren't added
+        to the BucketList before it.
+        """
+        response, results = self.post([
+            {'type': 'bucketlist', 'name': 'Cook'},
+            {'type': 'item', 'name': 'Pasta'},
+            {'type': 'bucketlist', 'name': ''},
+            {'type': 'item', 'name': 'Jollof'},
+            {'type': 'bucketlist', 'name': 'x' * 70},
+            {'type': 'item', 'name': 'Suya'},
+            'not json',
+            {'type': 'item', 'name': 'Egusi'}
+        ])
+        errors = [(each['line'], each['status']) for each in results
+                  if each['type'] == 'error']
+        self.assertEquals(sorted(errors), [
+            (3, 400), (4, 400), (5, 400), (6, 400), (7, 400), (8, 400)])
+        cook = BucketList.query.filter_by(name='Cook').first()
+        self.assertEquals(cook.item_count, 1)
+        self.assertEquals([each.name for each in cook.items], ['Pasta'])
+
+    def test_export_can_be_imported(self):
+        """
+        Test importing an export.
+
+        The BucketLists and items exported by a user can be imported by
+        another user.
+        """
+        export = self.client.get(url_for('main.export'),
+                                 headers=create_api_headers(self.token))
+        user = User(username='proton')
+        user.hash_password('proton')
+        user.save()
+        response, results = self.post(
+            export.get_data(as_text=True).splitlines(),
+            token=user.generate_auth_token())
+        self.assertEquals(results[-1]['bucketlists'], 1)
+        self.assertEquals(results[-1]['items'], 1)
+        imported = BucketList.query.filter_by(created_by=user.user_id).one()
+        self.assertEquals([each.name for each in imported.items], ['Paris'])
+
+
+if __name__ == '__main__':
+    unittest.main()
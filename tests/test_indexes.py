@@ -0,0 +1,170 @@
+"""
+Indexes Test Case.
+
+Test the queries the API runs most often use the indexes defined for them.
+"""
+from os import environ
+import unittest
+
+from app import db, create_app
+from app.models import User, BucketList, Items
+from app.serializers import BUCKETLIST_COLUMNS, ITEM_COLUMNS
+
+
+class TestIndexesSQLite(unittest.TestCase):
+    """
+    Test the query plans of the hot queries on SQLite.
+
+    The listing, cursor and item queries must search an index rather than
+    scan their table.
+    """
+
+    database_uri = 'sqlite://'
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode on the
+        database being tested and creates a BucketList with an item.
+        """
+        self.app = create_app('testing')
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = self.database_uri
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        bucketlist = BucketList(name='Travel', created_by=user.user_id)
+        bucketlist.save()
+        Items(name='Paris', done=False,
+              bucketlist_id=bucketlist.bucketlist_id).save()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def explain(self, query):
+        """
+        Get the query plan of a query.
+
+        Returns the plan as text.
+        """
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        if compiled.positional:
+            params = tuple(compiled.params[name]
+                           for name in compiled.positiontup)
+        else:
+            params = compiled.params
+        rows = db.session.connection().execute(
+            'EXPLAIN QUERY PLAN ' + str(compiled), params)
+        return '\n'.join(str(row[-1]) for row in rows)
+
+    def test_listing_uses_owner_index(self):
+        """
+        Test the query that lists the BucketLists of a user.
+
+        The BucketLists are found through the (created_by, bucketlist_id)
+        index.
+        """
+        query = BucketList.query.filter_by(created_by=1).with_entities(
+            *BUCKETLIST_COLUMNS).limit(20).offset(20)
+        self.assertIn('ix_bucketlist_created_by_bucketlist_id',
+                      self.explain(query))
+
+    def test_cursor_uses_owner_index(self):
+        """
+        Test the query that lists BucketLists after a cursor.
+
+        The index serves both the seek and the order of the results.
+        """
+        query = BucketList.query.filter_by(created_by=1).filter(
+            BucketList.bucketlist_id > 10).order_by(
+            BucketList.bucketlist_id).limit(21)
+        plan = self.explain(query)
+        self.assertIn('ix_bucketlist_created_by_bucketlist_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan.upper())
+
+    def test_items_use_bucketlist_index(self):
+        """
+        Test the query that loads the items of a page of BucketLists.
+
+        The items are found through the (bucketlist_id, item_id) index.
+        """
+        query = db.session.query(*ITEM_COLUMNS).filter(
+            Items.bucketlist_id.in_([1, 2, 3])).order_by(Items.item_id)
+        self.assertIn('ix_items_bucketlist_id_item_id', self.explain(query))
+
+    def test_item_page_uses_bucketlist_index(self):
+        """
+        Test the query that pages through the items of a BucketList.
+
+        The index serves both the seek and the order of the items.
+        """
+        query = Items.in_bucketlist(1, done=True).filter(
+            Items.item_id > 10).limit(21)
+        plan = self.explain(query)
+        self.assertIn('ix_items_bucketlist_id_item_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan.upper())
+
+
+@unittest.skipUnless(environ.get('TEST_POSTGRES_DB'),
+                     'TEST_POSTGRES_DB is not set')
+class TestIndexesPostgreSQL(TestIndexesSQLite):
+    """
+    Test the query plans of the hot queries on PostgreSQL.
+
+    Sequential scans are disabled because the test tables are too small for
+    the planner to pick an index otherwise.
+    """
+
+    database_uri = environ.get('TEST_POSTGRES_DB')
+
+    def explain(self, query):
+        """
+        Get the query plan of a query.
+
+        Returns the plan as text.
+        """
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        connection = db.session.connection()
+        connection.execute('SET LOCAL enable_seqscan = off')
+        rows = connection.execute('EXPLAIN ' + str(compiled), compiled.params)
+        return '\n'.join(row[0] for row in rows)
+
+    def test_cursor_uses_owner_index(self):
+        """
+        Test the query that lists BucketLists after a cursor.
+
+        The index serves both the seek and the order of the results.
+        """
+        query = BucketList.query.filter_by(created_by=1).filter(
+            BucketList.bucketlist_id > 10).order_by(
+            BucketList.bucketlist_id).limit(21)
+        plan = self.explain(query)
+        self.assertIn('ix_bucketlist_created_by_bucketlist_id', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_item_page_uses_bucketlist_index(self):
+        """
+        Test the query that pages through the items of a BucketList.
+
+        The index serves both the seek and the order of the items.
+        """
+        query = Items.in_bucketlist(1, done=True).filter(
+            Items.item_id > 10).limit(21)
+        plan = self.explain(query)
+        self.assertIn('ix_items_bucketlist_id_item_id', plan)
+        self.assertNotIn('Sort', plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
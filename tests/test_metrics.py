@@ -0,0 +1,210 @@
+"""
+Metrics Test Case.
+
+Test the Prometheus metrics to be certain they're functioning well.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from flask import Flask, url_for
+from prometheus_client import REGISTRY
+
+from app import db, create_app, metrics
+from app.models import User
+from tests.header import create_api_headers
+
+
+def sample(name, **labels):
+    """
+    Read a metric of this process.
+
+    Returns 0 for a metric that wasn't recorded yet.
+    """
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test recording requests.
+
+    Requests are counted per endpoint and status, timed, and their SQL
+    statements counted.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode with
+        METRICS set and creates a user.
+        """
+        self.app = create_app('testing')
+        self.app.config['METRICS'] = True
+        metrics.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        self.headers = create_api_headers(user.generate_auth_token())
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_request_metrics(self):
+        """
+        Test the metrics of a request.
+
+        The request is counted with its status, timed and its statements
+        counted, and is no longer in progress once answered.
+        """
+        endpoint = 'main.get_bucketlists'
+        labels = {'endpoint': endpoint, 'method': 'GET', 'status': '200'}
+        requests = sample('http_requests_total', **labels)
+        observed = sample('http_request_duration_seconds_count',
+                          endpoint=endpoint)
+        queries = sample('db_queries_total', endpoint=endpoint)
+        in_progress = sample('http_requests_in_progress')
+
+        response = self.client.get(url_for(endpoint), headers=self.headers)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(sample('http_requests_total', **labels),
+                          requests + 1)
+        self.assertEquals(sample('http_request_duration_seconds_count',
+                                 endpoint=endpoint), observed + 1)
+        self.assertGreater(sample('db_queries_total', endpoint=endpoint),
+                           queries)
+        self.assertEquals(sample('http_requests_in_progress'), in_progress)
+
+        labels['status'] = '401'
+        requests = sample('http_requests_total', **labels)
+        self.client.get(url_for(endpoint))
+        self.assertEquals(sample('http_requests_total', **labels),
+                          requests + 1)
+
+    def test_exception_counted_as_error(self):
+        """
+        Test a request that raises an exception.
+
+        The request is counted as a 500 and is no longer in progress.
+        """
+        def fail():
+            raise RuntimeError('failed')
+        self.app.add_url_rule('/fail', 'fail', fail)
+        labels = {'endpoint': 'fail', 'method': 'GET', 'status': '500'}
+        requests = sample('http_requests_total', **labels)
+        in_progress = sample('http_requests_in_progress')
+        with self.assertRaises(RuntimeError):
+            self.client.get('/fail')
+        self.assertEquals(sample('http_requests_total', **labels),
+                          requests + 1)
+        self.assertEquals(sample('http_requests_in_progress'), in_progress)
+
+    def test_metrics_endpoint(self):
+        """
+        Test reading the metrics.
+
+        The metrics are served in the Prometheus text format.
+        """
+        self.client.get(url_for('main.get_bucketlists'), headers=self.headers)
+        response = self.client.get('/metrics')
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.data.decode()
+        self.assertIn('http_requests_total{', text)
+        self.assertIn('http_request_duration_seconds_bucket{', text)
+        self.assertIn('token_cache_hits ', text)
+        self.assertIn('password_hash_hashes ', text)
+
+    def test_metrics_disabled(self):
+        """
+        Test an application without METRICS.
+
+        There is no metrics endpoint, as by default.
+        """
+        self.assertFalse(create_app('testing').config['METRICS'])
+        app = Flask(__name__)
+        app.config['METRICS'] = False
+        metrics.init_app(app)
+        self.assertFalse(app.url_map.bind('localhost').test('/metrics'))
+        self.assertEquals(app.before_request_funcs, {})
+
+
+class TestMultiprocessMetrics(unittest.TestCase):
+    """
+    Test the metrics of several worker processes.
+
+    Workers share their metrics through PROMETHEUS_MULTIPROC_DIR, so any of
+    them reports the requests of all.
+    """
+
+    SCRIPT = textwrap.dedent('''
+        import os
+        from app import db, create_app
+
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+
+        def handle(count):
+            client = app.test_client()
+            for each in range(count):
+                client.get('/api/v1/bucketlists/')
+
+        pid = os.fork()
+        if pid == 0:
+            handle(2)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        handle(1)
+        print(app.test_client().get('/metrics').data.decode())
+    ''')
+
+    def setUp(self):
+        """
+        Set up a directory for the metrics.
+
+        The directory is removed after the test.
+        """
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes the metrics directory.
+        """
+        shutil.rmtree(self.directory)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_requests_added_up(self):
+        """
+        Test reading the metrics after requests in two processes.
+
+        The requests of both processes are counted.
+        """
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=self.directory,
+                   METRICS='true')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', self.SCRIPT],
+                                         env=env, cwd=root)
+        self.assertIn('http_requests_total{endpoint="main.get_bucketlists",'
+                      'method="GET",status="401"} 3.0', output.decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
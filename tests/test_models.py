@@ -73,5 +73,128 @@ class UserModelTestCase(unittest.TestCase):
         self.assertTrue(u.verify_password(password))
 
 
+class BucketListCountersTestCase(unittest.TestCase):
+    """
+    Test the item counters of BucketLists.
+
+    The counters must always match the items of the BucketLists.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' starts the application in test mode and creates a
+        user with two BucketLists.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.test_request_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        self.first = BucketList(name='Travel', created_by=user.user_id)
+        self.second = BucketList(name='Cook', created_by=user.user_id)
+        db.session.add_all([self.first, self.second])
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assertCounts(self, bucketlist, item_count, done_count):
+        """
+        Check the counters of a BucketList.
+
+        The counters are read again from the database and compared with both
+        the expected values and the items of the BucketList.
+        """
+        db.session.refresh(bucketlist)
+        self.assertEquals((bucketlist.item_count, bucketlist.done_count),
+                          (item_count, done_count))
+        self.assertEquals(bucketlist.items.count(), item_count)
+        self.assertEquals(bucketlist.items.filter_by(done=True).count(),
+                          done_count)
+
+    def test_counters_follow_item_changes(self):
+        """
+        Test the counters through the life of an item.
+
+        Adding, completing, moving and deleting items update the counters of
+        their BucketLists.
+        """
+        item = Items(name='Lisbon', done=False,
+                     bucketlist_id=self.first.bucketlist_id)
+        item.save()
+        Items(name='Paris', done=True,
+              bucketlist_id=self.first.bucketlist_id).save()
+        self.assertCounts(self.first, 2, 1)
+
+        item.done = True
+        item.save()
+        self.assertCounts(self.first, 2, 2)
+
+        item.bucketlist_id = self.second.bucketlist_id
+        item.save()
+        self.assertCounts(self.first, 1, 1)
+        self.assertCounts(self.second, 1, 1)
+
+        item.delete()
+        self.assertCounts(self.second, 0, 0)
+
+    def test_counters_after_expired_update(self):
+        """
+        Test updating an item that isn't loaded.
+
+        The previous done value is loaded for the counters when an item is
+        changed after its attributes expired.
+        """
+        item = Items(name='Lisbon', done=True,
+                     bucketlist_id=self.first.bucketlist_id)
+        item.save()
+        db.session.expire(item)
+        item.done = False
+        item.save()
+        self.assertCounts(self.first, 1, 0)
+
+    def test_counters_after_insert_many(self):
+        """
+        Test the counters of items inserted together.
+
+        Inserting many items at once counts them in their BucketLists.
+        """
+        Items.insert_many([
+            Items(name=name, done=done, bucketlist_id=bucketlist_id)
+            for name, done, bucketlist_id in [
+                ('Lisbon', True, self.first.bucketlist_id),
+                ('Paris', False, self.first.bucketlist_id),
+                ('Pasta', True, self.second.bucketlist_id)]])
+        db.session.commit()
+        self.assertCounts(self.first, 2, 1)
+        self.assertCounts(self.second, 1, 1)
+
+    def test_delete_bucketlist_with_items(self):
+        """
+        Test deleting a BucketList that has items.
+
+        The items are deleted with the BucketList.
+        """
+        for name in ['Lisbon', 'Paris']:
+            Items(name=name, done=False,
+                  bucketlist_id=self.first.bucketlist_id).save()
+        list_id = self.first.bucketlist_id
+        self.first.delete()
+        self.assertEquals(Items.query.filter_by(
+            bucketlist_id=list_id).count(), 0)
+        self.assertCounts(self.second, 0, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
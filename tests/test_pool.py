@@ -0,0 +1,190 @@
+"""
+Pool Test Case.
+
+Test the database connection pool to be certain it's functioning well.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine.url import make_url
+
+from app import db, create_app
+from app.pool import InstrumentedQueuePool, pool_stats
+
+
+class TestPoolConfig(unittest.TestCase):
+    """
+    Test the pool options of the engine.
+
+    The SQLALCHEMY_POOL_* settings configure the pool of every database but
+    SQLite.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode.
+        """
+        self.app = create_app('testing')
+        self.app.config.update(SQLALCHEMY_POOL_SIZE=3,
+                               SQLALCHEMY_MAX_OVERFLOW=2,
+                               SQLALCHEMY_POOL_PRE_PING=True)
+
+    def test_pool_options(self):
+        """
+        Test the options of a PostgreSQL engine.
+
+        The instrumented pool is used with the configured settings.
+        """
+        options = {}
+        db.apply_driver_hacks(self.app, make_url('postgresql://localhost/db'),
+                              options)
+        self.assertEquals(options['poolclass'], InstrumentedQueuePool)
+        self.assertEquals(options['pool_size'], 3)
+        self.assertEquals(options['max_overflow'], 2)
+        self.assertTrue(options['pre_ping'])
+
+    def test_sqlite_keeps_its_pool(self):
+        """
+        Test the options of an in-memory SQLite engine.
+
+        The pool options aren't set since the database lives in a single
+        connection.
+        """
+        options = {}
+        db.apply_driver_hacks(self.app, make_url('sqlite://'), options)
+        self.assertNotEqual(options['poolclass'], InstrumentedQueuePool)
+        self.assertNotIn('pool_size', options)
+
+
+class TestInstrumentedQueuePool(unittest.TestCase):
+    """
+    Test the instrumented pool under load.
+
+    A small pool over a SQLite file is checked out by more threads than it
+    has connections.
+    """
+
+    def setUp(self):
+        """
+        Set up a database for testing.
+
+        The method 'setUp' creates a SQLite file in a temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.uri = 'sqlite:///' + os.path.join(self.directory, 'pool.db')
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes the temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+    def engine(self, **kwargs):
+        """
+        Create an engine with the instrumented pool.
+
+        The connections of the pool are shared between threads.
+        """
+        return create_engine(self.uri, poolclass=InstrumentedQueuePool,
+                             connect_args={'check_same_thread': False},
+                             **kwargs)
+
+    def saturate(self, engine, threads, hold=None):
+        """
+        Check out connections from many threads at once.
+
+        Each thread holds its connection for `hold` seconds, or by default
+        until every thread has either checked out a connection or timed out,
+        so the timeouts don't depend on how fast the threads run. Returns
+        the number of threads that timed out.
+        """
+        held, timeouts = [], []
+        release = threading.Event()
+
+        def work():
+            try:
+                connection = engine.connect()
+            except exc.TimeoutError:
+                timeouts.append(1)
+                return
+            connection.execute('SELECT 1')
+            held.append(1)
+            if hold is None:
+                release.wait(30)
+            else:
+                time.sleep(hold)
+            connection.close()
+
+        workers = [threading.Thread(target=work) for each in range(threads)]
+        for worker in workers:
+            worker.start()
+        if hold is None:
+            deadline = time.time() + 30
+            while len(held) + len(timeouts) < threads and \
+                    time.time() < deadline:
+                time.sleep(0.01)
+            release.set()
+        for worker in workers:
+            worker.join()
+        return len(timeouts)
+
+    def test_saturated_pool_times_out(self):
+        """
+        Test a pool with more requests than connections.
+
+        The requests beyond the size and overflow of the pool wait for the
+        timeout and fail, and the timeouts and waits are counted.
+        """
+        engine = self.engine(pool_size=2, max_overflow=1, pool_timeout=0.2)
+        self.assertEquals(self.saturate(engine, 5), 2)
+        stats = pool_stats(engine)
+        self.assertEquals(stats['timeouts'], 2)
+        self.assertEquals(stats['checkouts'], 3)
+        self.assertEquals(stats['checkins'], 3)
+        self.assertEquals(stats['checked_out'], 0)
+        self.assertGreater(stats['max_wait_seconds'], 0.15)
+
+    def test_saturated_pool_waits(self):
+        """
+        Test a pool with more requests than connections and a long timeout.
+
+        Requests wait for a connection to be checked in and all succeed.
+        """
+        engine = self.engine(pool_size=2, max_overflow=0, pool_timeout=5)
+        self.assertEquals(self.saturate(engine, 6, 0.1), 0)
+        stats = pool_stats(engine)
+        self.assertEquals(stats['checkouts'], 6)
+        self.assertEquals(stats['connects'], 2)
+        self.assertGreater(stats['wait_seconds'], 0.1)
+
+    def test_pre_ping_replaces_dropped_connections(self):
+        """
+        Test checking out a connection the database dropped.
+
+        The connection fails the ping and is replaced by a new one.
+        """
+        engine = self.engine(pool_size=1, pre_ping=True)
+
+        # the database drops the connection while it sits in the pool
+        event.listen(engine.pool, 'checkin',
+                     lambda dbapi_connection, record: dbapi_connection.close(),
+                     once=True)
+        engine.connect().close()
+
+        self.assertEquals(engine.execute('SELECT 1').scalar(), 1)
+        stats = pool_stats(engine)
+        self.assertEquals(stats['failed_pings'], 1)
+        self.assertEquals(stats['connects'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
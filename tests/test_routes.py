@@ -4,14 +4,19 @@ Routes Test Case.
 Test the routes of the application to be certain it's functioning well.
 """
 
+from datetime import timedelta
 import json
+import os
+import time
 import unittest
 
 from flask import g, url_for
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import http_date
 
 from app import db, create_app
 from app.models import User, BucketList, Items
-from tests.header import create_api_headers
+from tests.header import count_commits, count_queries, create_api_headers
 
 
 class TestAPIRoutes(unittest.TestCase):
@@ -145,6 +150,197 @@ class TestAPIRoutes(unittest.TestCase):
         self.assertEquals(data['bucketlists'][0]['name'],
                           "Protons BucketList")
 
+    def test_get_bucketlists_query_count(self):
+        """
+        Test the number of queries made by the get_bucketlists endpoint.
+
+        The items of every BucketList on a page are loaded together, so the
+        number of queries doesn't grow with the number of BucketLists or
+        items on the page.
+        """
+        def get_page():
+            with count_queries(db.engine) as statements:
+                response = self.client.get(
+                    url_for('main.get_bucketlists'),
+                    query_string={'limit': '100'},
+                    headers=create_api_headers(self.token))
+            self.assertEquals(response.status_code, 200)
+            return len(statements)
+
+        # the first request verifies and caches the token
+        get_page()
+        queries = get_page()
+        user = User.query.filter_by(username=self.default_username).first()
+        for index in range(10):
+            bucketlist = BucketList(name='List {0}'.format(index),
+                                    created_by=user.user_id)
+            db.session.add(bucketlist)
+            db.session.flush()
+            for item in range(5):
+                db.session.add(Items(name='Item {0}'.format(item), done=False,
+                                     bucketlist_id=bucketlist.bucketlist_id))
+        db.session.commit()
+        self.assertEquals(get_page(), queries)
+
+    def test_get_bucketlists_summary(self):
+        """
+        Test listing BucketLists as a summary.
+
+        A summary has the item counters of each BucketList instead of its
+        items and doesn't query the items.
+        """
+        self.client.post(
+            url_for('main.add_bucketlist_item', list_id=1),
+            data=json.dumps({"name": "Travel to Portugal", "done": "true"}),
+            headers=create_api_headers(self.token))
+        with count_queries(db.engine) as statements:
+            response = self.client.get(
+                url_for('main.get_bucketlists'),
+                query_string={'summary': 'true'},
+                headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 200)
+        bucketlist = data['bucketlists'][0]
+        self.assertNotIn('items', bucketlist)
+        self.assertEquals(bucketlist['item_count'], 2)
+        self.assertEquals(bucketlist['done_count'], Items.query.filter_by(
+            bucketlist_id=1, done=True).count())
+        self.assertFalse([each for each in statements if 'items' in each])
+
+    def test_get_bucketlists_with_fields(self):
+        """
+        Test listing some of the fields of BucketLists.
+
+        Only the requested fields are returned and unknown fields are
+        rejected with a 400 error.
+        """
+        response = self.client.get(
+            url_for('main.get_bucketlists'),
+            query_string={'fields': 'id,name', 'include_items': 'count'},
+            headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(sorted(data['bucketlists'][0]),
+                          ['done_count', 'id', 'item_count', 'name'])
+
+        response = self.client.get(
+            url_for('main.get_bucketlist', list_id=1),
+            query_string={'fields': 'name,owner'},
+            headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 400)
+
+    def test_update_bucketlist_with_fields(self):
+        """
+        Test the fields returned by an update.
+
+        The updated BucketList is returned with the requested fields only.
+        """
+        response = self.client.put(
+            url_for('main.update_bucketlist', list_id=1,
+                    fields='name', include_items='false'),
+            data=json.dumps({"name": "John Doe's BucketList"}),
+            headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(data, {'name': "John Doe's BucketList"})
+
+    def test_get_bucketlists_with_cursor(self):
+        """
+        Test the get bucketlists endpoint with cursor pagination.
+
+        Walk forward and back through the BucketLists one at a time using the
+        cursors returned in the meta portion of the response.
+        """
+        def get_page(cursor):
+            with count_queries(db.engine) as statements:
+                response = self.client.get(
+                    url_for('main.get_bucketlists'),
+                    query_string={'cursor': cursor, 'limit': '1'},
+                    headers=create_api_headers(self.token))
+            self.assertEquals(response.status_code, 200)
+            self.assertFalse([each for each in statements
+                              if 'count(' in each.lower()])
+            return json.loads(response.get_data(as_text=True))
+
+        first = get_page('')
+        self.assertEquals(first['bucketlists'][0]['name'],
+                          self.bucketlist_name)
+        self.assertNotIn('total', first['meta'])
+        self.assertIsNone(first['meta']['prev_cursor'])
+
+        second = get_page(first['meta']['next_cursor'])
+        self.assertEquals(second['bucketlists'][0]['name'],
+                          self.bucketlist3_name)
+        self.assertIsNone(second['meta']['next_cursor'])
+
+        previous = get_page(second['meta']['prev_cursor'])
+        self.assertEquals(previous['bucketlists'][0]['name'],
+                          self.bucketlist_name)
+        self.assertIsNone(previous['meta']['prev_cursor'])
+        self.assertEquals(previous['meta']['next_cursor'],
+                          first['meta']['next_cursor'])
+
+    def test_get_bucketlists_with_invalid_cursor(self):
+        """
+        Test the get bucketlists endpoint with an invalid cursor.
+
+        A cursor that wasn't issued by the API returns a 400 error.
+        """
+        response = self.client.get(
+            url_for('main.get_bucketlists'),
+            query_string={'cursor': 'not-a-cursor'},
+            headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 400)
+
+    def test_get_bucketlists_with_negative_limit(self):
+        """
+        Test the get bucketlists endpoint with a limit below one.
+
+        The limit is raised to one instead of returning every BucketList.
+        """
+        for query_string in ({'cursor': '', 'limit': '-2'}, {'limit': '0'}):
+            response = self.client.get(
+                url_for('main.get_bucketlists'), query_string=query_string,
+                headers=create_api_headers(self.token))
+            data = json.loads(response.get_data(as_text=True))
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(data['meta']['limit'], 1)
+            self.assertEquals(len(data['bucketlists']), 1)
+
+    def test_get_bucketlists_without_fields(self):
+        """
+        Test the get bucketlists endpoint with an empty list of fields.
+
+        The API returns a 400 error instead of empty BucketLists.
+        """
+        response = self.client.get(
+            url_for('main.get_bucketlists', fields=''),
+            headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 400)
+
+    def test_get_bucketlists_with_reserved_parameters(self):
+        """
+        Test the get bucketlists endpoint with url_for's own parameters.
+
+        Parameters such as `endpoint` and `_anchor` aren't kept in the page
+        URLs, in either pagination mode.
+        """
+        for query_string in ({}, {'cursor': ''}):
+            query_string.update({'endpoint': 'x', '_external': '0',
+                                 '_anchor': 'evil', 'limit': '1'})
+            response = self.client.get(
+                url_for('main.get_bucketlists'), query_string=query_string,
+                headers=create_api_headers(self.token))
+            data = json.loads(response.get_data(as_text=True))
+            self.assertEquals(response.status_code, 200)
+            links = [link for key, link in data['meta'].items()
+                     if key in ('first', 'last', 'next', 'prev') and link]
+            self.assertTrue(links)
+            for link in links:
+                self.assertTrue(link.startswith('http'))
+                self.assertNotIn('evil', link)
+                self.assertNotIn('endpoint', link)
+
     def test_get_bucketlist(self):
         """
         Test the main.get_bucketlist endpoint.
@@ -156,6 +352,86 @@ class TestAPIRoutes(unittest.TestCase):
             headers=create_api_headers(self.token))
         self.assertEquals(response.status_code, 200)
 
+    def test_get_bucketlist_not_modified(self):
+        """
+        Test conditional requests for a single BucketList.
+
+        The ETag of an unchanged BucketList gets a 304 status code, and a new
+        ETag is returned once one of its items changes.
+        """
+        url = url_for('main.get_bucketlist', list_id=1)
+        headers = create_api_headers(self.token)
+        response = self.client.get(url, headers=headers)
+        etag = response.headers['ETag']
+        self.assertEquals(response.status_code, 200)
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+        headers['If-None-Match'] = etag
+        response = self.client.get(url, headers=headers)
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response.get_data(), b'')
+
+        self.client.put(
+            url_for('main.update_bucketlist_item', list_id=1, item_id=1),
+            data=json.dumps({"name": "Travel to Nigeria", "done": "true"}),
+            headers=create_api_headers(self.token))
+        response = self.client.get(url, headers=headers)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEquals(response.headers['ETag'], etag)
+
+    def test_get_bucketlists_not_modified(self):
+        """
+        Test conditional requests for the list of BucketLists.
+
+        The list is not sent again until a BucketList of the user changes.
+        """
+        url = url_for('main.get_bucketlists')
+        response = self.client.get(url,
+                                   headers=create_api_headers(self.token))
+        headers = create_api_headers(self.token)
+        headers['If-Modified-Since'] = response.headers['Last-Modified']
+        response = self.client.get(url, headers=headers)
+        self.assertEquals(response.status_code, 304)
+
+        headers = create_api_headers(self.token)
+        headers['If-None-Match'] = response.headers['ETag']
+        self.client.delete(url_for('main.delete_bucketlist', list_id=3),
+                           headers=create_api_headers(self.token))
+        response = self.client.get(url, headers=headers)
+        self.assertEquals(response.status_code, 200)
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), 'needs time.tzset')
+    def test_last_modified_in_utc(self):
+        """
+        Test the Last-Modified header on a server that isn't in UTC.
+
+        The local modification time is sent in UTC, and an If-Modified-Since
+        after it gets a 304 status code.
+        """
+        _, last_modified = BucketList.version(1, g.user.user_id)
+        timezone = os.environ.get('TZ')
+        os.environ['TZ'] = 'Etc/GMT-5'
+        time.tzset()
+        try:
+            url = url_for('main.get_bucketlist', list_id=1)
+            response = self.client.get(
+                url, headers=create_api_headers(self.token))
+            self.assertEquals(
+                response.last_modified,
+                last_modified.replace(microsecond=0) - timedelta(hours=5))
+
+            headers = create_api_headers(self.token)
+            headers['If-Modified-Since'] = http_date(
+                response.last_modified + timedelta(hours=1))
+            response = self.client.get(url, headers=headers)
+            self.assertEquals(response.status_code, 304)
+        finally:
+            if timezone is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = timezone
+            time.tzset()
+
     def test_get_nonexistent_bucketlist(self):
         """
         Test the get bucketlist endpoint.
@@ -293,6 +569,45 @@ class TestAPIRoutes(unittest.TestCase):
             headers=create_api_headers(self.token))
         self.assertEquals(response.status_code, 201)
 
+    def test_add_bucketlist_item_commits_once(self):
+        """
+        Test the transaction of a request that changes several rows.
+
+        The item, the counters of its BucketList and its owner are committed
+        together once, and the BucketList returned shows the new counters.
+        """
+        with count_commits(db.engine) as commits:
+            response = self.client.post(
+                url_for('main.add_bucketlist_item', list_id=1),
+                data=json.dumps({"name": "Travel to Portugal",
+                                 "done": "true"}),
+                headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(len(commits), 1)
+        self.assertEquals(data['item_count'], 2)
+
+    def test_failed_request_is_rolled_back(self):
+        """
+        Test the transaction of a request that fails.
+
+        Nothing is committed when a request returns an error or raises an
+        exception, and the changes made before the error are rolled back.
+        """
+        with count_commits(db.engine) as commits:
+            response = self.client.post(
+                url_for('main.create_bucketlist'),
+                data=json.dumps({"name": self.bucketlist3_name}),
+                headers=create_api_headers(self.token))
+            self.assertRaises(
+                IntegrityError, self.client.put,
+                url_for('main.update_bucketlist', list_id=1),
+                data=json.dumps({"name": self.bucketlist3_name}),
+                headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 400)
+        self.assertEquals(len(commits), 0)
+        self.assertEquals(BucketList.query.get(1).name, self.bucketlist_name)
+
     def test_add_item_to_nonexistent_bucketlist(self):
         """
         Test what response when user adds item to nonexistent BucketList.
@@ -324,6 +639,133 @@ class TestAPIRoutes(unittest.TestCase):
             headers=create_api_headers(self.token))
         self.assertEquals(response.status_code, 400)
 
+    def test_add_bucketlist_items(self):
+        """
+        Test adding many items to a BucketList at once.
+
+        The new items are inserted with one statement and every item gets a
+        result, including invalid items and duplicate names.
+        """
+        with count_queries(db.engine) as statements:
+            response = self.client.post(
+                url_for('main.add_bucketlist_items', list_id=1),
+                data=json.dumps([
+                    {"name": "Travel to Portugal", "done": "true"},
+                    {"name": self.bucketlist_item_name},
+                    {"done": "false"},
+                    {"name": "Travel to Portugal"},
+                    {"name": "Learn French", "done": "false"}
+                ]),
+                headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(data['created'], 2)
+        self.assertEquals([each['status'] for each in data['results']],
+                          [201, 409, 400, 409, 201])
+        self.assertTrue(data['results'][0]['item']['done'])
+        self.assertEquals(data['results'][4]['item']['name'], "Learn French")
+        self.assertEquals(len([each for each in statements
+                               if each.startswith('INSERT')]), 1)
+        self.assertEquals(Items.query.filter_by(bucketlist_id=1).count(), 3)
+
+    def test_add_bucketlist_items_with_invalid_names(self):
+        """
+        Test adding many items with names that aren't valid.
+
+        Names that aren't strings of 1 to 64 characters get a 400 result and
+        the other items are still added.
+        """
+        response = self.client.post(
+            url_for('main.add_bucketlist_items', list_id=1),
+            data=json.dumps([
+                {"name": 123},
+                {"name": ["Travel"]},
+                {"name": "x" * 200},
+                {"name": "Learn French"}
+            ]),
+            headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(data['created'], 1)
+        self.assertEquals([each['status'] for each in data['results']],
+                          [400, 400, 400, 201])
+        self.assertIn('1 to 64 characters', data['results'][0]['error'])
+        self.assertEquals(Items.query.filter_by(bucketlist_id=1).count(), 2)
+
+    def test_get_bucketlist_items(self):
+        """
+        Test paging through the items of a BucketList.
+
+        The items are paginated with the same meta as BucketLists and can be
+        filtered by done and by the start of their name. The filters are kept
+        in the page URLs.
+        """
+        self.client.post(
+            url_for('main.add_bucketlist_items', list_id=1),
+            data=json.dumps([
+                {"name": "Travel to Portugal", "done": "true"},
+                {"name": "Travel to Spain", "done": "false"},
+                {"name": "Travel_light", "done": "true"},
+                {"name": "Learn French", "done": "true"}
+            ]),
+            headers=create_api_headers(self.token))
+
+        response = self.client.get(
+            url_for('main.get_bucketlist_items', list_id=1),
+            query_string={'limit': '2'},
+            headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(data['meta']['total'], 5)
+        self.assertEquals(
+            [each['name'] for each in data['items']],
+            [self.bucketlist_item_name, "Travel to Portugal"])
+
+        response = self.client.get(
+            url_for('main.get_bucketlist_items', list_id=1),
+            query_string={'prefix': 'Travel', 'done': 'true', 'limit': '1',
+                          'cursor': ''},
+            headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals([each['name'] for each in data['items']],
+                          ["Travel to Portugal"])
+        self.assertIn('prefix=Travel', data['meta']['next'])
+
+        response = self.client.get(data['meta']['next'],
+                                   headers=create_api_headers(self.token))
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEquals([each['name'] for each in data['items']],
+                          ["Travel_light"])
+        self.assertIsNone(data['meta']['next_cursor'])
+
+    def test_get_bucketlist_items_of_another_user(self):
+        """
+        Test listing the items of a BucketList the user doesn't own.
+
+        The API returns a 404 error and a 400 error for an invalid filter.
+        """
+        response = self.client.get(
+            url_for('main.get_bucketlist_items', list_id=2),
+            headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 404)
+
+        response = self.client.get(
+            url_for('main.get_bucketlist_items', list_id=1, done='maybe'),
+            headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 400)
+
+    def test_add_bucketlist_items_without_array(self):
+        """
+        Test adding many items without a JSON array.
+
+        The API returns a 400 error when the body isn't an array of items.
+        """
+        response = self.client.post(
+            url_for('main.add_bucketlist_items', list_id=1),
+            data=json.dumps({"name": "Travel to Portugal"}),
+            headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 400)
+
     def test_update_bucketlist_item(self):
         """
         Test the response received when user updates a BucketList item.
@@ -0,0 +1,108 @@
+"""
+Search Test Case.
+
+Test the search index of BucketList names to be certain it's functioning well.
+"""
+import json
+import unittest
+
+from flask import url_for
+
+from app import db, create_app
+from app.models import User, BucketList
+from tests.header import count_queries, create_api_headers
+
+
+class TestBucketListSearch(unittest.TestCase):
+    """
+    Test searching BucketLists with the `q` query parameter.
+
+    Test the search index is used and kept in sync with the BucketLists.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates a user with a few BucketLists.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        self.token = user.generate_auth_token()
+        for name in ['Travel the world', 'Learn to travel light',
+                     'Cook jollof rice']:
+            db.session.add(BucketList(name=name, created_by=user.user_id))
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def search(self, q):
+        """
+        Search the BucketLists of the user.
+
+        Returns the names of the BucketLists found and the statements sent to
+        the database.
+        """
+        with count_queries(db.engine) as statements:
+            response = self.client.get(
+                url_for('main.get_bucketlists'), query_string={'q': q},
+                headers=create_api_headers(self.token))
+        self.assertEquals(response.status_code, 200)
+        data = json.loads(response.get_data(as_text=True))
+        return [each['name'] for each in data['bucketlists']], statements
+
+    def test_search_uses_index(self):
+        """
+        Test the search index is used.
+
+        Names containing the search text are found, in any case, with a MATCH
+        against the search index.
+        """
+        names, statements = self.search('TRAVEL')
+        self.assertEquals(sorted(names),
+                          ['Learn to travel light', 'Travel the world'])
+        self.assertTrue([each for each in statements if 'MATCH' in each])
+
+    def test_short_search_falls_back(self):
+        """
+        Test search text shorter than a trigram.
+
+        The index can't match it so a LIKE filter is used instead.
+        """
+        names, statements = self.search('jo')
+        self.assertEquals(names, ['Cook jollof rice'])
+        self.assertFalse([each for each in statements if 'MATCH' in each])
+
+    def test_index_follows_changes(self):
+        """
+        Test the search index is kept in sync.
+
+        Renamed and deleted BucketLists are found by their new names only.
+        """
+        bucketlist = BucketList.query.filter_by(
+            name='Travel the world').first()
+        bucketlist.name = 'See the pyramids'
+        bucketlist.save()
+        BucketList.query.filter_by(name='Cook jollof rice').first().delete()
+        self.assertEquals(self.search('travel')[0], ['Learn to travel light'])
+        self.assertEquals(self.search('pyramid')[0], ['See the pyramids'])
+        self.assertEquals(self.search('jollof')[0], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Seeding Test Case.
+
+Test the generation of synthetic data to be certain it's functioning well.
+"""
+import json
+from os import environ
+import unittest
+
+from flask import url_for
+
+from app import db, create_app
+from app.models import User, BucketList, Items
+from app.seeding import seed
+from tests.header import create_api_headers
+
+
+class TestSeeding(unittest.TestCase):
+    """
+    Test generating synthetic data.
+
+    The rows are written in batches and the BucketList counters match the
+    items generated.
+    """
+
+    database_uri = None
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode.
+        """
+        self.app = create_app('testing')
+        if self.database_uri is not None:
+            self.app.config['SQLALCHEMY_DATABASE_URI'] = self.database_uri
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_seed(self):
+        """
+        Test seeding users, BucketLists and items.
+
+        Every row is written, the users share a password hash that checks
+        and the counters match the items.
+        """
+        reports = []
+        counts = seed(3, 4, 5, report=reports.append, batch_size=7,
+                      password='andela')
+        self.assertEquals(counts, {'users': 3, 'bucketlists': 12,
+                                   'items': 60})
+        self.assertGreater(len(reports), 1)
+        self.assertIn('rows/s', reports[-1])
+        self.assertEquals(Items.query.count(), 60)
+        user = User.query.filter_by(username='user1').one()
+        self.assertTrue(user.verify_password('andela'))
+        self.assertEquals(user.password_hash,
+                          User.query.get(3).password_hash)
+        for bucketlist in BucketList.query:
+            self.assertEquals(bucketlist.item_count, 5)
+            self.assertEquals(bucketlist.done_count,
+                              bucketlist.items.filter_by(done=True).count())
+
+    def test_seed_is_deterministic(self):
+        """
+        Test seeding twice with the same seed.
+
+        The data added the second time follows the existing rows and has
+        the same names and done flags.
+        """
+        seed(2, 3, 4, seed=42)
+        seed(2, 3, 4, seed=42)
+        self.assertEquals(User.query.count(), 4)
+        lists = BucketList.query.order_by(BucketList.bucketlist_id).all()
+        self.assertEquals(len(lists), 12)
+        for first, second in zip(lists[:6], lists[6:]):
+            self.assertEquals(first.name.rsplit(' ', 1)[0],
+                              second.name.rsplit(' ', 1)[0])
+            self.assertEquals(
+                [item.done for item in first.items.order_by(Items.item_id)],
+                [item.done for item in second.items.order_by(Items.item_id)])
+
+    def test_api_inserts_after_seed(self):
+        """
+        Test creating rows through the API after seeding.
+
+        The ids the database assigns next don't clash with the seeded ones.
+        """
+        seed(2, 2, 2, password='andela')
+        client = self.app.test_client()
+        response = client.post(
+            url_for('authentication.register_user'),
+            data=json.dumps({'username': 'proton', 'password': 'andela'}),
+            content_type='application/json')
+        self.assertEquals(response.status_code, 201)
+        user = User.query.filter_by(username='proton').one()
+        headers = create_api_headers(user.generate_auth_token())
+        response = client.post(url_for('main.create_bucketlist'),
+                               data=json.dumps({'name': 'Travel'}),
+                               headers=headers)
+        self.assertEquals(response.status_code, 201)
+        list_id = json.loads(response.data.decode())['id']
+        response = client.post(
+            url_for('main.add_bucketlist_item', list_id=list_id),
+            data=json.dumps({'name': 'Paris'}), headers=headers)
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(User.query.count(), 3)
+        self.assertEquals(BucketList.query.count(), 5)
+        self.assertEquals(Items.query.count(), 9)
+
+
+@unittest.skipUnless(environ.get('TEST_POSTGRES_DB'),
+                     'TEST_POSTGRES_DB is not set')
+class TestSeedingPostgreSQL(TestSeeding):
+    """
+    Test generating synthetic data on PostgreSQL.
+
+    The id sequences must follow the seeded rows.
+    """
+
+    database_uri = environ.get('TEST_POSTGRES_DB')
+
+
+if __name__ == '__main__':
+    unittest.main()
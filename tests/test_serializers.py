@@ -0,0 +1,158 @@
+"""
+Serializers Test Case.
+
+Test the column-level serializers to be certain they're functioning well.
+"""
+import unittest
+
+from flask import jsonify
+
+from app import db, create_app
+from app.models import User, BucketList, Items
+from app.serializers import (
+    BUCKETLIST_COLUMNS, BUCKETLIST_FIELDS, bucketlist_columns,
+    bucketlists_to_json, requested_fields)
+from tests.header import count_queries
+
+
+class TestSerializers(unittest.TestCase):
+    """
+    Test the serializers against the `to_json` methods of the models.
+
+    The serializers must display rows exactly like the models display
+    themselves.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates BucketLists with and without items.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.test_request_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        for name in ['Travel', 'Cook', 'Empty']:
+            db.session.add(BucketList(name=name, created_by=user.user_id))
+        db.session.commit()
+        for bucketlist in BucketList.query.filter(BucketList.name != 'Empty'):
+            for name, done in [('First', 'true'), ('Second', 'false')]:
+                item = Items().from_json({'name': name, 'done': done})
+                item.bucketlist_id = bucketlist.bucketlist_id
+                db.session.add(item)
+        db.session.commit()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_output_matches_to_json(self):
+        """
+        Test the serialized BucketLists.
+
+        The json sent for the rows is byte-identical to the json sent for the
+        models.
+        """
+        models = BucketList.query.order_by(BucketList.bucketlist_id).all()
+        expected = jsonify([each.to_json() for each in models]).get_data()
+        db.session.expunge_all()
+
+        rows = db.session.query(*BUCKETLIST_COLUMNS).order_by(
+            BucketList.bucketlist_id).all()
+        self.assertEquals(jsonify(bucketlists_to_json(rows)).get_data(),
+                          expected)
+
+    def test_summary_leaves_items_out(self):
+        """
+        Test the serialized BucketLists of a summary.
+
+        A summary has the item counters of each BucketList but no items and
+        doesn't query the items.
+        """
+        rows = db.session.query(*BUCKETLIST_COLUMNS).order_by(
+            BucketList.bucketlist_id).all()
+        with self.app.test_request_context('/?summary=true'):
+            with count_queries(db.engine) as statements:
+                results = bucketlists_to_json(
+                    rows, requested_fields(BUCKETLIST_FIELDS))
+        self.assertEquals(statements, [])
+        self.assertEquals(
+            [(each['name'], each['item_count'], each['done_count'])
+             for each in results],
+            [('Travel', 2, 1), ('Cook', 2, 1), ('Empty', 0, 0)])
+        self.assertFalse(any('items' in each for each in results))
+
+    def test_requested_fields(self):
+        """
+        Test reading the requested fields.
+
+        `include_items` adds or removes the items and their counters from
+        the `fields` requested.
+        """
+        cases = [
+            ('/', None),
+            ('/?fields=id,name', set(['id', 'name'])),
+            ('/?fields=id&include_items=count',
+             set(['id', 'item_count', 'done_count'])),
+            ('/?fields=id&include_items=all',
+             set(['id', 'items', 'item_count', 'done_count'])),
+            ('/?include_items=false',
+             set(BUCKETLIST_FIELDS) -
+             set(['items', 'item_count', 'done_count']))
+        ]
+        for url, expected in cases:
+            with self.app.test_request_context(url):
+                self.assertEquals(requested_fields(BUCKETLIST_FIELDS),
+                                  expected)
+        for url in ['/?fields=id,owner', '/?include_items=some',
+                    '/?fields=', '/?fields=%20,%20']:
+            with self.app.test_request_context(url):
+                self.assertRaises(ValueError, requested_fields,
+                                  BUCKETLIST_FIELDS)
+
+    def test_fields_match_to_json(self):
+        """
+        Test serializing some of the fields.
+
+        Only the columns of the requested fields are selected and the json
+        is the same as the one sent for the models with those fields.
+        """
+        fields = frozenset(['name', 'bucketlist_url', 'done_count'])
+        models = BucketList.query.order_by(BucketList.bucketlist_id).all()
+        expected = jsonify([each.to_json(fields=fields)
+                            for each in models]).get_data()
+        db.session.expunge_all()
+
+        with count_queries(db.engine) as statements:
+            rows = db.session.query(*bucketlist_columns(fields)).order_by(
+                BucketList.bucketlist_id).all()
+            output = jsonify(bucketlists_to_json(rows, fields)).get_data()
+        self.assertEquals(output, expected)
+        self.assertEquals(len(statements), 1)
+        self.assertNotIn('date_created', statements[0])
+
+    def test_rows_are_not_hydrated(self):
+        """
+        Test no model instances are loaded.
+
+        Serializing rows leaves the identity map of the session empty.
+        """
+        db.session.expunge_all()
+        rows = db.session.query(*BUCKETLIST_COLUMNS).all()
+        bucketlists_to_json(rows)
+        self.assertEquals(len(db.session.identity_map), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+Slow Query Test Case.
+
+Test the slow query log to be certain it's functioning well.
+"""
+import json
+import unittest
+
+from flask import Flask, url_for
+from sqlalchemy.exc import OperationalError
+
+from app import db, create_app, slow_queries
+from app.models import User, BucketList
+from tests.header import RecordingHandler, create_api_headers
+
+
+class TestSlowQueryLog(unittest.TestCase):
+    """
+    Test logging slow statements.
+
+    Every statement is slow with a threshold of a nanosecond.
+    """
+
+    def setUp(self):
+        """
+        Set up a handler for the log.
+
+        The handler records the lines logged.
+        """
+        self.handler = RecordingHandler()
+        slow_queries.logger.addHandler(self.handler)
+        self.app_context = None
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        slow_queries.logger.removeHandler(self.handler)
+        if self.app_context is not None:
+            db.session.remove()
+            db.drop_all()
+            self.app_context.pop()
+
+    def create_app(self, **config):
+        """
+        Start the application with the slow query log configured.
+
+        The application has a user with a BucketList. Returns the log.
+        """
+        settings = {'SLOW_QUERY_THRESHOLD': 1e-9, 'SLOW_QUERY_LOG_RATE': 100}
+        settings.update(config)
+        self.app = create_app('testing')
+        self.app.config.update(settings)
+        slow_queries.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        BucketList(name='Travel', created_by=user.user_id).save()
+        self.user_id = user.user_id
+        self.headers = create_api_headers(user.generate_auth_token())
+        self.app.try_trigger_before_first_request_functions()
+        del self.handler.messages[:]
+        return self.app.extensions.get('slow_query_log')
+
+    def entries(self):
+        """
+        Read the lines logged.
+
+        Returns the entries decoded.
+        """
+        return [json.loads(message) for message in self.handler.messages]
+
+    def test_request_statements_logged(self):
+        """
+        Test logging the statements of a request.
+
+        Every entry names the statement, its parameters, the endpoint and
+        the user.
+        """
+        self.create_app(SLOW_QUERY_LOG_PARAMETERS=True)
+        self.client.get(url_for('main.get_bucketlists'), headers=self.headers)
+        entries = [entry for entry in self.entries()
+                   if 'FROM bucketlist' in entry['statement']]
+        self.assertTrue(entries)
+        entry = entries[-1]
+        self.assertEquals(entry['endpoint'], 'main.get_bucketlists')
+        self.assertEquals(entry['method'], 'GET')
+        self.assertEquals(entry['user_id'], self.user_id)
+        self.assertIn(str(self.user_id), entry['parameters'])
+        self.assertGreater(entry['duration_ms'], 0)
+        self.assertNotIn('plan', entry)
+
+    def test_parameters_not_logged(self):
+        """
+        Test logging without SLOW_QUERY_LOG_PARAMETERS.
+
+        The parameters, such as password hashes, are left out.
+        """
+        self.create_app()
+        user = User(username='proton')
+        user.hash_password('proton')
+        user.save()
+        entries = self.entries()
+        self.assertTrue(entries)
+        for entry in entries:
+            self.assertIsNone(entry['parameters'])
+            self.assertNotIn(user.password_hash, json.dumps(entry))
+
+    def test_failed_statement(self):
+        """
+        Test logging a statement that fails.
+
+        Nothing is left behind on its connection.
+        """
+        self.create_app()
+        connection = db.engine.connect()
+        info = dict(connection.info)
+        with self.assertRaises(OperationalError):
+            connection.execute('SELECT * FROM missing')
+        self.assertEquals(dict(connection.info), info)
+        connection.close()
+
+    def test_statement_explained(self):
+        """
+        Test logging the plan of a statement.
+
+        SELECT statements are explained, others aren't.
+        """
+        self.create_app(SLOW_QUERY_EXPLAIN='explain')
+        db.session.execute('SELECT * FROM bucketlist WHERE created_by = :id',
+                           {'id': self.user_id})
+        db.session.execute('UPDATE bucketlist SET name = :name',
+                           {'name': 'Learn'})
+        select, update = self.entries()
+        self.assertIsNone(select['endpoint'])
+        self.assertTrue(select['plan'])
+        self.assertIn('bucketlist', ' '.join(select['plan']))
+        self.assertIsNone(update['plan'])
+
+    def test_rate_limited(self):
+        """
+        Test the rate limit.
+
+        The statements over the limit aren't logged, and are counted in the
+        next line that is.
+        """
+        log = self.create_app(SLOW_QUERY_LOG_RATE=0.001)
+        for each in range(3):
+            db.session.execute('SELECT 1')
+        self.assertEquals(len(self.handler.messages), 1)
+        self.assertEquals(log.stats()['suppressed'], 2)
+        log.limiter.tokens = 1
+        db.session.execute('SELECT 2')
+        self.assertEquals(self.entries()[-1]['suppressed'], 2)
+        self.assertEquals(log.stats()['suppressed'], 0)
+
+    def test_sampled(self):
+        """
+        Test sampling.
+
+        With a sample rate of 0 no statement is logged.
+        """
+        log = self.create_app(SLOW_QUERY_SAMPLE_RATE=0)
+        db.session.execute('SELECT 1')
+        self.assertEquals(self.handler.messages, [])
+        self.assertEquals(log.stats()['skipped'], 1)
+
+    def test_disabled(self):
+        """
+        Test an application without SLOW_QUERY_THRESHOLD.
+
+        There is no slow query log.
+        """
+        app = Flask(__name__)
+        app.config['SLOW_QUERY_THRESHOLD'] = 0
+        slow_queries.init_app(app)
+        self.assertNotIn('slow_query_log', app.extensions)
+        self.assertEquals(app.before_first_request_funcs, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Timing Test Case.
+
+Test the timing of requests to be certain it's functioning well.
+"""
+import json
+import logging
+import unittest
+
+from flask import url_for
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import db, create_app, timing
+from app.models import User, BucketList
+from tests.header import (
+    RecordingHandler, count_queries, create_api_headers)
+
+
+class TestRequestTiming(unittest.TestCase):
+    """
+    Test timing requests.
+
+    With REQUEST_TIMING set, requests report their timings and queries.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode with
+        REQUEST_TIMING set and creates a user with a BucketList.
+        """
+        self.app = self.create_app(True)
+        self.handler = RecordingHandler()
+        timing.logger.addHandler(self.handler)
+        timing.logger.setLevel(logging.INFO)
+
+    def create_app(self, enabled):
+        """
+        Start the application with or without timing.
+
+        Returns the application.
+        """
+        app = create_app('testing')
+        app.config['REQUEST_TIMING'] = enabled
+        timing.init_app(app)
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = app.test_client()
+        user = User(username='andela')
+        user.hash_password('andela')
+        user.save()
+        BucketList(name='Travel', created_by=user.user_id).save()
+        self.headers = create_api_headers(user.generate_auth_token())
+        return app
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        timing.logger.removeHandler(self.handler)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_server_timing(self):
+        """
+        Test the timings of a request.
+
+        The Server-Timing header and the log line report the queries run.
+        """
+        with count_queries(db.engine) as statements:
+            response = self.client.get(url_for('main.get_bucketlists'),
+                                       headers=self.headers)
+        self.assertEquals(response.status_code, 200)
+        header = response.headers['Server-Timing']
+        self.assertIn('desc="{0} queries"'.format(len(statements)), header)
+        self.assertIn('serialize;dur=', header)
+        self.assertIn('total;dur=', header)
+
+        line = json.loads(self.handler.messages[-1])
+        self.assertEquals(line['endpoint'], 'main.get_bucketlists')
+        self.assertEquals(line['status'], 200)
+        self.assertEquals(line['queries'], len(statements))
+        self.assertGreater(line['serialize_ms'], 0)
+        self.assertGreaterEqual(line['total_ms'], line['db_ms'])
+
+    def test_failed_statement(self):
+        """
+        Test timing a statement that fails.
+
+        Nothing is left behind on its connection, and the statements after
+        it are still timed.
+        """
+        self.app.try_trigger_before_first_request_functions()
+        connection = db.engine.connect()
+        info = dict(connection.info)
+        with self.assertRaises(OperationalError):
+            connection.execute('SELECT * FROM missing')
+        self.assertEquals(dict(connection.info), info)
+        connection.close()
+
+        with count_queries(db.engine) as statements:
+            response = self.client.get(url_for('main.get_bucketlists'),
+                                       headers=self.headers)
+        self.assertIn('desc="{0} queries"'.format(len(statements)),
+                      response.headers['Server-Timing'])
+
+    def test_disabled(self):
+        """
+        Test requests without REQUEST_TIMING.
+
+        Nothing is timed and the engine isn't listened to.
+        """
+        self.tearDown()
+        self.app = self.create_app(False)
+        timing.logger.addHandler(self.handler)
+        response = self.client.get(url_for('main.get_bucketlists'),
+                                   headers=self.headers)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEquals(self.handler.messages, [])
+        self.assertFalse(event.contains(db.engine, 'before_cursor_execute',
+                                        timing._before))
+        self.assertNotIn(timing.start_timing,
+                         self.app.before_request_funcs.get(None, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
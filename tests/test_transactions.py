@@ -0,0 +1,111 @@
+"""
+Transactions Test Case.
+
+Test the unit of work of requests to be certain it's functioning well.
+"""
+import unittest
+
+from app import db, create_app
+from app.models import User, BucketList
+from tests.header import count_commits
+
+
+class TestUnitOfWork(unittest.TestCase):
+    """
+    Test the unit of work.
+
+    Changes made while handling a request must be committed once at the end
+    of the request, and changes made outside of requests right away.
+    """
+
+    def setUp(self):
+        """
+        Set up the application for testing.
+
+        The method 'setUp' simply starts the application in test mode and
+        creates a user.
+        """
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='andela')
+        self.user.hash_password('andela')
+        self.user.save()
+
+    def tearDown(self):
+        """
+        Tear down method.
+
+        This method removes every information related to the test cases.
+        """
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def handle(self, status, *names):
+        """
+        Save BucketLists as a request would.
+
+        A BucketList is saved for each name and the request ends with a
+        response of the given status. Returns the number of commits made.
+        """
+        with count_commits(db.engine) as commits:
+            with self.app.test_request_context('/'):
+                self.app.preprocess_request()
+                for name in names:
+                    BucketList(name=name, created_by=self.user.user_id).save()
+                self.app.process_response(
+                    self.app.response_class(status=status))
+        return len(commits)
+
+    def test_request_commits_once(self):
+        """
+        Test saving several models in a request.
+
+        The models are committed together when the request ends.
+        """
+        self.assertEquals(self.handle(201, 'Travel', 'Cook'), 1)
+        db.session.rollback()
+        self.assertEquals(BucketList.query.count(), 2)
+
+    def test_error_response_rolls_back(self):
+        """
+        Test saving models in a request that fails.
+
+        Nothing is committed when the response is an error.
+        """
+        self.assertEquals(self.handle(400, 'Travel', 'Cook'), 0)
+        self.assertEquals(BucketList.query.count(), 0)
+
+    def test_save_outside_of_requests_commits(self):
+        """
+        Test saving models outside of requests.
+
+        Each save is committed right away, e.g. in scripts.
+        """
+        with count_commits(db.engine) as commits:
+            BucketList(name='Travel', created_by=self.user.user_id).save()
+            BucketList(name='Cook', created_by=self.user.user_id).save()
+        self.assertEquals(len(commits), 2)
+
+    def test_unit_of_work_can_be_disabled(self):
+        """
+        Test saving models in a request without the unit of work.
+
+        Each save is committed right away when UNIT_OF_WORK isn't set.
+        """
+        self.tearDown()
+        self.app = create_app('testing')
+        self.app.config['UNIT_OF_WORK'] = False
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='andela')
+        self.user.hash_password('andela')
+        self.user.save()
+        self.assertEquals(self.handle(201, 'Travel', 'Cook'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()